@@ -48,6 +48,33 @@ excludedParticipants = [22, 34]
 #  please set 'completeICA' to 'False'.
 completeICA = False
 
+# New ICA solutions are created with the
+#  'FastICA' algorithm ('icaMethod'), except
+#  for the participants in 'icaMethodPer-
+#  Participant', for whom another algorithm
+#  is used: 'fastica', 'picard' (which needs
+#  the package 'python-picard') or 'infomax'.
+#  To speed up the fit, it can be carried out
+#  on every 'icaDecimation'-th sample only
+#  (e.g. 5; after filtering, the data contains
+#  no activity above 30 Hz or so, so 100 Hz
+#  is still enough), and on fewer components
+#  than channels: enter a number of compo-
+#  nents or a fraction of the variance (e.g.
+#  0.999) in 'icaComponents'. 'None' means
+#  one component less than the number of good
+#  channels. Please note that new solutions
+#  may contain other components than the old
+#  ones, so '/Miscellaneous/Unwanted compo-
+#  nents.txt' may have to be updated. The code
+#  in '/Code/Other/Benchmarking ICA fits.py'
+#  shows how fast each choice is and how well
+#  its components match the stored solutions.
+icaMethod = 'fastica'
+icaMethodPerParticipant = {27: 'picard'}
+icaDecimation = 1
+icaComponents = None
+
 # Different scholars have different
 #  views on what constitutes theta
 #  activity. To accommodate for this,
@@ -57,6 +84,150 @@ completeICA = False
 #  (also in Hz) is the upper limit.
 thetaRange = [4.0, 7.0]
 
+# The power scores can also be extracted
+#  for other frequency bands than theta.
+#  To do so, enter a name and a range (in
+#  Hz) for each band in 'otherFrequencyBands',
+#  for example: {'Delta': [1.0, 4.0], 'Alpha':
+#  [8.0, 12.0], 'Beta': [13.0, 30.0]}. The
+#  scores for these bands will be stored in
+#  a folder called '/Output/Band power scores'.
+otherFrequencyBands = {}
+
+# The power scores of each participant are
+#  normalised: per electrode, they are divided
+#  by the sum of the scores of all conditions
+#  at all sampling frequencies (0 Hz - 250 Hz).
+#  To only use the frequencies within a cer-
+#  tain range (in Hz) instead, e.g. [0.1, 30],
+#  enter that range in 'normalisationRange'.
+#  Power scores are then only calculated for
+#  the frequencies within that range and the
+#  frequency bands above, which saves time
+#  and memory.
+normalisationRange = None
+
+# The power scores are calculated with the
+#  multitaper method. For quick screening
+#  runs, a faster (but less accurate) method
+#  can be chosen in 'psdMethod': 'multitaper',
+#  'welch' or 'fft'. The code in '/Code/Other/
+#  Comparing spectral estimators.py' shows
+#  how fast and how accurate each method is.
+psdMethod = 'multitaper'
+
+# The tables with power scores (steps 4.2 and
+#  4.3) are stored as Excel files. They can
+#  also be stored as CSV files or as Parquet
+#  files (which requires the package 'pyarrow').
+#  Enter all formats you want in 'outputFormats',
+#  e.g. ['xlsx', 'csv', 'parquet'].
+outputFormats = ['xlsx']
+
+# Processing all participants one after
+#  another takes hours. Since participants
+#  do not depend on each other, they can
+#  also be processed side by side. To do so,
+#  set 'parallelProcessing' to 'True' and
+#  enter the number of worker processes
+#  that may run at the same time in 'number-
+#  OfWorkers'. Each worker may use at most
+#  'threadsPerWorker' threads for its matrix
+#  operations, so that the workers do not
+#  get in each other's way. A good choice
+#  is to make 'numberOfWorkers' times 'threads-
+#  PerWorker' equal to the number of cores.
+parallelProcessing = False
+numberOfWorkers = 8
+threadsPerWorker = 1
+
+# Most steps of the subject-level compu-
+#  tations give the same outcome every time
+#  we run this code, unless we change one
+#  of their parameters. If 'useStageCache'
+#  is set to 'True', the pre-processed data,
+#  the clean epochs and the power scores of
+#  each participant are stored in a folder
+#  called '/Output/Stage cache'. When the
+#  code is run again, only the stages that
+#  are affected by a changed parameter are
+#  carried out again. The cache will never
+#  grow beyond 'stageCacheSizeLimit' (in GB):
+#  the stages that were used least recently
+#  are deleted first.
+useStageCache = False
+stageCacheSizeLimit = 20
+
+# New data comes in batches. If 'incremental-
+#  Processing' is set to 'True', the results of
+#  each participant (power scores, band scores
+#  and numbers of epochs) are kept in a folder
+#  called '/Output/Participant results'. When
+#  the code is run again, only the participants
+#  that are new, or whose files or parameters
+#  changed, are processed again. The results of
+#  the others are loaded from that folder.
+incrementalProcessing = False
+
+# Normally, the complete recording of a
+#  participant is loaded into memory (and
+#  copied at step 2.2.10). If 'streaming-
+#  Mode' is set to 'True', the raw data is
+#  read from disk and pre-processed one
+#  chunk of 'streamingChunkDuration' seconds
+#  at a time instead, and the outcome is
+#  kept in a temporary file in '/Output/
+#  Temporary files'. The outcome is the same
+#  (up to rounding errors), but each parti-
+#  cipant then needs far less memory, which
+#  allows more workers to run side by side.
+streamingMode = False
+streamingChunkDuration = 60
+
+# Re-referencing (step 2.2.5), applying the
+#  ICA solution (step 2.2.10) and interpola-
+#  ting the bad channels (step 2.2.14) each
+#  multiply all of the data by a matrix. If
+#  'fuseSpatialOperators' is set to 'True',
+#  these matrices are first multiplied with
+#  each other, and the data is only multiplied
+#  by the outcome, once, before filtering. The
+#  outcome is the same (up to rounding errors;
+#  see '/Code/Other/Checking fused operators.
+#  py'). In streaming mode, re-referencing and
+#  the ICA solution are always combined, and
+#  this setting has no effect.
+fuseSpatialOperators = False
+
+# The data is recorded at 500 Hz, but after
+#  filtering (step 2.2.11) it contains no
+#  activity above 30 Hz or so. To speed up
+#  the rest of the computations, the data
+#  can be resampled at a lower rate after
+#  filtering. To do so, enter that rate (in
+#  Hz) in 'downsamplingRate', e.g. 100. It
+#  should be at least 2.5 times the upper
+#  limit of the filter (i.e. 75 Hz), so that
+#  the filter's transition band is kept
+#  intact. Set it to 'None' to keep the
+#  original rate. The code in '/Code/Other/
+#  Checking downsampling.py' shows how much
+#  the theta power scores change.
+downsamplingRate = None
+
+# Only the epochs around the onsets of
+#  the stimuli in the three conditions are
+#  used to calculate power scores. Epochs
+#  are therefore only created around the
+#  events in 'analysedEvents' (see step
+#  2.2.8 in '/Code/Modules/participant-
+#  Processing.py' for the names of all
+#  events). It should contain the onsets
+#  of the stimuli in all three conditions.
+#  Set it to 'None' to create epochs around
+#  all events instead.
+analysedEvents = ['Add0_StimulusAppears', 'Add1_StimulusAppears', 'Add2_StimulusAppears']
+
 # =============== CODE =============== #
 
 ### ******************************** ###
@@ -66,15 +237,50 @@ thetaRange = [4.0, 7.0]
 
 ### ----------- Step 1.1 ----------- ###
 
+# If we process participants side by side,
+#  we limit the number of threads that each
+#  worker may use. This has to happen before
+#  NumPy (and hence MNE) is imported (see
+#  '/Code/Modules/threadLimits.py').
+import sys
+sys.path.append('../Modules')
+from threadLimits import setThreadingVariables
+if parallelProcessing:
+    setThreadingVariables(threadsPerWorker)
+
 # We import the Python modules we need.
 import mne
-import os
+import time
+import multiprocessing
 from os import path
-from pathlib import Path
-from mne.preprocessing import ICA
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import pandas as pd
 import numpy as np
-import pickle
+from itertools import combinations
+
+# We also import some functions that we
+#  wrote ourselves. They can be found in
+#  the folder '/Code/Modules'.
+from participantProcessing import processParticipant, processParticipantIncrementally, limitThreads, \
+    checkIcaMethods, checkAnalysedEvents
+from pipelineSettings import participantSettings
+from recordingCatalog import loadRecordingCatalog
+from preflightValidation import preflightProblems
+from bandPower import computeBandPower
+from rescaling import rescaleConditionPairs
+from spectralEstimators import spectralEstimators
+from outputTables import checkOutputFormats, wideTable, longTable, spectrumTable, writeTable
+from runInstrumentation import startStage, finishStage, collectStageRecords, writeRunReport, printStageSummary
+
+# Some parts of this code can be switched
+#  on from the command line, without edit-
+#  ing the settings above (see step 4.3).
+parser = argparse.ArgumentParser()
+parser.add_argument('--rescale', action='store_true',
+                    help="rescale the theta power scores (Jing et al., 2006)")
+commandLineOptions = parser.parse_args()
 
 ### ----------- Step 1.2 ----------- ###
 
@@ -87,13 +293,14 @@ mainDirectory = '../..'
 #  For each participant, we have one .vhdr
 #  file. The paths to all .vhdr files can
 #  be found in '/Miscellaneous/File paths.txt'.
-#  For the sake of convenience, let us load
-#  those paths into an array called 'files'.
-files = []
-document = open('../../Miscellaneous/File paths.txt', 'r')
-document = document.readlines()
-for fileName in document:
-    files.append(mainDirectory + fileName.strip())
+#  We keep a catalog of these recordings, with
+#  the participant number, the sampling fre-
+#  quency, the channels and the events of each
+#  of them (see '/Code/Modules/recordingCata-
+#  log.py'). It is only updated for files that
+#  changed since the last run. Let us load the
+#  catalog into an array called 'recordings'.
+recordings = loadRecordingCatalog(mainDirectory)
 
 # Were there any bad channels when we
 #  recorded our EEG data? To find out,
@@ -134,29 +341,48 @@ for unwantedComponentSet in document:
 # For all participant-condition-electrode
 #  combinations, we want to calculate power
 #  spectral density scores for a wide range
-#  of sampling frequencies (0 Hz - 250 Hz).
+#  of sampling frequencies (0 Hz - 250 Hz, or
+#  up to half of 'downsamplingRate').
 #  We will do that in this part of the code.
 #  We will store the power spectral density
-#  scores in an array called 'powerScoresPer-
-#  Subject'. We will store the sampling fre-
+#  scores in a four-dimensional array called
+#  'powerScoresPerSubject', with one entry per
+#  participant-condition-electrode-frequency
+#  combination. We will store the sampling fre-
 #  quencies (which will be identical for all
 #  participant-condition-electrode tuples)
 #  in an array called 'samplingFrequencies'.
-powerScoresPerSubject = []
-samplingFrequencies = []
+#  How many conditions, electrodes and fre-
+#  quencies there are, we will only know once
+#  the first participant has been processed.
+#  We therefore create both arrays at step 2.2.
+powerScoresPerSubject = None
+samplingFrequencies = None
+
+# We also keep track of the identification
+#  number of each participant whose scores we
+#  store, in an array called 'participantNumbers'.
+participantNumbers = np.empty(0, dtype=int)
 
 ### ----------- Step 2.2 ----------- ###
-
 # Let's have a look at all files, and hence
 #  all subjects, one by one in a special loop.
-for file in files:
+#  We first decide which subjects we want to
+#  process. We store their files in an array
+#  called 'selectedFiles', and their entries
+#  in the catalog in 'selectedRecordings'.
+selectedFiles = []
+selectedRecordings = []
+for recording in recordings:
 
     ### ---------- Step 2.2.1 ---------- ###
 
-    # We can derive the identification number
-    #  of this subject from the name of their
-    #  .vhdr file. We will do that immediately.
-    participantNumber = file[-17:-15]
+    # The identification number of this sub-
+    #  ject is derived from the name of their
+    #  .vhdr file. The catalog already did that
+    #  for us (see '/Code/Modules/recordingCata-
+    #  log.py').
+    participantNumber = recording['participantNumber']
 
     ### ---------- Step 2.2.2 ---------- ###
 
@@ -172,411 +398,144 @@ for file in files:
         # We move on to the next participant.
         continue
 
-    ### ---------- Step 2.2.3 ---------- ###
-
-    # Does the .vhdr file actually exist?
-    if not path.exists(file):
-        print(print("[ERROR] The file \'{}\' could not be found".format(file)))
-        exit()
-
-    # We recorded our data with the Brain-
-    #  Vision Recorder software. The files
-    #  we refer to in the array we called
-    #  'files' (step 1.2) are .vhdr files.
-    #  For each participant, the BrainVision
-    #  Recorder software we used also gene-
-    #  rated two other (eponymous) files that
-    #  are also important: a .eeg file and a
-    #  .vmrk file. The .vhdr file merely con-
-    #  tains metadata. The .eeg file contains
-    #  the raw data that we need. The .vmrk
-    #  file contains information about events
-    #  (e.g. button presses and stimulus on-
-    #  sets) that occurred during the experi-
-    #  ment. Let us check whether the .eeg
-    #  file and the .vmrk file, which should
-    #  be located in the same folder as the
-    #  corresponding .vhdr file, also exist.
-    eegFile = file[:len(file) - 4] + 'eeg'
-    vmrkFile = file[:len(file) - 4] + 'vmrk'
-    if not path.exists(eegFile):
-        print(print("[ERROR] The file \'{}\' could not be found".format(eegFile)))
-        exit()
-    elif not path.exists(vmrkFile):
-        print(print("[ERROR] The file \'{}\' could not be found".format(vmrkFile)))
-        exit()
-
-    ### ---------- Step 2.2.4 ---------- ###
-
-    # We load the data. Since we make use
-    #  of BrainVision data, we should apply
-    #  a non-standard read function here.
-    raw = mne.io.read_raw_brainvision(file, preload=True)
-
-    # We can inspect the loaded data.
-    if False:
-        print(raw.info)
-        print(raw.info.ch_names)
-
-    ### ~~~~~~~~ Pre-processing ~~~~~~~~ ###
-
-    ### ---------- Step 2.2.5 ---------- ###
-
-    # We have 32 EEG channels and 2 MISC
-    #  channels. The two MISC channels are
-    #  labeled 'hEOG' and 'vEOG'. They only
-    #  contain useful data for the first 20
-    #  participants or so. We want to treat
-    #  each data file in a similar manner,
-    #  so let us simply discard the two
-    #  MISC channels for all participants.
-    raw.drop_channels(['hEOG', 'vEOG'])
-
-    ### ---------- Step 2.2.6 ---------- ###
-
-    # When we recorded our data, we used TP8
-    #  as our reference electrode. It would
-    #  be better to make use of an average
-    #  reference, however, since that would
-    #  reduce a potential bias towards brain
-    #  activity in the left hemisphere. We
-    #  add TP8 to our set of electrodes and
-    #  then calculate an average reference.
-    mne.add_reference_channels(raw, ref_channels=['TP8'], copy=False)
-    raw.set_eeg_reference(ref_channels='average')
-
-    ### ---------- Step 2.2.7 ---------- ###
-
-    # We should indicate how the EEG electrodes
-    #  were positioned on the subject's head (i.e.
-    #  what electrode montage we used). We
-    #  made use of the so-called 10-20 system.
-    raw.set_montage(mne.channels.make_standard_montage('standard_1020'))
-
-    # We can visualise our electrode montage.
-    if False:
-        raw.plot_sensors(kind='topomap', ch_type='eeg', block=True)
-        raw.plot_sensors(kind='3d', ch_type='eeg', block=True)
-
-    ### ---------- Step 2.2.8 ---------- ###
-
-    # During the experiment, many events
-    #  (e.g. button presses and stimulus
-    #  onsets) occurred. Let us extract all
-    #  event information for the current
-    #  participant from the data and store
-    #  it in an array called 'events'.
-    events, notNeeded = mne.events_from_annotations(raw)
-
-    # Each type of event is described by a
-    #  so-called 'stimulus code'. Different
-    #  types of events are described by
-    #  different stimulus codes. Let us in-
-    #  dicate what each stimulus code means.
-    event_dictionary = \
-        {'Required1': 1, 'Required2': 2,
-         'Required3': 3, 'Required4': 4,
-         'Required5': 5, 'Required6': 6,
-         'Required7': 7, 'Required8': 8,
-         'Required9': 9, 'Pressed0': 210,
-         'Pressed1': 201, 'Pressed2': 202,
-         'Pressed3': 203, 'Pressed4': 204,
-         'Pressed5': 205, 'Pressed6': 206,
-         'Pressed7': 207, 'Pressed8': 208,
-         'Pressed9': 209,  'PressedSB': 211,
-         'Add0_StimulusAppears': 100,
-         'Add0_StimulusDisappears': 150,
-         'Add1_StimulusAppears': 101,
-         'Add1_StimulusDisappears': 151,
-         'Add2_StimulusAppears': 102,
-         'Add2_StimulusDisappears': 152,
-         'Practice': 155}
-
-    # There is one stimulus code that we did
-    #  not include in the above dictionary
-    #  yet: '10' (meaning: 'Required0'). That
-    #  code was (by accident) not included in
-    #  the data for participant 1. It was in-
-    #  cluded in the data for the remaining 36
-    #  participants, however, so we will add
-    #  the code to their event dictionaries.
-    if int(participantNumber) != 1:
-        event_dictionary['Required0'] = 10
-
-    # We can visualise which events
-    #  occurred at which points in time.
-    if False:
-        figure = mne.viz.plot_events(events,
-                                     event_id=event_dictionary,
-                                     sfreq=raw.info['sfreq'],
-                                     first_samp=raw.first_samp)
-
-    ### ---------- Step 2.2.9 ---------- ###
-
-    # Were there any bad channels when
-    #  we recorded this participant's
-    #  brain activity? At step 1.2 above,
-    #  we loaded this information into an
-    #  array called 'badChannelsPerSubject'.
-    #  Let us extract the information that
-    #  we need from that array and link it
-    #  to the current subject's EEG data.
-    #  We will interpolate the bad channels
-    #  later, at step 2.2.14 of this code.
-    raw.info['bads'] = badChannelsPerSubject[int(participantNumber) - 1]
-
-    ### ---------- Step 2.2.10 --------- ###
-
-    # Eye blinks, eye movements, heartbeats
-    #  and environmental factors may have
-    #  caused there to be artefacts (bits
-    #  of noise) in our data. We can try to
-    #  get rid of those artefacts by means
-    #  of a technique known as independent
-    #  component analysis (ICA). If we set
-    #  'completeICA' to 'True' earlier, we
-    #  will now generate a new ICA solution
-    #  for this participant. Please note that
-    #  this may take some time (~90 seconds).
-    if completeICA:
-
-        #  We first make a copy of our data, which
-        #  we will use to create an ICA solution.
-        raw_copy = raw.copy()
-
-        # We need to remove all major frequency
-        #  drifts from the copy of our data, since
-        #  such frequency drifts can make it hard
-        #  to create an ICA solution. The reason
-        #  we made a copy of our data earlier, is
-        #  that we do not want to remove any drifts
-        #  from our original data yet at this point.
-        raw_copy.load_data().filter(l_freq=0.1, h_freq=30)
-
-        # We will now create the ICA solution for
-        #  the current participant's data. We make
-        #  use of the 'FastICA' algorithm, since I
-        #  found (after several trial sessions) that
-        #  this algorithm tends to converge faster
-        #  than its key competitors: the 'infomax'
-        #  algorithm and the 'Picard' algorithm.
-        #  Since 'FastICA' does not converge for
-        #  participant 27 (for unknown reasons),
-        #  we will use 'Picard' for that subject.
-        algorithm = 'fastica'
-        if int(participantNumber) == 27:
-            algorithm = 'picard'
-        numberOfComponents = raw.info['nchan']-len(raw.info['bads'])-1
-        ica = ICA(n_components=numberOfComponents, random_state=91, method=algorithm)
-        ica.fit(raw_copy)
-
-        # Let us store the ICA solution in a folder
-        #  called '/Output/ICA solutions' so we can
-        #  use it again in the future.
-        with open('../../Output/ICA solutions/P' +
-                  participantNumber + '.data', 'wb') as filehandle:
-            pickle.dump(ica, filehandle)
-
-    # If we set 'completeICA' to 'False' earlier,
-    #  we will not generate a new ICA solution for
-    #  this participant. Instead, we will make use
-    #  of a solution that we already found earlier.
-    if not completeICA:
-
-        # Let us load the ICA solution from
-        #  the folder we stored it in earlier.
-        with open('../../Output/ICA solutions/P' +
-                  participantNumber + '.data', 'rb') as filehandle:
-            ica = pickle.load(filehandle)
-
-    # When we created our ICA solution for the
-    #  current participant, we essentially
-    #  tried to split up that participant's
-    #  EEG data into various independent parts
-    #  (or 'components'). We can now examine
-    #  all of those components one by one.
-    if False:
-        raw.load_data()
-        ica.plot_components()
-        ica.plot_sources(raw, block=True)
-
-    # We may want to get rid of some of the
-    #  components we have identified, such
-    #  as components that seem to have captured
-    #  ECG or EOG (rather than EEG) activity. I
-    #  already identified all unwanted components
-    #  for each subject. We loaded this information
-    #  into an array called 'unwantedComponentsPer-
-    #  Subject' at step 1.2. Let us extract the
-    #  information that we need from that array.
-    ica.exclude = [int(i) for i in unwantedComponentsPerSubject[int(participantNumber) - 1]]
-
-    # We are now ready to apply the ICA solution
-    #  that we created to our original data. This
-    #  essentially means that we are now ready to
-    #  reconstruct our original EEG data, this
-    #  time with much less noise. Let us do this.
-    ica.apply(raw)
-
-    ### ---------- Step 2.2.11 --------- ###
-
-    # We now filter all major frequency
-    #  drifts from our data, to further
-    #  enhance the data's overall quality.
-    raw.load_data().filter(l_freq=0.1, h_freq=30)
-
-    ### ~~~~~~~~~~~ Epoching ~~~~~~~~~~~ ###
-
-    ### ---------- Step 2.2.12 --------- ###
-
-    # An epoch is a segment of EEG data
-    #  that is centered around an event.
-    #  Let us extract epochs from this
-    #  subject's data. By default, one
-    #  epoch will be created for each
-    #  event. We cannot change this, even
-    #  though we are only interested
-    #  in epochs centered around a spe-
-    #  cific type of event: 'Add[N]_Stim-
-    #  ulusAppears' with N ∈ {0, 1, 2}.
-    #  We can determine how long each
-    #  epoch should be, however. The
-    #  settings that are used here were
-    #  chosen because they seem suitable
-    #  for the epochs we are interested
-    #  in. For details, please see
-    #  sections 2 and 4 of my thesis.
-    epochs = mne.Epochs(raw, events,
-                        event_id=event_dictionary,
-                        tmin=-0.5, tmax=4.0, preload=True)
-
-    ### ---------- Step 2.2.13 --------- ###
-
-    # We already tried to clean our data
-    #  in various ways, but unfortunately
-    #  there may still be some artefacts
-    #  left. We will now throw away all
-    #  epochs that contain major artefacts.
-    #  If the difference between the
-    #  highest recorded amplitude and
-    #  the lowest recorded amplitude in
-    #  an epoch is larger than 150 µV, we
-    #  reject that epoch. Brain activity
-    #  fluctuations are unlikely to cause
-    #  such large amplitude fluctuations.
-    reject_criteria = dict(eeg=150e-6)
-
-    # If the difference between the
-    #  highest recorded amplitude and
-    #  the lowest recorded amplitude in
-    #  an epoch is smaller than 0.1 µV,
-    #  we reject that epoch. Brain ac-
-    #  tivity fluctuations typically
-    #  give rise to larger amplitude
-    #  fluctuations, so it seems there
-    #  has been a measurement error.
-    flat_criteria = dict(eeg=1e-7)
-
-    # Now that we have specified our epoch
-    #  rejection criteria, let us get rid of
-    #  all epochs that meet those criteria.
-    originalNumberOfEpochs = len(epochs)
-    epochs.drop_bad(reject=reject_criteria, flat=flat_criteria)
-
-    # We can print some statistics
-    #  about how many epochs were dropped.
-    if False:
-        epochs.plot_drop_log()
-        remainingNumberOfEpochs = len(epochs)
-        percentageDropped = (originalNumberOfEpochs - remainingNumberOfEpochs)/(originalNumberOfEpochs/100)
-        print("Percentage of epochs that were dropped: {}".format(percentageDropped))
-
-    ### ---------- Step 2.2.14 --------- ###
-
-    # At step 2.2.9, we marked all of
-    #  the bad channels for this subject.
-    #  Instead of simply dropping those
-    #  channels and pretending they were
-    #  never part of our electrode montage,
-    #  we will try to repair them by looking
-    #  at the EEG data that was recorded by
-    #  other (good) channels in the same
-    #  area. This technique is known as
-    #  interpolation. We make use of the
-    #  so-called spherical spline method.
-    epochs.interpolate_bads()
-
-    ### ---------- Step 2.2.15 --------- ###
-
-    # We can visualise the epochs around,
-    #  for example, all events that are
-    #  of type 'Add0_StimulusAppears'.
-    if False:
-        eventsToHighlight_simple = [100, 150, 1, 2, 3, 4, 5, 6, 7, 8, 9, 210,
-                                    201, 202, 203, 204, 205, 206, 207, 208, 209]
-        eventsToHighlight_complex = mne.pick_events(events, include=eventsToHighlight)
-        colourSettings = dict(Add0_StimulusAppears='red', Add0_StimulusDisappears='blue',
-                              Required1='green', Required2='green', Required3='green',
-                              Required4='green', Required5='green', Required6='green',
-                              Required7='green', Required8='green', Required9='green',
-                              Pressed0='purple', Pressed1='purple', Pressed2='purple',
-                              Pressed3='purple', Pressed4='purple', Pressed5='purple',
-                              Pressed6='purple', Pressed7='purple', Pressed8='purple', Pressed9='purple')
-        epochs['Add0_StimulusAppears'].plot(events=eventsToHighlight_complex, event_id=event_dictionary,
-                                            n_epochs=3, block=True, event_color=colourSettings)
-
-    ### ~~~~~~~~~ Power scores ~~~~~~~~~ ###
-
-    # We will now calculate the power scores
-    #  for this participant, one condition at
-    #  a time. We will store the scores in an
-    #  array called 'powerScoresPerCondition'
-    #  and the sampling frequencies in an array
-    #  called 'samplingFrequenciesPerCondition'.
-    #  Please note that the latter is actually
-    #  a bit redundant: we use the same sampling
-    #  frequencies across all three conditions.
-    powerScoresPerCondition = []
-    samplingFrequenciesPerCondition = []
-
-    for condition in range(0, 3):
-
-        epochsForThisCondition = epochs['Add' + str(condition) + '_StimulusAppears']
-        powerScoresForThisCondition, samplingFrequenciesForThisCondition = \
-            mne.time_frequency.psd_multitaper(epochsForThisCondition, picks=['eeg'])
-        powerScoresForThisCondition = np.mean(powerScoresForThisCondition, axis=0)
-
-        # We store the power scores and sampling
-        #  frequencies for this condition in
-        #  the arrays we initialised earlier.
-        powerScoresPerCondition.append(powerScoresForThisCondition)
-        samplingFrequenciesPerCondition.append(samplingFrequenciesForThisCondition)
-
-        # We can visualise the topographical
-        #  distribution of theta activity for
-        #  the current participant-condition tuple.
-        if False:
-            mne.viz.topomap.plot_psds_topomap(
-                psds=powerScoresForThisCondition, freqs=samplingFrequenciesForThisCondition,
-                bands=[(thetaRange[0],thetaRange[1],'Theta')], dB=False, normalize=False,
-                show=True, ch_type='eeg', pos=epochsForThisCondition[0][0].info)
-
-    # We normalise the power
-    #  scores for this participant.
-    sumOfAllPowerScores = \
-        powerScoresPerCondition[0].sum(axis=-1, keepdims=True) + \
-        powerScoresPerCondition[1].sum(axis=-1, keepdims=True) + \
-        powerScoresPerCondition[2].sum(axis=-1, keepdims=True)
-    powerScoresPerCondition[0] /= sumOfAllPowerScores
-    powerScoresPerCondition[1] /= sumOfAllPowerScores
-    powerScoresPerCondition[2] /= sumOfAllPowerScores
-
-    # We store the power scores and sampling
-    #  frequencies for this participant in
-    #  the arrays we initialised earlier for
-    #  this specific purpose at step 2.1.
-    powerScoresPerSubject.append(powerScoresPerCondition)
-    samplingFrequencies.append(samplingFrequenciesPerCondition)
+    selectedFiles.append(mainDirectory + recording['vhdrFile'])
+    selectedRecordings.append(recording)
+
+# The remaining steps (2.2.3 to 2.2.15) can
+#  be found in '/Code/Modules/participant-
+#  Processing.py'. They are carried out for
+#  each selected subject by a function called
+#  'processParticipant'. That function needs
+#  some of the information we loaded at step
+#  1.2, which we collect in a dictionary.
+#  The dictionary also contains the para-
+#  meters of the filter (step 2.2.11), the
+#  length of the epochs (step 2.2.12), the
+#  epoch rejection criteria (step 2.2.13)
+#  and the settings at the top of this file
+#  (see '/Code/Modules/pipelineSettings.py').
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject, globals())
+
+# We check whether the ICA settings that we
+#  entered can be used.
+problem = checkIcaMethods(settings)
+if problem is not None:
+    print("[ERROR] {}".format(problem))
+    exit()
+
+# We check whether epochs are created around
+#  the events of all three conditions.
+problem = checkAnalysedEvents(settings)
+if problem is not None:
+    print("[ERROR] {}".format(problem))
+    exit()
+
+# We check whether the method that we entered
+#  in 'psdMethod' actually exists.
+if psdMethod not in spectralEstimators:
+    print("[ERROR] \'psdMethod\' should be one of the following: {}".format(', '.join(spectralEstimators)))
+    exit()
+
+# We check whether the tables can be stored
+#  in all formats in 'outputFormats'.
+problem = checkOutputFormats(outputFormats)
+if problem is not None:
+    print("[ERROR] {}".format(problem))
+    exit()
+
+# Before we start, we check the files of all
+#  selected subjects: whether the .vhdr, .eeg
+#  and .vmrk files exist (step 2.2.3) and can
+#  be read, and whether the subjects have an
+#  entry in 'Bad channels.txt' and 'Unwanted
+#  components.txt' (see '/Code/Modules/pre-
+#  flightValidation.py'). We report all pro-
+#  blems at once, rather than stopping at the
+#  first one halfway through the run.
+problems = preflightProblems(selectedRecordings, settings)
+if len(problems) > 0:
+    print("[ERROR] The following problems were found before processing started:")
+    for problem in problems:
+        print("  - {}".format(problem))
+    exit()
+
+# We check whether the sampling rate that we
+#  entered in 'downsamplingRate' is high enough.
+if downsamplingRate is not None and downsamplingRate < 2.5 * settings['filterRange'][1]:
+    print("[ERROR] \'downsamplingRate\' should be at least {} Hz".format(2.5 * settings['filterRange'][1]))
+    exit()
+
+# The subjects do not depend on each other,
+#  so if we set 'parallelProcessing' to 'True'
+#  we hand each of them to a worker process.
+#  The results come back in the same order
+#  as the files in 'selectedFiles'. Worker
+#  processes are started by forking the
+#  current process, which is only possible
+#  on Linux and macOS. On other systems, we
+#  simply process the subjects one by one.
+#  If we set 'incrementalProcessing' to 'True',
+#  each subject is only processed again if their
+#  results cannot be found in '/Output/Partici-
+#  pant results' (see '/Code/Modules/partici-
+#  pantProcessing.py').
+subjectLevelStartTime = time.perf_counter()
+processingFunction = processParticipant
+if incrementalProcessing:
+    processingFunction = processParticipantIncrementally
+executor = None
+if parallelProcessing and 'fork' in multiprocessing.get_all_start_methods():
+    executor = ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                   mp_context=multiprocessing.get_context('fork'),
+                                   initializer=limitThreads,
+                                   initargs=(threadsPerWorker,))
+    results = executor.map(processingFunction, selectedFiles, repeat(settings))
+else:
+    results = (processingFunction(file, settings) for file in selectedFiles)
+
+# We store the power scores and sampling
+#  frequencies of all participants in the
+#  arrays we mentioned at step 2.1 as soon
+#  as they come in. We create the arrays
+#  when the first participant comes in. We
+#  also keep the measurement info of the last
+#  participant, which we need at step 4.1, and
+#  the time and memory that each stage of each
+#  participant took, which we need in part 5.
+#  If a participant cannot be processed (e.g.
+#  because their ICA solution is missing), the
+#  worker process raises an error. We report
+#  it here and stop the run.
+numberOfProcessedParticipants = 0
+stageRecordsOfAllParticipants = []
+try:
+    for participantIndex, result in enumerate(results):
+        if powerScoresPerSubject is None:
+            powerScoresPerSubject = np.empty((len(selectedFiles),) + result['powerScores'].shape)
+            participantNumbers = np.empty(len(selectedFiles), dtype=int)
+            samplingFrequencies = result['samplingFrequencies'][0]
+        elif not np.array_equal(result['samplingFrequencies'][0], samplingFrequencies):
+            print("[ERROR] The sampling frequencies of participant {} differ from those "
+                  "of the other participants".format(result['participantNumber']))
+            exit()
+        powerScoresPerSubject[participantIndex] = result['powerScores']
+        participantNumbers[participantIndex] = int(result['participantNumber'])
+        epochsInfo = result['info']
+        stageRecordsOfAllParticipants.extend(result['stageRecords'])
+        if result.get('processedAgain', True):
+            numberOfProcessedParticipants += 1
+except (FileNotFoundError, ValueError) as error:
+    print("[ERROR] {}".format(error))
+    exit()
+if executor is not None:
+    executor.shutdown()
+subjectLevelWallTime = time.perf_counter() - subjectLevelStartTime
+
+# We report how many subjects were actually
+#  processed (rather than loaded).
+if incrementalProcessing:
+    print("{} of {} participants were processed, the results of the others were loaded "
+          "from '/Output/Participant results'.".format(numberOfProcessedParticipants, len(selectedFiles)))
 
 ### ******************************** ###
 ###            ~ Part 3 ~            ###
@@ -591,55 +550,50 @@ for file in files:
 #  scores into a single array, which
 #  contains one (average) power score per
 #  condition-electrode-frequency combination.
-#  We start by creating an array that
-#  contains a list of power scores for each
-#  condition-electrode-frequency combination.
-powerScores_FullSample_notAveragedPerFrequency = [[[[] for i in range(1126)] for j in range(32)] for k in range(3)]
-for condition in range(0, 3):
-    for participant in range (0, len(powerScoresPerSubject)):
-        for electrode in range (0,32):
-            for frequency in range(0, 1126):
-                powerScores_FullSample_notAveragedPerFrequency[condition][electrode][frequency].\
-                    append(powerScoresPerSubject[participant][condition][electrode][frequency])
-
-# We now create an array that contains a
-#  single (average) power score for each
-#  condition-electrode-frequency combination.
-powerScores_FullSample_averagedPerFrequency = [[[] for j in range(32)] for k in range(3)]
-for condition in range(0, 3):
-    for electrode in range (0,32):
-        for frequency in range(0, 1126):
-            listOfPowerScores = powerScores_FullSample_notAveragedPerFrequency[condition][electrode][frequency]
-            averagePowerScore = sum(listOfPowerScores) / len(listOfPowerScores)
-            powerScores_FullSample_averagedPerFrequency[condition][electrode].append(averagePowerScore)
+#  Since the scores of all participants are
+#  stored in one array, we can simply average
+#  over its first dimension (the participants).
+#  Just like the stages of each participant,
+#  we keep track of the time and memory that
+#  this part (and each step of part 4) takes.
+stage = startStage('Aggregation')
+powerScores_FullSample_averagedPerFrequency = powerScoresPerSubject.mean(axis=0)
+
+# In the same way, we can calculate the
+#  median and the standard error of the mean
+#  of each condition-electrode-frequency com-
+#  bination across participants (we export
+#  them at step 4.2). The standard error
+#  needs at least two participants; with a
+#  single participant, it is left empty.
+numberOfParticipants = powerScoresPerSubject.shape[0]
+powerScores_FullSample_medianPerFrequency = np.median(powerScoresPerSubject, axis=0)
+if numberOfParticipants > 1:
+    powerScores_FullSample_standardErrorPerFrequency = \
+        powerScoresPerSubject.std(axis=0, ddof=1) / np.sqrt(numberOfParticipants)
+else:
+    powerScores_FullSample_standardErrorPerFrequency = \
+        np.full(powerScores_FullSample_averagedPerFrequency.shape, np.nan)
 
 ### ----------- Step 3.2 ----------- ###
 
-# Let us now extract a single average theta
-#  power score per electrode, per condition,
-#  per participant from all of our data.
+# Let us now extract a single average power
+#  score per frequency band, per electrode,
+#  per condition, per participant from all
+#  of our data. We do so for the theta band
+#  and for all bands in 'otherFrequencyBands'
+#  at once (see '/Code/Modules/bandPower.py').
 #  We will store the new scores in an array
-#  called 'powerScores_perParticipant_theta'.
-powerScores_perParticipant_theta = []
-
-thetaScoreIndices = []
-for frequencyIndex in range(0, len(samplingFrequencies[0][0])):
-    if thetaRange[0] <= samplingFrequencies[0][0][frequencyIndex] <= thetaRange[1]:
-        thetaScoreIndices.append(frequencyIndex)
-
-for participant in powerScoresPerSubject:
-    conditions = []
-    for condition in participant:
-        electrodes = []
-        for electrode in condition:
-            thetaScores = []
-            for scoreIndex in range(0, len(electrode)):
-                if scoreIndex in thetaScoreIndices:
-                    thetaScores.append(electrode[scoreIndex])
-            averageElectrodeScore_theta = sum(thetaScores) / len(thetaScores)
-            electrodes.append(averageElectrodeScore_theta)
-        conditions.append(electrodes)
-    powerScores_perParticipant_theta.append(conditions)
+#  called 'powerScores_perParticipant_bands'.
+frequencyBands = dict(Theta=thetaRange, **otherFrequencyBands)
+powerScores_perParticipant_bands = \
+    computeBandPower(powerScoresPerSubject, samplingFrequencies, frequencyBands)
+
+# We store the theta power scores in a
+#  separate array called 'powerScores_per-
+#  Participant_theta'.
+powerScores_perParticipant_theta = powerScores_perParticipant_bands[..., 0]
+finishStage(stage, powerScores_perParticipant_bands)
 
 ### ******************************** ###
 ###            ~ Part 4 ~            ###
@@ -653,14 +607,16 @@ for participant in powerScoresPerSubject:
 #  one for each condition. We save the three
 #  theta topoplots as PDF files in a folder
 #  called '/Output/Theta topoplots'.
-for condition in range(0, 3):
+stage = startStage('Plotting')
+for condition in range(powerScoresPerSubject.shape[1]):
     powerScoresForThisCondition = np.array(powerScores_FullSample_averagedPerFrequency[condition])
-    samplingFrequenciesForThisCondition = np.array(samplingFrequencies[0][0])
+    samplingFrequenciesForThisCondition = np.array(samplingFrequencies)
     fig = mne.viz.topomap.plot_psds_topomap(
         psds=powerScoresForThisCondition, freqs=samplingFrequenciesForThisCondition,
         bands=[(thetaRange[0],thetaRange[1],'Theta')], dB=False, normalize=False,
-        show=True, ch_type='eeg', pos=epochsForThisCondition[0][0].info)
+        show=True, ch_type='eeg', pos=epochsInfo)
     fig.savefig(fname="../../Output/Theta topoplots/Add-" + str(condition) + ".pdf", format='pdf')
+finishStage(stage)
 
 ### ----------- Step 4.2 ----------- ###
 
@@ -670,46 +626,49 @@ for condition in range(0, 3):
 #  called '/Output/Theta power scores'. We
 #  do so twice, in two different formats:
 #  the 'wide' format and the 'long' format.
-#  We start by creating a 'wide' table. We
-#  save it in the above-mentioned folder as
-#  an Excel-file called 'Wide format.xlsx'.
-pythonTable_wide = []
-for participantNumber in range (0, len(powerScores_perParticipant_theta)):
-    realParticipantNumber = participantNumber + 1
-    for excludedParticipant in excludedParticipants:
-        if realParticipantNumber >= excludedParticipant:
-            realParticipantNumber += 1
-    newRow = [realParticipantNumber]
-    for conditionNumber in range (0, len(powerScores_perParticipant_theta[participantNumber])):
-        for electrodeNumber in range (0, len(powerScores_perParticipant_theta[participantNumber][conditionNumber])):
-            thetaPowerAverage = powerScores_perParticipant_theta[participantNumber][conditionNumber][electrodeNumber]
-            newRow.append(thetaPowerAverage)
-    pythonTable_wide.append(newRow)
-columns = ['Participant']
-numberOfConditions = len(powerScores_perParticipant_theta[0])
-numberOfElectrodes = len(powerScores_perParticipant_theta[0][0])
-for conditionNumber in range(0, numberOfConditions):
-    for electrodeNumber in range(0, numberOfElectrodes):
-        columns.append('Add' + str(conditionNumber) + '_Electrode' + str(electrodeNumber + 1))
-pandasTable_wide = pd.DataFrame(pythonTable_wide, columns=columns)
-pandasTable_wide.to_excel("../../Output/Theta power scores/Wide format.xlsx")
+#  Both tables are created directly from
+#  the array of theta power scores, and the
+#  identification numbers of the participants
+#  are taken from 'participantNumbers' (see
+#  '/Code/Modules/outputTables.py'). We start
+#  by creating a 'wide' table. We save it in
+#  the above-mentioned folder as a file called
+#  'Wide format' (e.g. 'Wide format.xlsx'), in
+#  every format we entered in 'outputFormats'.
+stage = startStage('Export')
+pandasTable_wide = wideTable(powerScores_perParticipant_theta, participantNumbers)
+writeTable(pandasTable_wide, "../../Output/Theta power scores", "Wide format", outputFormats)
 
 # We continue by  creating a 'long' table.
-#  We save it (in the same folder) as an
-#  Excel-file called 'Long format.xlsx'.
-pythonTable_long = []
-for participantNumber in range (0, len(powerScores_perParticipant_theta)):
-    realParticipantNumber = participantNumber + 1
-    for excludedParticipant in excludedParticipants:
-        if realParticipantNumber >= excludedParticipant:
-            realParticipantNumber += 1
-    for conditionNumber in range (0, len(powerScores_perParticipant_theta[participantNumber])):
-        for electrodeNumber in range (0, len(powerScores_perParticipant_theta[participantNumber][conditionNumber])):
-            thetaPowerAverage = powerScores_perParticipant_theta[participantNumber][conditionNumber][electrodeNumber]
-            newRow = [realParticipantNumber, conditionNumber, electrodeNumber+1, thetaPowerAverage]
-            pythonTable_long.append(newRow)
-pandasTable_long = pd.DataFrame(pythonTable_long, columns=['Participant', 'Condition', 'Electrode', 'Theta power score'])
-pandasTable_long.to_excel("../../Output/Theta power scores/Long format.xlsx")
+#  We save it (in the same folder) as a
+#  file called 'Long format'.
+pandasTable_long = longTable(powerScores_perParticipant_theta, participantNumbers, 'Theta power score')
+writeTable(pandasTable_long, "../../Output/Theta power scores", "Long format", outputFormats)
+
+# If we entered other frequency bands in
+#  'otherFrequencyBands', we also create a
+#  'long' table that contains the power
+#  scores for all bands. We save it in a
+#  folder called '/Output/Band power scores'
+#  as a file called 'Long format'.
+if len(otherFrequencyBands) > 0:
+    pandasTable_long = longTable(powerScores_perParticipant_bands, participantNumbers,
+                                 'Power score', bandNames=frequencyBands)
+    writeTable(pandasTable_long, "../../Output/Band power scores", "Long format", outputFormats)
+
+# We also store the mean, the median and
+#  the standard error of the power scores of
+#  the whole sample (see step 3.1), with one
+#  row per condition-electrode-frequency com-
+#  bination, in a folder called '/Output/
+#  Power spectra' as a file called 'Sample
+#  summary'.
+pandasTable_spectra = spectrumTable({'Mean': powerScores_FullSample_averagedPerFrequency,
+                                     'Median': powerScores_FullSample_medianPerFrequency,
+                                     'Standard error': powerScores_FullSample_standardErrorPerFrequency},
+                                    samplingFrequencies)
+writeTable(pandasTable_spectra, "../../Output/Power spectra", "Sample summary", outputFormats)
+finishStage(stage)
 
 ### ----------- Step 4.3 ----------- ###
 
@@ -738,143 +697,104 @@ pandasTable_long.to_excel("../../Output/Theta power scores/Long format.xlsx")
 #  I did not have to apply it myself, but I hope
 #  that others will be able to benefit from this
 #  implementation in the future. In order to run
-#  the code, please set 'rescaleData' to 'True'.
-rescaleData = False
+#  the code, please run this script with the
+#  option '--rescale', for example by typing
+#  'python "EEG processing pipeline.py" --rescale'.
+rescaleData = commandLineOptions.rescale
 
 if rescaleData:
+    stage = startStage('Rescaling and export')
+
     # The rescaling method of Jing et al. (2006)
     #  allows us to compare only two conditions
     #  with each other at a time, so we will look
     #  at each pair of conditions A, B (with A≠B)
-    #  one by one here. There are three such pairs.
-    conditionPairs = [[0, 1], [0, 2], [1, 2]]
-
-    for conditionPair in conditionPairs:
-        # Which conditions are we going
-        #  to compare with each other in
-        #  this iteration of the loop?
-        conditionA = conditionPair[0]
-        conditionB = conditionPair[1]
-        skippedCondition = ({0, 1, 2} - set(conditionPair)).pop()
-
-        ### ---------- Step 4.3.1 ---------- ###
-
-        # We will now apply the rescaling method.
-        #  We will store the rescaled power score
-        #  averages in a new array called 'power-
-        #  Scores_perParticipant_theta_rescaled'.
-        powerScores_perParticipant_theta_rescaled = []
-
-        for participant in powerScores_perParticipant_theta:
-
-            # Let's load the participant's current
-            #  power scores for both conditions.
-            powerScoresConditionA = participant[conditionA]
-            powerScoresConditionB = participant[conditionB]
-
-            # First, we calculate the scaling factors
-            #  for both conditions (pA and pB).
-            numerator_part1 = 0
-            for electrodeNumber in range(0, 32):
-                numerator_part1 += powerScoresConditionA[electrodeNumber]*powerScoresConditionB[electrodeNumber]
-            numerator_part2 = sum(powerScoresConditionA) * sum(powerScoresConditionB)
-            numerator = 32 * numerator_part1 - numerator_part2
-            denominatorA_part1 = 0
-            for electrodeNumber in range(0, 32):
-                denominatorA_part1 += powerScoresConditionA[electrodeNumber]**2
-            denominatorA_part2 = sum(powerScoresConditionA)**2
-            denominatorA = 32 * denominatorA_part1 - denominatorA_part2
-            denominatorB_part1 = 0
-            for electrodeNumber in range(0, 32):
-                denominatorB_part1 += powerScoresConditionB[electrodeNumber]**2
-            denominatorB_part2 = sum(powerScoresConditionB)**2
-            denominatorB = 32 * denominatorB_part1 - denominatorB_part2
-            pA = numerator / denominatorA
-            pB = numerator / denominatorB
-
-            # Next, we calculate the offsets
-            #  for both conditions (cA and cB).
-            cA = -1 * pA * (sum(powerScoresConditionA)/len(powerScoresConditionA)) + \
-                 (sum(powerScoresConditionB)/len(powerScoresConditionB))
-            cB = -1 * pB * (sum(powerScoresConditionB)/len(powerScoresConditionB)) + \
-                 (sum(powerScoresConditionA)/len(powerScoresConditionA))
-
-            # Finally, we calculate the rescaled
-            #  power scores for both conditions.
-            powerScoresConditionA_rescaled = []
-            for electrodeNumber in range(0, 32):
-                oldScore = powerScoresConditionA[electrodeNumber]
-                newScore = oldScore * pA + cA
-                powerScoresConditionA_rescaled.append(newScore)
-            powerScoresConditionB_rescaled = []
-            for electrodeNumber in range(0, 32):
-                oldScore = powerScoresConditionB[electrodeNumber]
-                newScore = oldScore * pB + cB
-                powerScoresConditionB_rescaled.append(newScore)
-
-            # We store the participant's rescaled
-            #  power scores in the array 'powerScores_
-            #  perParticipant_theta_rescaled' that we
-            #  initialised earlier for this purpose.
-            newScores = [[],[],[]]
-            newScores[conditionA] = powerScoresConditionA_rescaled
-            newScores[conditionB] = powerScoresConditionB_rescaled
-            newScores[skippedCondition] = [-1]*32
-            powerScores_perParticipant_theta_rescaled.append(newScores)
-
-        ### ---------- Step 4.3.2 ---------- ###
-
-        # Now that we have rescaled all theta power
-        #  scores for the pair of conditions that we
-        #  are currently looking at, we can extract
-        #  the rescaled scores for further processing
-        #  in SPSS. We store the extracted data in a
-        #  folder called '/Output/Rescaled theta power
-        #  scores/Add-[condition A] and Add-[condition
-        #  B]'. We do so twice, in two formats: the
-        #  'wide' format and the 'long' format. We
-        #  start by creating a 'wide' table, which
-        #  we save in the above-mentioned folder as
-        #  an Excel-file called 'Wide format.xlsx'.
-        pythonTable_wide = []
-        for participantNumber in range (0, len(powerScores_perParticipant_theta_rescaled)):
-            realParticipantNumber = participantNumber + 1
-            for excludedParticipant in excludedParticipants:
-                if realParticipantNumber >= excludedParticipant:
-                    realParticipantNumber += 1
-            newRow = [realParticipantNumber]
-            for conditionNumber in range (0, len(powerScores_perParticipant_theta_rescaled[participantNumber])):
-                for electrodeNumber in range (0, len(powerScores_perParticipant_theta_rescaled[participantNumber][conditionNumber])):
-                    thetaPowerAverage = powerScores_perParticipant_theta_rescaled[participantNumber][conditionNumber][electrodeNumber]
-                    newRow.append(thetaPowerAverage)
-            pythonTable_wide.append(newRow)
-        columns = ['Participant']
-        numberOfConditions = len(powerScores_perParticipant_theta_rescaled[0])
-        numberOfElectrodes = len(powerScores_perParticipant_theta_rescaled[0][0])
-        for conditionNumber in range(0, numberOfConditions):
-            for electrodeNumber in range(0, numberOfElectrodes):
-                columns.append('Add' + str(conditionNumber) + '_Electrode' + str(electrodeNumber + 1))
-        Path("../../Output/Rescaled theta power scores/Add-" +
-             str(conditionA) + " and Add-" + str(conditionB)).mkdir(parents=True, exist_ok=True)
-        pandasTable_wide = pd.DataFrame(pythonTable_wide, columns=columns)
-        pandasTable_wide.to_excel("../../Output/Rescaled theta power scores/Add-" +
-                                  str(conditionA) + " and Add-" + str(conditionB) + "/Wide format.xlsx")
+    #  one by one here. With three conditions,
+    #  there are three such pairs.
+    numberOfConditions = powerScores_perParticipant_theta.shape[1]
+    conditionPairs = list(combinations(range(numberOfConditions), 2))
+
+    ### ---------- Step 4.3.1 ---------- ###
+
+    # We will now apply the rescaling method to
+    #  all participants and all pairs of condi-
+    #  tions at once (see '/Code/Modules/rescal-
+    #  ing.py'). We will store the rescaled power
+    #  score averages in a new array called 'power-
+    #  Scores_perParticipant_theta_rescaled', with
+    #  one entry per pair-participant-condition-
+    #  electrode combination. The scores of the
+    #  condition that is not part of a pair are
+    #  set to -1 for that pair.
+    rescaling = rescaleConditionPairs(powerScores_perParticipant_theta, conditionPairs)
+    powerScores_perParticipant_theta_rescaled = rescaling['rescaledScores']
+
+    ### ---------- Step 4.3.2 ---------- ###
+
+    # Now that we have rescaled all theta power
+    #  scores, we can extract the rescaled scores
+    #  for further processing in SPSS. For each
+    #  pair of conditions, we store the extracted
+    #  data in a folder called '/Output/Rescaled
+    #  theta power scores/Add-[condition A] and
+    #  Add-[condition B]'. We do so twice, in two
+    #  formats: the 'wide' format and the 'long'
+    #  format.
+    for pairNumber, (conditionA, conditionB) in enumerate(conditionPairs):
+        outputFolder = "../../Output/Rescaled theta power scores/Add-" + \
+                       str(conditionA) + " and Add-" + str(conditionB)
+        rescaledScores = powerScores_perParticipant_theta_rescaled[pairNumber]
+
+        # We start by creating a 'wide' table,
+        #  which we save in the above-mentioned
+        #  folder as a file called 'Wide format'.
+        #  Each row contains all scores of one
+        #  participant.
+        pandasTable_wide = wideTable(rescaledScores, participantNumbers)
+        writeTable(pandasTable_wide, outputFolder, "Wide format", outputFormats)
 
         # We continue by  creating a 'long' table.
-        #  We save it (in the same folder) as an
-        #  Excel-file called 'Long format.xlsx'.
-        pythonTable_long = []
-        for participantNumber in range (0, len(powerScores_perParticipant_theta_rescaled)):
-            realParticipantNumber = participantNumber + 1
-            for excludedParticipant in excludedParticipants:
-                if realParticipantNumber >= excludedParticipant:
-                    realParticipantNumber += 1
-            for conditionNumber in range (0, len(powerScores_perParticipant_theta_rescaled[participantNumber])):
-                for electrodeNumber in range (0, len(powerScores_perParticipant_theta_rescaled[participantNumber][conditionNumber])):
-                    thetaPowerAverage = powerScores_perParticipant_theta_rescaled[participantNumber][conditionNumber][electrodeNumber]
-                    newRow = [realParticipantNumber, conditionNumber, electrodeNumber+1, thetaPowerAverage]
-                    pythonTable_long.append(newRow)
-        columnNames = ['Participant', 'Condition', 'Electrode', 'Rescaled theta power score']
-        pandasTable_long = pd.DataFrame(pythonTable_long, columns=columnNames)
-        pandasTable_long.to_excel("../../Output/Rescaled theta power scores/Add-" +
-                                  str(conditionA) + " and Add-" + str(conditionB) + "/Long format.xlsx")
\ No newline at end of file
+        #  We save it (in the same folder) as a
+        #  file called 'Long format'.
+        pandasTable_long = longTable(rescaledScores, participantNumbers, 'Rescaled theta power score')
+        writeTable(pandasTable_long, outputFolder, "Long format", outputFormats)
+    finishStage(stage)
+
+### ******************************** ###
+###            ~ Part 5 ~            ###
+###            Run report            ###
+### ******************************** ###
+
+### ----------- Step 5.1 ----------- ###
+
+# Throughout this code, we kept track of
+#  the wall time, the CPU time, the peak
+#  memory and the size of the data of each
+#  stage, for each participant (part 2) and
+#  for the sample as a whole (parts 3 and 4).
+#  We store these records in a run report in
+#  a folder called '/Output/Run reports': a
+#  JSON file (which also contains the most
+#  important settings) and a CSV file. This
+#  way, we can see where the time goes, and
+#  compare runs with each other. The report
+#  also contains the time that part 2 took
+#  as a whole. Participants whose results
+#  were loaded from '/Output/Participant
+#  results' have no records.
+runInformation = dict(mneVersion=mne.__version__, numberOfParticipants=len(selectedFiles),
+                      numberOfProcessedParticipants=numberOfProcessedParticipants,
+                      parallelProcessing=parallelProcessing, numberOfWorkers=numberOfWorkers,
+                      threadsPerWorker=threadsPerWorker, rescaleData=rescaleData,
+                      subjectLevelWallTime=subjectLevelWallTime,
+                      settings={name: value for name, value in settings.items()
+                                if name not in ['badChannelsPerSubject', 'unwantedComponentsPerSubject']})
+stageSummary = writeRunReport(stageRecordsOfAllParticipants + collectStageRecords(),
+                              mainDirectory + '/Output/Run reports', runInformation)
+
+# We also print a short summary: for each
+#  stage, how often it was carried out, how
+#  long it took (in total and on average),
+#  how much memory it needed at most, and how
+#  much data it produced on average.
+printStageSummary(stageSummary)
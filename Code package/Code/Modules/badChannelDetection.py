@@ -0,0 +1,240 @@
+# ----------------------------------- #
+#        Bad Channel Detection        #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module proposes bad channels  #
+#  for a recording, based on four     #
+#  statistics per EEG channel:        #
+#  - how much its amplitude deviates  #
+#    from that of the other channels  #
+#    (a robust z-score),              #
+#  - how well it correlates with its  #
+#    nearest neighbours,              #
+#  - how much high-frequency noise it #
+#    contains, compared to the other  #
+#    channels (a robust z-score),     #
+#  - in which share of the recording  #
+#    it is flat.                      #
+#  The statistics are calculated over #
+#  short windows of the data in the   #
+#  .eeg file, which is read without   #
+#  MNE (see '/Code/Modules/brainVi-   #
+#  sion.py'), and summarised with     #
+#  medians, so that a few artefacts   #
+#  do not make a good channel look    #
+#  bad. The proposals are written in  #
+#  the same format as '/Miscellane-   #
+#  ous/Bad channels.txt'.             #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import warnings
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
+from brainVision import readBrainVisionHeader, mapBrainVisionData
+
+# These channels are not EEG channels, so
+#  they are never proposed (see step 2.2.5).
+nonEegChannels = ['hEOG', 'vEOG']
+
+# This factor turns a median absolute devi-
+#  ation into an estimate of the standard
+#  deviation (for normally distributed data).
+madScale = 1.4826
+
+# The correlations between the channels are
+#  calculated for this many windows at a time
+#  (see 'channelStatistics').
+windowsPerBlock = 64
+
+
+# This function calculates robust z-scores:
+#  the distance of each value to the median,
+#  divided by the (scaled) median absolute
+#  deviation. If most values are the same,
+#  the z-scores of those values are zero.
+#  Missing values ('NaN') are ignored.
+def robustZScores(values):
+    median = np.nanmedian(values)
+    deviation = madScale * np.nanmedian(np.abs(values - median))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values == median, 0.0, (values - median) / deviation)
+
+
+# This function finds the 'numberOfNeigh-
+#  bours' nearest neighbours of each channel
+#  in the 10-20 system (see step 2.2.7). We
+#  return one row of channel indices per
+#  channel, or '-1' for channels that are not
+#  part of the montage.
+def nearestNeighbours(channelNames, numberOfNeighbours):
+    positions = mne.channels.make_standard_montage('standard_1020').get_positions()['ch_pos']
+    known = np.array([channelName in positions for channelName in channelNames])
+    coordinates = np.array([positions[channelName] if channelName in positions else np.full(3, np.nan)
+                            for channelName in channelNames])
+    distances = np.linalg.norm(coordinates[:, np.newaxis, :] - coordinates[np.newaxis, :, :], axis=2)
+    distances[~known, :] = np.inf
+    distances[:, ~known] = np.inf
+    np.fill_diagonal(distances, np.inf)
+    neighbours = np.argsort(distances, axis=1)[:, :numberOfNeighbours]
+    neighbours[~known] = -1
+    return neighbours
+
+
+# This function calculates the statistics of
+#  all EEG channels of the recording that be-
+#  longs to 'file'. The data is divided into
+#  windows of 'windowDuration' seconds. We
+#  return the names of the channels and a
+#  dictionary with one array per statistic.
+#  Several recordings may be handled at the
+#  same time (one per worker process), so we
+#  keep as few copies of the recording in
+#  memory as we can.
+def channelStatistics(file, settings):
+    header = readBrainVisionHeader(file)
+    channelIndices = [index for index, channelName in enumerate(header['channelNames'])
+                      if channelName not in nonEegChannels]
+    channelNames = [header['channelNames'][index] for index in channelIndices]
+    samplingFrequency = header['samplingFrequency']
+    data = mapBrainVisionData(header)[:, channelIndices].T.astype(np.float32) * \
+        header['scalingFactors'][channelIndices, np.newaxis].astype(np.float32)
+
+    # We divide the data into windows (the last,
+    #  incomplete window is left out).
+    windowLength = int(round(settings['windowDuration'] * samplingFrequency))
+    numberOfWindows = data.shape[1] // windowLength
+    if numberOfWindows == 0:
+        raise ValueError("\'{}\' is shorter than a single window".format(file))
+
+    # The share of the windows in which the
+    #  channel is flat (just like the flatness
+    #  criteria at step 2.2.13).
+    rawWindows = data[:, :numberOfWindows * windowLength].reshape(len(channelNames), numberOfWindows,
+                                                                  windowLength)
+    flatFractions = np.mean(np.ptp(rawWindows, axis=2) < settings['flatThreshold'], axis=1)
+
+    # We look at the activity between the edges
+    #  of 'bandRange' (for the amplitudes and the
+    #  correlations) and above the upper edge of
+    #  it (for the noise). We filter one channel
+    #  at a time. Of the noise, we only keep the
+    #  standard deviation of each channel. After
+    #  that, we no longer need the unfiltered data.
+    bandFilter = butter(4, settings['bandRange'], btype='bandpass', fs=samplingFrequency, output='sos')
+    noiseFilter = butter(4, settings['bandRange'][1], btype='highpass', fs=samplingFrequency, output='sos')
+    bandData = np.empty(data.shape, dtype=np.float32)
+    noiseDeviations = np.empty(len(channelNames), dtype=np.float32)
+    for channelNumber in range(len(channelNames)):
+        bandData[channelNumber] = sosfiltfilt(bandFilter, data[channelNumber])
+        noiseDeviations[channelNumber] = sosfiltfilt(noiseFilter, data[channelNumber]).astype(np.float32).std()
+    del data, rawWindows
+    windows = bandData[:, :numberOfWindows * windowLength].reshape(len(channelNames), numberOfWindows,
+                                                                   windowLength)
+
+    # The amplitude: the median (over windows)
+    #  of the standard deviation in each window,
+    #  on a logarithmic scale.
+    windowDeviations = windows.std(axis=2)
+    with np.errstate(divide='ignore'):
+        logAmplitudes = np.log(np.median(windowDeviations, axis=1))
+
+    # The correlation with the neighbours: the
+    #  median (over windows) of the average cor-
+    #  relation with the nearest neighbours. All
+    #  correlations of a window are calculated
+    #  at once, for 'windowsPerBlock' windows at
+    #  a time, so that we never need a standard-
+    #  ised copy of the whole recording.
+    neighbours = nearestNeighbours(channelNames, settings['numberOfNeighbours'])
+    neighbourCorrelationsPerWindow = np.empty((numberOfWindows, len(channelNames)))
+    for firstWindow in range(0, numberOfWindows, windowsPerBlock):
+        block = slice(firstWindow, firstWindow + windowsPerBlock)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            standardised = (windows[:, block] - windows[:, block].mean(axis=2, keepdims=True)) / \
+                windowDeviations[:, block, np.newaxis]
+            correlations = np.einsum('cws,dws->wcd', standardised, standardised) / windowLength
+        neighbourCorrelationsPerWindow[block] = \
+            correlations[:, np.arange(len(channelNames))[:, np.newaxis], neighbours].mean(axis=2)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        neighbourCorrelations = np.nanmedian(neighbourCorrelationsPerWindow, axis=0)
+    neighbourCorrelations[neighbours[:, 0] < 0] = np.nan
+
+    # The noise: the standard deviation above
+    #  'bandRange', divided by the standard de-
+    #  viation within it.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        noiseRatios = noiseDeviations / bandData.std(axis=1)
+
+    return channelNames, dict(varianceZScores=robustZScores(logAmplitudes),
+                              neighbourCorrelations=neighbourCorrelations,
+                              noiseZScores=robustZScores(noiseRatios),
+                              flatFractions=flatFractions)
+
+
+# This function proposes the bad channels of
+#  the recording that belongs to 'file'. A
+#  channel is proposed if at least one of its
+#  statistics crosses the threshold for it in
+#  'settings'. We return the participant num-
+#  ber, the names of the channels, their sta-
+#  tistics, the proposed channels and, per
+#  channel, the reasons why it was proposed.
+def detectBadChannels(file, participantNumber, settings):
+    channelNames, statistics = channelStatistics(file, settings)
+    with np.errstate(invalid='ignore'):
+        reasons = {'variance': np.abs(statistics['varianceZScores']) > settings['varianceThreshold'],
+                   'correlation': statistics['neighbourCorrelations'] < settings['correlationThreshold'],
+                   'noise': statistics['noiseZScores'] > settings['noiseThreshold'],
+                   'flat': statistics['flatFractions'] > settings['flatFractionThreshold']}
+    reasonsPerChannel = [', '.join(reason for reason in reasons if reasons[reason][channelNumber])
+                         for channelNumber in range(len(channelNames))]
+    return dict(participantNumber=participantNumber, channelNames=channelNames, statistics=statistics,
+                badChannels=[channelName for channelName, channelReasons in zip(channelNames, reasonsPerChannel)
+                             if channelReasons != ''],
+                reasons=reasonsPerChannel)
+
+
+# This function reads a file in the format of
+#  '/Miscellaneous/Bad channels.txt'. We return
+#  the bad channels per participant number.
+def readBadChannelFile(fileName):
+    badChannels = {}
+    for line in open(fileName, 'r').readlines():
+        if ':' in line:
+            participantName, channels = line.strip().split(':', 1)
+            badChannels[participantName[1:]] = channels.split()
+    return badChannels
+
+
+# This function writes the bad channels per
+#  participant number in the format of '/Mis-
+#  cellaneous/Bad channels.txt' ('Pxx: CH CH').
+def badChannelLines(badChannels):
+    return [('P{}: {}'.format(participantNumber, ' '.join(channels))).strip()
+            for participantNumber, channels in badChannels.items()]
+
+
+# This function compares the proposed bad
+#  channels with the ones in an existing file.
+#  We return one line per participant for whom
+#  they differ, with the channels that would be
+#  added (+) and removed (-).
+def badChannelDifferences(proposedChannels, existingChannels):
+    differences = []
+    for participantNumber, channels in proposedChannels.items():
+        existing = existingChannels.get(participantNumber, [])
+        added = [channel for channel in channels if channel not in existing]
+        removed = [channel for channel in existing if channel not in channels]
+        if participantNumber not in existingChannels:
+            differences.append('P{}: not in the existing file (proposed: {})'.format(
+                participantNumber, ' '.join(channels) or 'none'))
+        elif len(added) > 0 or len(removed) > 0:
+            differences.append('P{}: {}'.format(participantNumber, ' '.join(
+                ['+' + channel for channel in added] + ['-' + channel for channel in removed])))
+    return differences
@@ -0,0 +1,51 @@
+# ----------------------------------- #
+#             Band Power              #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module calculates the average #
+#  power score within one or more     #
+#  frequency bands (e.g. delta, theta,#
+#  alpha and beta) for all parti-     #
+#  cipant-condition-electrode combi-  #
+#  nations at once.                   #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+
+
+# This function creates one row of ones and
+#  zeros per frequency band. Each row has one
+#  entry per sampling frequency, which is 1
+#  if the sampling frequency lies within the
+#  band (limits included) and 0 if it does
+#  not. The bands are given as a dictionary,
+#  e.g. {'Theta': [4.0, 7.0]}.
+def bandMasks(frequencies, bands):
+    frequencies = np.asarray(frequencies)
+    masks = np.zeros((len(bands), len(frequencies)))
+    for bandIndex, (bandName, (lowerLimit, upperLimit)) in enumerate(bands.items()):
+        masks[bandIndex] = (lowerLimit <= frequencies) & (frequencies <= upperLimit)
+        if not masks[bandIndex].any():
+            raise ValueError("There are no sampling frequencies between {} Hz and {} Hz "
+                             "(band '{}')".format(lowerLimit, upperLimit, bandName))
+    return masks
+
+
+# This function calculates the average power
+#  score per band. 'powerScores' can have any
+#  number of dimensions, as long as the last
+#  one corresponds to the sampling frequencies
+#  (e.g. participant x condition x electrode x
+#  frequency). The outcome has the same dimen-
+#  sions, except that the last one corresponds
+#  to the bands (in the order of the dictionary).
+#  All bands are calculated with a single
+#  matrix multiplication, so adding more bands
+#  costs next to nothing.
+def computeBandPower(powerScores, frequencies, bands):
+    masks = bandMasks(frequencies, bands)
+    return np.asarray(powerScores) @ (masks / masks.sum(axis=1, keepdims=True)).T
@@ -0,0 +1,210 @@
+# ----------------------------------- #
+#          BrainVision Files          #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  Each recording made with the Brain-#
+#  Vision Recorder software consists  #
+#  of a .vhdr file (metadata), a .eeg #
+#  file (the raw data) and a .vmrk    #
+#  file (the events). This module     #
+#  reads the .vhdr file directly, so  #
+#  that the .eeg file can be accessed #
+#  without loading it into memory,    #
+#  and the .vmrk file, so that the    #
+#  events can be found without open-  #
+#  ing the .eeg file at all. It can   #
+#  also write recordings in the same  #
+#  format (e.g. synthetic ones).      #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+import re
+import numpy as np
+
+# These are the data types and units that
+#  the BrainVision Recorder software uses,
+#  and how they translate to NumPy data
+#  types and to volts, respectively.
+binaryFormats = {'INT_16': np.dtype('<i2'),
+                 'UINT_16': np.dtype('<u2'),
+                 'INT_32': np.dtype('<i4'),
+                 'IEEE_FLOAT_32': np.dtype('<f4')}
+units = {'V': 1.0, 'mV': 1e-3, 'µV': 1e-6, 'uV': 1e-6, 'nV': 1e-9}
+
+# These are the event codes that MNE gives
+#  to markers (see 'readBrainVisionMarkers'):
+#  'Stimulus/S  7' becomes 7, 'Response/R  7'
+#  becomes 1007, and so on. Markers of other
+#  types are numbered from 10001 onwards.
+markerOffsets = {'Event/': 0, 'Stimulus/S': 0, 'Response/R': 1000, 'Optic/O': 2000}
+otherMarkerCodes = {'New Segment/': 99999, 'SyncStatus/Sync On': 99998}
+firstOtherMarkerCode = 10001
+
+
+# This function reads the sections and
+#  entries of a .vhdr file (or a .vmrk
+#  file, which has the same structure).
+#  We return a dictionary with one dic-
+#  tionary of entries per section.
+def readSections(fileName):
+    with open(fileName, 'rb') as filehandle:
+        content = filehandle.read()
+    try:
+        lines = content.decode('utf-8').splitlines()
+    except UnicodeDecodeError:
+        lines = content.decode('latin-1').splitlines()
+    sections = {}
+    currentSection = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith('[') and line.endswith(']'):
+            currentSection = line[1:-1]
+            sections[currentSection] = {}
+        elif currentSection is not None and '=' in line and not line.startswith(';'):
+            key, value = line.split('=', 1)
+            sections[currentSection][key.strip()] = value
+    return sections
+
+
+# This function reads a .vhdr file. We
+#  return the paths to the .eeg file and
+#  the .vmrk file, the sampling frequency,
+#  the names of the channels, the factor
+#  by which each channel should be multi-
+#  plied to get volts, and the data type
+#  of the .eeg file.
+def readBrainVisionHeader(vhdrFile):
+    sections = readSections(vhdrFile)
+    commonInfos = sections['Common Infos']
+    if commonInfos.get('DataFormat', 'BINARY').upper() != 'BINARY':
+        raise ValueError("'{}' does not refer to binary data".format(vhdrFile))
+    if commonInfos.get('DataOrientation', 'MULTIPLEXED').upper() != 'MULTIPLEXED':
+        raise ValueError("'{}' does not refer to multiplexed data".format(vhdrFile))
+    binaryFormat = sections.get('Binary Infos', {}).get('BinaryFormat', 'INT_16').strip().upper()
+    if binaryFormat not in binaryFormats:
+        raise ValueError("'{}' uses an unknown binary format ('{}')".format(vhdrFile, binaryFormat))
+
+    numberOfChannels = int(commonInfos['NumberOfChannels'])
+    channelNames = []
+    scalingFactors = []
+    for channelNumber in range(1, numberOfChannels + 1):
+        fields = sections['Channel Infos']['Ch' + str(channelNumber)].split(',')
+        fields = fields + [''] * (4 - len(fields))
+        channelNames.append(fields[0].replace('\\1', ','))
+        resolution = float(fields[2]) if fields[2].strip() else 1.0
+        unit = fields[3].strip() if fields[3].strip() else 'µV'
+        scalingFactors.append(resolution * units.get(unit, 1e-6))
+
+    directory = os.path.dirname(vhdrFile)
+    return {'eegFile': os.path.join(directory, commonInfos['DataFile']),
+            'vmrkFile': os.path.join(directory, commonInfos['MarkerFile']),
+            'samplingFrequency': 1e6 / float(commonInfos['SamplingInterval']),
+            'channelNames': channelNames,
+            'scalingFactors': np.array(scalingFactors),
+            'dataType': binaryFormats[binaryFormat]}
+
+
+# This function reads the markers in a .vmrk
+#  file and turns them into events, exactly
+#  like MNE's 'events_from_annotations' does
+#  for a recording that was read with 'read_
+#  raw_brainvision', but without opening the
+#  .eeg file. We return an array with one row
+#  per event: the sample at which it occurred,
+#  a zero and its event code. We also return
+#  the event code of each marker description.
+def readBrainVisionMarkers(vmrkFile):
+    markerInfos = readSections(vmrkFile).get('Marker Infos', {})
+    samples, durations, descriptions = [], [], []
+    for key, value in markerInfos.items():
+        if re.fullmatch(r'Mk\d+', key) is None:
+            continue
+        fields = value.split(',')
+        samples.append(int(fields[2]) - 1)
+        durations.append(int(fields[3]) if fields[3].isdigit() else 0)
+        descriptions.append(fields[0].replace('\\1', ',') + '/' + fields[1].replace('\\1', ','))
+
+    # MNE sorts the markers by their onset
+    #  (and then by their duration), and leaves
+    #  out markers whose description starts with
+    #  'BAD' or 'EDGE'.
+    order = np.lexsort((np.arange(len(samples)), durations, samples))
+    eventCodes = {}
+    otherCode = firstOtherMarkerCode
+    for description in sorted(set(descriptions)):
+        if re.match(r'^(?![Bb][Aa][Dd]|[Ee][Dd][Gg][Ee])', description) is None:
+            continue
+        kind, number = description[:-3], description[-3:].strip()
+        if number.isdigit() and kind in markerOffsets:
+            eventCodes[description] = int(number) + markerOffsets[kind]
+        elif description in otherMarkerCodes:
+            eventCodes[description] = otherMarkerCodes[description]
+        else:
+            eventCodes[description] = otherCode
+            otherCode += 1
+    events = np.array([[samples[index], 0, eventCodes[descriptions[index]]] for index in order
+                       if descriptions[index] in eventCodes], dtype=int).reshape(-1, 3)
+    return events, eventCodes
+
+
+# This function memory-maps the .eeg file
+#  that belongs to a .vhdr file. We return
+#  an array with one row per sample and one
+#  column per channel. Nothing is read from
+#  disk until the array is actually used.
+def mapBrainVisionData(header):
+    data = np.memmap(header['eegFile'], dtype=header['dataType'], mode='r')
+    numberOfChannels = len(header['channelNames'])
+    return data[:len(data) - len(data) % numberOfChannels].reshape(-1, numberOfChannels)
+
+
+# This function writes a recording as a .vhdr,
+#  a .eeg and a .vmrk file, just like the Brain-
+#  Vision Recorder software does: the samples
+#  are stored as 16-bit integers (multiplexed),
+#  in steps of 'resolution' µV. The array 'data'
+#  contains one row per channel (in volts). Each
+#  marker is a (type, description, sample) tuple.
+#  The markers are preceded by a 'New Segment'
+#  marker that holds 'recordingDate' (a date-
+#  time), from which MNE reads the measurement
+#  date.
+def writeBrainVisionFiles(vhdrFile, data, samplingFrequency, channelNames, markers,
+                          recordingDate, resolution=0.1):
+    baseName = os.path.splitext(os.path.basename(vhdrFile))[0]
+    eegFile = os.path.splitext(vhdrFile)[0] + '.eeg'
+    vmrkFile = os.path.splitext(vhdrFile)[0] + '.vmrk'
+
+    samples = np.clip(np.round(np.asarray(data) / (resolution * 1e-6)), -32768, 32767)
+    samples.T.astype(binaryFormats['INT_16']).tofile(eegFile)
+
+    header = ['Brain Vision Data Exchange Header File Version 1.0',
+              '; Data written by the EEG processing pipeline', '',
+              '[Common Infos]', 'Codepage=UTF-8',
+              'DataFile=' + baseName + '.eeg', 'MarkerFile=' + baseName + '.vmrk',
+              'DataFormat=BINARY', 'DataOrientation=MULTIPLEXED',
+              'NumberOfChannels=' + str(len(channelNames)),
+              '; Sampling interval in microseconds',
+              'SamplingInterval={:g}'.format(1e6 / samplingFrequency), '',
+              '[Binary Infos]', 'BinaryFormat=INT_16', '',
+              '[Channel Infos]',
+              '; Each entry: Ch<Channel number>=<Name>,<Reference channel name>,<Resolution>,<Unit>']
+    for channelNumber, channelName in enumerate(channelNames):
+        header.append('Ch{}={},,{:g},µV'.format(channelNumber + 1, channelName.replace(',', '\\1'), resolution))
+    with open(vhdrFile, 'w', encoding='utf-8') as filehandle:
+        filehandle.write('\n'.join(header) + '\n')
+
+    marker = ['Brain Vision Data Exchange Marker File, Version 1.0', '',
+              '[Common Infos]', 'Codepage=UTF-8', 'DataFile=' + baseName + '.eeg', '',
+              '[Marker Infos]',
+              '; Each entry: Mk<Marker number>=<Type>,<Description>,<Position in data points>,'
+              '<Size in data points>,<Channel number (0 = marker is related to all channels)>',
+              'Mk1=New Segment,,1,1,0,' + recordingDate.strftime('%Y%m%d%H%M%S%f')]
+    for markerNumber, (markerType, description, sample) in enumerate(markers):
+        marker.append('Mk{}={},{},{},1,0'.format(markerNumber + 2, markerType, description, sample + 1))
+    with open(vmrkFile, 'w', encoding='utf-8') as filehandle:
+        filehandle.write('\n'.join(marker) + '\n')
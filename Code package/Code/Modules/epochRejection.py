@@ -0,0 +1,136 @@
+# ----------------------------------- #
+#           Epoch Rejection           #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module rejects epochs based   #
+#  on their peak-to-peak amplitudes   #
+#  (see step 2.2.13 of the EEG pro-   #
+#  cessing pipeline). Rather than     #
+#  checking one epoch at a time, we   #
+#  calculate the amplitudes of all    #
+#  epochs and channels at once, and   #
+#  keep them in a small file per      #
+#  participant. Any rejection thres-  #
+#  hold can then be applied to them   #
+#  in an instant, so that we can see  #
+#  how many epochs each threshold     #
+#  would reject without epoching the  #
+#  data again. Just like MNE's        #
+#  'drop_bad', we ignore the channels #
+#  that were marked as bad.           #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+import numpy as np
+
+
+# This function calculates the peak-to-peak
+#  amplitude (the highest minus the lowest
+#  amplitude) of every channel in every epoch,
+#  in one go. The amplitudes of bad channels
+#  are set to 'NaN', so that they can never
+#  cause an epoch to be rejected. We also keep
+#  the event code of each epoch and the names
+#  and types of the channels.
+def peakToPeakAmplitudes(epochs):
+    amplitudes = np.ptp(epochs._data, axis=2)
+    amplitudes[:, [epochs.ch_names.index(channel) for channel in epochs.info['bads']]] = np.nan
+    return dict(amplitudes=amplitudes, eventCodes=epochs.events[:, 2].copy(),
+                channelNames=np.array(epochs.ch_names), channelTypes=np.array(epochs.get_channel_types()))
+
+
+# This function tells us which channels of
+#  which epochs exceed the rejection criteria
+#  ('rejectCriteria') or fall below the flat-
+#  ness criteria ('flatCriteria'). Both are
+#  dictionaries with a threshold per channel
+#  type, just like in MNE. We return two
+#  boolean arrays of the same shape as the
+#  amplitudes: one for each kind of criteria.
+def offendingChannels(amplitudeTable, rejectCriteria, flatCriteria):
+    tooLarge = np.zeros(amplitudeTable['amplitudes'].shape, dtype=bool)
+    tooSmall = np.zeros(amplitudeTable['amplitudes'].shape, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for channelType, threshold in (rejectCriteria or {}).items():
+            channels = amplitudeTable['channelTypes'] == channelType
+            tooLarge[:, channels] = amplitudeTable['amplitudes'][:, channels] > threshold
+        for channelType, threshold in (flatCriteria or {}).items():
+            channels = amplitudeTable['channelTypes'] == channelType
+            tooSmall[:, channels] = amplitudeTable['amplitudes'][:, channels] < threshold
+    return tooLarge, tooSmall
+
+
+# This function does the same as MNE's 'drop_
+#  bad' for epochs that are already loaded:
+#  it drops every epoch in which a channel
+#  meets the rejection or flatness criteria.
+#  The drop log lists the offending channels
+#  of each dropped epoch, just like MNE does.
+#  We return the amplitudes of all epochs
+#  (including the dropped ones).
+def dropBadEpochs(epochs, rejectCriteria, flatCriteria):
+    amplitudeTable = peakToPeakAmplitudes(epochs)
+    tooLarge, tooSmall = offendingChannels(amplitudeTable, rejectCriteria, flatCriteria)
+    rejected = np.where(np.any(tooLarge | tooSmall, axis=1))[0]
+    dropLog = list(epochs.drop_log)
+    for epochNumber in rejected:
+        dropLog[epochs.selection[epochNumber]] += \
+            tuple(amplitudeTable['channelNames'][tooLarge[epochNumber]].tolist()) + \
+            tuple(amplitudeTable['channelNames'][tooSmall[epochNumber]].tolist())
+    epochs.drop(rejected, reason=None)
+    epochs.drop_log = tuple(dropLog)
+    return amplitudeTable
+
+
+# This function calculates, for each rejection
+#  threshold in 'rejectThresholds' (for the
+#  channel type 'channelType'), which share of
+#  the epochs of each event code in 'event-
+#  Codes' would be dropped. The flatness cri-
+#  teria stay the same. We first find the
+#  highest amplitude of each epoch, so that
+#  each threshold only needs one comparison
+#  per epoch. We return an array with one row
+#  per threshold and one column per event code.
+def dropRates(amplitudeTable, rejectThresholds, flatCriteria, eventCodes, channelType='eeg'):
+    channels = amplitudeTable['channelTypes'] == channelType
+    amplitudes = amplitudeTable['amplitudes'][:, channels]
+    highestAmplitudes = np.max(np.where(np.isnan(amplitudes), -np.inf, amplitudes), axis=1, initial=-np.inf)
+    tooLarge, flat = offendingChannels(amplitudeTable, {}, flatCriteria)
+    rejected = (highestAmplitudes[np.newaxis, :] > np.array(rejectThresholds)[:, np.newaxis]) | \
+               np.any(flat, axis=1)[np.newaxis, :]
+    return np.array([[np.mean(rejected[thresholdNumber, amplitudeTable['eventCodes'] == eventCode])
+                      if np.any(amplitudeTable['eventCodes'] == eventCode) else np.nan
+                      for eventCode in eventCodes] for thresholdNumber in range(len(rejectThresholds))])
+
+
+# These functions store the amplitudes of a
+#  participant in the folder '/Output/Peak-to-
+#  peak amplitudes', and load them again. We
+#  keep one file per participant and key (a
+#  hash of everything that the amplitudes de-
+#  pend on), so that amplitudes calculated
+#  with other settings are never overwritten
+#  or mistaken for each other.
+def amplitudeFile(amplitudeDirectory, participantNumber, key):
+    return os.path.join(amplitudeDirectory, 'P' + participantNumber + '-' + key + '.npz')
+
+
+def storeAmplitudes(amplitudeDirectory, participantNumber, key, amplitudeTable):
+    os.makedirs(amplitudeDirectory, exist_ok=True)
+    fileName = amplitudeFile(amplitudeDirectory, participantNumber, key)
+    temporaryFileName = fileName[:-4] + '-' + str(os.getpid()) + '.npz'
+    np.savez(temporaryFileName, **amplitudeTable)
+    os.replace(temporaryFileName, fileName)
+
+
+def loadAmplitudes(amplitudeDirectory, participantNumber, key):
+    fileName = amplitudeFile(amplitudeDirectory, participantNumber, key)
+    if not os.path.exists(fileName):
+        return None
+    with np.load(fileName) as archive:
+        return {name: archive[name] for name in archive.files}
@@ -0,0 +1,144 @@
+# ----------------------------------- #
+#             ICA Storage             #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  An ICA solution consists of a few  #
+#  small matrices and some parameters.#
+#  This module stores those matrices  #
+#  as separate .npy files in a folder #
+#  per participant, together with a   #
+#  file called 'metadata.json' that   #
+#  contains the channel names and the #
+#  fit parameters. Unlike a pickled   #
+#  ICA object, such a folder can be   #
+#  read without unpickling, with any  #
+#  version of MNE and one matrix at a #
+#  time (the matrices can even be     #
+#  memory-mapped).                    #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import json
+import numpy as np
+from mne.preprocessing import ICA
+
+# If the layout of the folders changes
+#  in the future, this number should be
+#  increased, so that old folders can
+#  still be recognised.
+formatVersion = 1
+
+# These are the versions of MNE that can
+#  restore an ICA solution from such a folder
+#  (from the first up to, but not including,
+#  the second). An ICA object has no public
+#  way to set its component names, so we call
+#  the same (private) method that MNE's own
+#  'read_ica' calls. The solutions in '/Out-
+#  put/ICA solutions' were converted with MNE
+#  0.24.1 (see 'requirements.txt').
+supportedMneVersions = [(0, 24), (2, 0)]
+
+# These are the matrices that make up an
+#  ICA solution. The keys are the names of
+#  the .npy files, the values the names of
+#  the corresponding attributes of an ICA
+#  object in MNE.
+icaMatrices = {'preWhitener': 'pre_whitener_',
+               'pcaMean': 'pca_mean_',
+               'pcaComponents': 'pca_components_',
+               'pcaExplainedVariance': 'pca_explained_variance_',
+               'unmixingMatrix': 'unmixing_matrix_',
+               'mixingMatrix': 'mixing_matrix_'}
+
+
+# This function stores an ICA solution in
+#  the given folder. We also store the
+#  positions of the channels, so that the
+#  components can still be plotted later.
+def saveIcaSolution(ica, directory):
+    if ica.noise_cov is not None:
+        raise ValueError("ICA solutions that were whitened with a noise covariance cannot be stored")
+    os.makedirs(directory, exist_ok=True)
+    for fileName, attribute in icaMatrices.items():
+        np.save(os.path.join(directory, fileName + '.npy'), getattr(ica, attribute))
+    channelPositions = np.array([ica.info['chs'][ica.info['ch_names'].index(channel)]['loc'][:3]
+                                 for channel in ica.ch_names])
+    np.save(os.path.join(directory, 'channelPositions.npy'), channelPositions)
+    metadata = {'formatVersion': formatVersion,
+                'mneVersion': mne.__version__,
+                'channelNames': list(ica.ch_names),
+                'samplingFrequency': ica.info['sfreq'],
+                'method': ica.method,
+                'fitParameters': ica.fit_params,
+                'randomState': ica.random_state,
+                'maxIterations': ica.max_iter,
+                'requestedComponents': ica.n_components,
+                'numberOfComponents': int(ica.n_components_),
+                'numberOfPcaComponents': ica.n_pca_components,
+                'numberOfSamples': int(ica.n_samples_),
+                'numberOfIterations': getattr(ica, 'n_iter_', None),
+                'currentFit': ica.current_fit,
+                'exclude': [int(component) for component in ica.exclude]}
+    with open(os.path.join(directory, 'metadata.json'), 'w') as filehandle:
+        json.dump(metadata, filehandle, indent=1)
+
+
+# This function tells us whether the version
+#  of MNE that is installed is supported.
+def mneVersionIsSupported():
+    mneVersion = tuple(int(part) for part in mne.__version__.split('.')[:2])
+    return supportedMneVersions[0] <= mneVersion < supportedMneVersions[1]
+
+
+# This function only reads the channel names
+#  and fit parameters of an ICA solution. We
+#  first check that the installed version of
+#  MNE can restore it.
+def readIcaMetadata(directory):
+    if not mneVersionIsSupported():
+        raise ValueError("ICA solutions can only be restored with MNE {} up to {} (not {})".format(
+            '.'.join(map(str, supportedMneVersions[0])), '.'.join(map(str, supportedMneVersions[1])),
+            mne.__version__))
+    with open(os.path.join(directory, 'metadata.json'), 'r') as filehandle:
+        metadata = json.load(filehandle)
+    if metadata['formatVersion'] > formatVersion:
+        raise ValueError("The ICA solution in '{}' was stored in a newer format "
+                         "(version {})".format(directory, metadata['formatVersion']))
+    return metadata
+
+
+# This function restores an ICA solution
+#  from the given folder. By default, the
+#  matrices are memory-mapped rather than
+#  read into memory in one go.
+def loadIcaSolution(directory, mmapMode='r'):
+    metadata = readIcaMetadata(directory)
+    ica = ICA(n_components=metadata['requestedComponents'],
+              random_state=metadata['randomState'],
+              method=metadata['method'],
+              fit_params=metadata['fitParameters'],
+              max_iter=metadata['maxIterations'])
+    for fileName, attribute in icaMatrices.items():
+        setattr(ica, attribute, np.load(os.path.join(directory, fileName + '.npy'), mmap_mode=mmapMode))
+    ica.current_fit = metadata['currentFit']
+    ica.ch_names = metadata['channelNames']
+    ica.n_components_ = metadata['numberOfComponents']
+    ica.n_pca_components = metadata['numberOfPcaComponents']
+    ica._update_ica_names()
+    ica.n_samples_ = metadata['numberOfSamples']
+    ica.n_iter_ = metadata['numberOfIterations']
+    ica.exclude = metadata['exclude']
+
+    # We rebuild the measurement info of the
+    #  data that the solution was fitted on.
+    channelPositions = np.load(os.path.join(directory, 'channelPositions.npy'))
+    ica.info = mne.create_info(metadata['channelNames'], metadata['samplingFrequency'], 'eeg')
+    ica.info.set_montage(mne.channels.make_dig_montage(
+        ch_pos=dict(zip(metadata['channelNames'], channelPositions)), coord_frame='head'))
+    return ica
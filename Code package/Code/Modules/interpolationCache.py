@@ -0,0 +1,165 @@
+# ----------------------------------- #
+#         Interpolation Cache         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  Bad channels are repaired with     #
+#  spherical spline interpolation     #
+#  (see step 2.2.14 of the EEG pro-   #
+#  cessing pipeline): the data of a   #
+#  bad channel is replaced by a       #
+#  weighted sum of the good channels. #
+#  The weights only depend on the     #
+#  positions of the electrodes and on #
+#  which channels are bad, and many   #
+#  participants share the same bad    #
+#  channels. We therefore calculate   #
+#  the weights (the interpolation     #
+#  matrix) only once per combination  #
+#  of electrode positions, good chan- #
+#  nels and bad channels, and keep    #
+#  them in memory and on disk. The    #
+#  outcome is the same as that of     #
+#  MNE's 'interpolate_bads'.          #
+#  The matrix is calculated with two  #
+#  private functions of MNE, which    #
+#  may change between versions. If    #
+#  they cannot be imported, we fall   #
+#  back on 'interpolate_bads' itself. #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+import json
+import hashlib
+import mne
+import numpy as np
+
+# These are the (private) functions that MNE
+#  uses to calculate interpolation matrices
+#  (in version 0.24, see 'requirements.txt').
+#  If another version of MNE no longer has
+#  them, we set them to 'None'.
+try:
+    from mne.bem import _check_origin
+    from mne.channels.interpolation import _make_interpolation_matrix
+except ImportError:
+    _check_origin, _make_interpolation_matrix = None, None
+
+# The interpolation matrices that were cal-
+#  culated or loaded in this process so far,
+#  by key.
+interpolationMatrices = {}
+
+
+# This function calculates the key of an
+#  interpolation matrix. It depends on the
+#  positions of the EEG electrodes, on the
+#  digitised points of the montage (from
+#  which the centre of the head is derived),
+#  on the names of the good and bad channels
+#  and on the version of MNE.
+def interpolationKey(info, picks, goodChannels, badChannels):
+    positions = np.array([info['chs'][pick]['loc'][:3] for pick in picks])
+    digitisedPoints = np.array([point['r'] for point in info['dig'] or []])
+    keyHash = hashlib.sha256()
+    keyHash.update(json.dumps([mne.__version__, goodChannels, badChannels]).encode())
+    keyHash.update(np.ascontiguousarray(positions, dtype=float).tobytes())
+    keyHash.update(np.ascontiguousarray(digitisedPoints, dtype=float).tobytes())
+    return keyHash.hexdigest()
+
+
+# This function tells us whether the private
+#  functions of MNE could be imported.
+def privateFunctionsAvailable():
+    return _check_origin is not None and _make_interpolation_matrix is not None
+
+
+# This function calculates the interpolation
+#  matrix of the bad channels in 'info', just
+#  like MNE does: the electrodes are assumed
+#  to lie on a sphere around the centre of
+#  the head, which is fitted to the digitised
+#  points of the montage. Without the private
+#  functions of MNE, we let 'interpolate_bads'
+#  repair a recording in which each sample is
+#  a single good channel set to one. The bad
+#  channels then contain the columns of the
+#  matrix.
+def calculateInterpolationMatrix(info, picks, goodMask, badMask):
+    if not privateFunctionsAvailable():
+        probe = np.zeros((len(info['ch_names']), int(goodMask.sum())))
+        probe[np.array(picks)[goodMask], np.arange(int(goodMask.sum()))] = 1.0
+        probeInfo = info.copy()
+        probeInfo['projs'] = []
+        raw = mne.io.RawArray(probe, probeInfo, verbose=False)
+        raw.interpolate_bads(reset_bads=True, mode='accurate', origin='auto', verbose=False)
+        return raw.get_data(picks=np.array(picks)[badMask])
+    origin = _check_origin('auto', info)
+    positions = np.array([info['chs'][pick]['loc'][:3] for pick in picks])
+    return _make_interpolation_matrix(positions[goodMask] - origin, positions[badMask] - origin)
+
+
+# This function returns the interpolation
+#  matrix for the bad channels in 'info'. We
+#  first look in memory, then in 'cacheDirec-
+#  tory', and only calculate the matrix if it
+#  is in neither of them.
+def interpolationMatrix(info, picks, goodMask, badMask, cacheDirectory):
+    goodChannels = [info['ch_names'][pick] for pick in np.array(picks)[goodMask]]
+    badChannels = [info['ch_names'][pick] for pick in np.array(picks)[badMask]]
+    key = interpolationKey(info, picks, goodChannels, badChannels)
+    if key in interpolationMatrices:
+        return interpolationMatrices[key]
+    fileName = os.path.join(cacheDirectory, key + '.npy')
+    if os.path.exists(fileName):
+        matrix = np.load(fileName)
+    else:
+        matrix = calculateInterpolationMatrix(info, picks, goodMask, badMask)
+        os.makedirs(cacheDirectory, exist_ok=True)
+        temporaryFileName = os.path.join(cacheDirectory, key + '-' + str(os.getpid()) + '.npy')
+        np.save(temporaryFileName, matrix)
+        os.replace(temporaryFileName, fileName)
+    interpolationMatrices[key] = matrix
+    return matrix
+
+
+# This function finds the EEG channels in
+#  'info' and the interpolation matrix of the
+#  bad ones among them. We return the matrix
+#  and the names of the good and bad chan-
+#  nels, or 'None' if there are no bad EEG
+#  channels.
+def badChannelInterpolation(info, cacheDirectory):
+    picks = mne.pick_types(info, meg=False, eeg=True, exclude=[])
+    badMask = np.array([info['ch_names'][pick] in info['bads'] for pick in picks], dtype=bool)
+    if len(picks) == 0 or not badMask.any():
+        return None
+    matrix = interpolationMatrix(info, picks, ~badMask, badMask, cacheDirectory)
+    return matrix, [info['ch_names'][pick] for pick in picks[~badMask]], \
+        [info['ch_names'][pick] for pick in picks[badMask]]
+
+
+# This function does the same as MNE's 'inter-
+#  polate_bads' for EEG channels (with the
+#  spherical spline method): the bad channels
+#  of all epochs are replaced by the interpo-
+#  lation matrix times the good channels, in
+#  a single matrix multiplication, and are no
+#  longer marked as bad afterwards. Without
+#  the private functions of MNE, we simply
+#  call 'interpolate_bads'.
+def interpolateBadChannels(epochs, cacheDirectory):
+    if not privateFunctionsAvailable():
+        return epochs.interpolate_bads(reset_bads=True, mode='accurate', origin='auto')
+    interpolation = badChannelInterpolation(epochs.info, cacheDirectory)
+    if interpolation is None:
+        return epochs
+    matrix, goodChannels, badChannels = interpolation
+    goodIndices = [epochs.ch_names.index(channel) for channel in goodChannels]
+    badIndices = [epochs.ch_names.index(channel) for channel in badChannels]
+    epochs._data[:, badIndices, :] = np.matmul(matrix, epochs._data[:, goodIndices, :])
+    epochs.info['bads'] = []
+    return epochs
@@ -0,0 +1,146 @@
+# ----------------------------------- #
+#          Linear Operators           #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  Several pre-processing steps (re-  #
+#  referencing, applying an ICA solu- #
+#  tion) do nothing more than multi-  #
+#  ply the data by a matrix and add   #
+#  an offset. This module writes such #
+#  steps down as explicit matrices,   #
+#  so that they can be applied to any #
+#  piece of the data separately (e.g. #
+#  one chunk of a long recording at a #
+#  time).                             #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+
+
+# This function turns an ICA solution (with
+#  the unwanted components in 'ica.exclude')
+#  into a matrix and an offset. Multiplying
+#  data with one row per channel in 'channel-
+#  Names' by the matrix and then adding the
+#  offset has the same effect as 'ica.apply':
+#  bad channels and channels that were not
+#  part of the ICA solution are left as they
+#  are. We build the matrix from the public
+#  matrices of the ICA solution, just like MNE
+#  does: the data is scaled (pre-whitened),
+#  centred and projected onto the PCA compo-
+#  nents, the wanted ICA components and the
+#  PCA components beyond them are mixed back
+#  in, and the centring and scaling are un-
+#  done. Only the centring needs an offset.
+def icaCleaningOperator(ica, channelNames, badChannels):
+    picks = [channelIndex for channelIndex, channel in enumerate(channelNames)
+             if channel in ica.ch_names and channel not in badChannels]
+    if [channelNames[channelIndex] for channelIndex in picks] != list(ica.ch_names):
+        raise ValueError("The channels of the data do not match the channels of the ICA solution")
+    if any(projector['active'] for projector in ica.info['projs']):
+        raise ValueError("ICA solutions with active projectors cannot be turned into a matrix")
+
+    # How many PCA components are mixed back
+    #  in ('n_pca_components' can be a number,
+    #  a share of the explained variance or
+    #  'None', which means all of them).
+    numberOfComponents = ica.n_components_
+    numberOfPcaComponents = ica.n_pca_components
+    if isinstance(numberOfPcaComponents, float):
+        explainedVariance = np.cumsum(ica.pca_explained_variance_) / np.sum(ica.pca_explained_variance_)
+        numberOfPcaComponents = min(int(np.sum(explainedVariance <= numberOfPcaComponents)) + 1,
+                                    len(explainedVariance))
+    elif numberOfPcaComponents is None:
+        numberOfPcaComponents = ica.pca_components_.shape[0]
+    numberOfPcaComponents = max(numberOfPcaComponents, numberOfComponents)
+    keptComponents = np.concatenate([np.setdiff1d(np.arange(numberOfComponents), ica.exclude),
+                                     np.arange(numberOfComponents, numberOfPcaComponents)]).astype(int)
+
+    # The cleaning in the pre-whitened space.
+    pcaComponents = ica.pca_components_[:numberOfPcaComponents]
+    unmixing = np.eye(numberOfPcaComponents)
+    unmixing[:numberOfComponents, :numberOfComponents] = ica.unmixing_matrix_
+    unmixing = unmixing @ pcaComponents
+    mixing = np.eye(numberOfPcaComponents)
+    mixing[:numberOfComponents, :numberOfComponents] = ica.mixing_matrix_
+    mixing = pcaComponents.T @ mixing
+    cleaning = mixing[:, keptComponents] @ unmixing[keptComponents, :]
+
+    # The scaling (a factor per channel, or a
+    #  whitening matrix if a noise covariance
+    #  was used) and the centring.
+    if ica.noise_cov is None:
+        whitener = np.diag(1 / ica.pre_whitener_[:, 0])
+        dewhitener = np.diag(ica.pre_whitener_[:, 0])
+    else:
+        whitener = ica.pre_whitener_
+        dewhitener = np.linalg.pinv(ica.pre_whitener_, rcond=1e-14)
+    mean = ica.pca_mean_ if ica.pca_mean_ is not None else np.zeros(len(picks))
+
+    offset = np.zeros(len(channelNames))
+    offset[picks] = dewhitener @ (mean - cleaning @ mean)
+    matrix = np.eye(len(channelNames))
+    matrix[np.ix_(picks, picks)] = dewhitener @ cleaning @ whitener
+    return matrix, offset
+
+
+# This function returns the matrix that turns
+#  data with one row per channel in 'input-
+#  Channels' into data with one row per channel
+#  in 'outputChannels': channels that are not
+#  in 'outputChannels' are dropped, and channels
+#  that are not in 'inputChannels' are added as
+#  rows of zeros (like MNE's 'add_reference_
+#  channels' does).
+def channelSelectionOperator(inputChannels, outputChannels):
+    matrix = np.zeros((len(outputChannels), len(inputChannels)))
+    for outputIndex, channel in enumerate(outputChannels):
+        if channel in inputChannels:
+            matrix[outputIndex, inputChannels.index(channel)] = 1
+    return matrix
+
+
+# This function returns the matrix that sub-
+#  tracts the average of the channels in
+#  'referenceChannels' from every channel in
+#  'channelNames' (like MNE's 'set_eeg_refer-
+#  ence' with an average reference does).
+def averageReferenceOperator(channelNames, referenceChannels):
+    matrix = np.eye(len(channelNames))
+    referenceIndices = [channelNames.index(channel) for channel in referenceChannels]
+    matrix[:, referenceIndices] -= 1 / len(referenceIndices)
+    return matrix
+
+
+# This function turns an interpolation matrix
+#  (with one row per bad channel and one
+#  column per good channel) into a matrix that
+#  replaces the bad channels in 'channelNames'
+#  and leaves the other channels as they are.
+def interpolationOperator(interpolationMatrix, channelNames, goodChannels, badChannels):
+    matrix = np.eye(len(channelNames))
+    badIndices = [channelNames.index(channel) for channel in badChannels]
+    goodIndices = [channelNames.index(channel) for channel in goodChannels]
+    matrix[badIndices] = 0
+    matrix[np.ix_(badIndices, goodIndices)] = interpolationMatrix
+    return matrix
+
+
+# This function combines several steps, each
+#  given as a matrix and an offset (or 'None'
+#  if there is no offset), into one matrix and
+#  one offset. The steps are listed in the or-
+#  der in which they would be applied.
+def composeOperators(operators):
+    matrix, offset = operators[0][0], operators[0][1]
+    if offset is None:
+        offset = np.zeros(len(matrix))
+    for nextMatrix, nextOffset in operators[1:]:
+        matrix = nextMatrix @ matrix
+        offset = nextMatrix @ offset + (nextOffset if nextOffset is not None else 0)
+    return matrix, offset
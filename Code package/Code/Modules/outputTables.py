@@ -0,0 +1,130 @@
+# ----------------------------------- #
+#            Output Tables            #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module turns arrays of scores #
+#  (one per participant-condition-    #
+#  electrode combination, and option- #
+#  ally per band) into the 'wide' and #
+#  'long' tables that we use for fur- #
+#  ther processing in SPSS, without   #
+#  looping over the rows. The tables  #
+#  can be stored as Excel files, as   #
+#  CSV files and as Parquet files.    #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import importlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# These are the formats in which tables can
+#  be stored, and the file extensions that
+#  belong to them. Parquet files can only be
+#  written if the 'pyarrow' package (or the
+#  'fastparquet' package) is installed.
+outputExtensions = {'xlsx': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}
+
+
+# This function checks whether all formats
+#  in 'outputFormats' can be written. We
+#  return a description of the first problem
+#  we find, or 'None' if there is none.
+def checkOutputFormats(outputFormats):
+    for outputFormat in outputFormats:
+        if outputFormat not in outputExtensions:
+            return "\'{}\' is not a known output format (choose from: {})".format(
+                outputFormat, ', '.join(outputExtensions))
+        if outputFormat == 'parquet' and not parquetEngineAvailable():
+            return "Parquet files can only be written if \'pyarrow\' or \'fastparquet\' is installed"
+    return None
+
+
+# This function tells us whether one of the
+#  packages that can write Parquet files can
+#  be imported.
+def parquetEngineAvailable():
+    for packageName in ['pyarrow', 'fastparquet']:
+        try:
+            importlib.import_module(packageName)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+# This function creates a 'wide' table from
+#  an array with one score per participant-
+#  condition-electrode combination. Each row
+#  contains all scores of one participant,
+#  whose identification number is taken from
+#  'participantNumbers'.
+def wideTable(scores, participantNumbers):
+    scores = np.asarray(scores)
+    numberOfParticipants, numberOfConditions, numberOfElectrodes = scores.shape
+    columns = ['Add' + str(conditionNumber) + '_Electrode' + str(electrodeNumber + 1)
+               for conditionNumber in range(numberOfConditions)
+               for electrodeNumber in range(numberOfElectrodes)]
+    table = pd.DataFrame(scores.reshape(numberOfParticipants, -1), columns=columns)
+    table.insert(0, 'Participant', np.asarray(participantNumbers))
+    return table
+
+
+# This function creates a 'long' table from
+#  an array with one score per participant-
+#  condition-electrode combination (or per
+#  participant-condition-electrode-band com-
+#  bination, in which case 'bandNames' should
+#  contain the names of the bands). Each row
+#  contains a single score, in a column called
+#  'valueName'.
+def longTable(scores, participantNumbers, valueName, bandNames=None):
+    scores = np.asarray(scores)
+    indices = np.indices(scores.shape).reshape(scores.ndim, -1)
+    columns = {'Participant': np.asarray(participantNumbers)[indices[0]],
+               'Condition': indices[1],
+               'Electrode': indices[2] + 1}
+    if bandNames is not None:
+        columns['Band'] = np.asarray(list(bandNames))[indices[3]]
+    columns[valueName] = scores.reshape(-1)
+    return pd.DataFrame(columns)
+
+
+# This function creates a table that sum-
+#  marises the power spectra of the whole
+#  sample: arrays with one statistic per
+#  condition-electrode-frequency combination
+#  (e.g. the mean, the median and the stan-
+#  dard error across participants), given as
+#  a dictionary with the name of each statis-
+#  tic as its key. Each row contains the sta-
+#  tistics of one combination.
+def spectrumTable(statistics, samplingFrequencies):
+    firstStatistic = np.asarray(next(iter(statistics.values())))
+    indices = np.indices(firstStatistic.shape).reshape(firstStatistic.ndim, -1)
+    columns = {'Condition': indices[0],
+               'Electrode': indices[1] + 1,
+               'Frequency': np.asarray(samplingFrequencies)[indices[2]]}
+    for statisticName, values in statistics.items():
+        columns[statisticName] = np.asarray(values).reshape(-1)
+    return pd.DataFrame(columns)
+
+
+# This function stores a table in the folder
+#  'outputFolder', once for every format in
+#  'outputFormats'. The files are called
+#  'fileName' (followed by the extension).
+def writeTable(table, outputFolder, fileName, outputFormats):
+    Path(outputFolder).mkdir(parents=True, exist_ok=True)
+    for outputFormat in outputFormats:
+        outputFile = outputFolder + '/' + fileName + outputExtensions[outputFormat]
+        if outputFormat == 'xlsx':
+            table.to_excel(outputFile)
+        elif outputFormat == 'csv':
+            table.to_csv(outputFile, index=False)
+        else:
+            table.to_parquet(outputFile, index=False)
@@ -0,0 +1,157 @@
+# ----------------------------------- #
+#           Parameter Sweep           #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module processes a partici-   #
+#  pant with many combinations of     #
+#  parameter values at once (a para-  #
+#  meter sweep), e.g. to find out how #
+#  sensitive the theta power scores   #
+#  are to the theta range or to the   #
+#  epoch rejection criteria. The sub- #
+#  ject-level computations form a     #
+#  chain of stages, and each parame-  #
+#  ter only affects one stage and the #
+#  stages after it. Combinations that #
+#  share the values of all parameters #
+#  up to a certain stage therefore    #
+#  share the outcome of that stage,   #
+#  which we compute only once: one    #
+#  cleaned recording serves all fil-  #
+#  ters, one set of epochs serves all #
+#  spectral estimators, and one set   #
+#  of power scores serves all fre-    #
+#  quency bands.                      #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import json
+import itertools
+from participantProcessing import participantNumberFromFile, cleanRaw, filterRaw, createEpochs, \
+    computePowerScores, checkAnalysedEvents
+from bandPower import computeBandPower
+from runInstrumentation import collectStageRecords
+
+# These are the stages that follow the
+#  cleaning of the data (steps 2.2.4 to
+#  2.2.10, which have no parameters that
+#  can be swept), in order, together with
+#  the parameters that affect them.
+sweepStages = [('Filtered raw', ['filterRange', 'downsamplingRate']),
+               ('Epochs', ['epochWindow', 'analysedEvents', 'rejectCriteria', 'flatCriteria']),
+               ('Power scores', ['psdMethod', 'normalisationRange']),
+               ('Band scores', ['thetaRange', 'otherFrequencyBands'])]
+sweepableParameters = [parameterName for stageName, parameterNames in sweepStages
+                       for parameterName in parameterNames]
+
+
+# This function checks a sweep grid: a dic-
+#  tionary with a list of values for each
+#  parameter that should be swept. We return
+#  a description of the first problem we
+#  find, or 'None' if there is none.
+def checkSweepGrid(sweepGrid):
+    for parameterName, values in sweepGrid.items():
+        if parameterName not in sweepableParameters:
+            return "\'{}\' cannot be swept (choose from: {})".format(parameterName, ', '.join(sweepableParameters))
+        if not isinstance(values, list) or len(values) == 0:
+            return "The values of \'{}\' should be a non-empty list".format(parameterName)
+    for analysedEvents in sweepGrid.get('analysedEvents', []):
+        problem = checkAnalysedEvents(dict(analysedEvents=analysedEvents))
+        if problem is not None:
+            return problem
+    return None
+
+
+# This function lists all combinations of the
+#  values in a sweep grid. Each combination is
+#  a dictionary with one value per parameter.
+def sweepCombinations(sweepGrid):
+    parameterNames = list(sweepGrid)
+    return [dict(zip(parameterNames, values))
+            for values in itertools.product(*[sweepGrid[parameterName] for parameterName in parameterNames])]
+
+
+# This function describes a parameter value
+#  as text, e.g. '[4.0, 7.0]' or '{"eeg":
+#  0.00015}', so that it can be stored in a
+#  table and compared with other values.
+def describeValue(value):
+    return json.dumps(value, sort_keys=True)
+
+
+# This function processes one participant with
+#  every combination of parameter values in
+#  'combinations'. The values in 'settings' are
+#  used for all parameters that are not part of
+#  a combination. We go through the stages one
+#  by one, and at each stage we group the com-
+#  binations by the values of the parameters of
+#  that stage and all stages before it. Each
+#  group needs the outcome of the stage only
+#  once. We return the results of each combina-
+#  tion (the band scores and the numbers of
+#  epochs), how often each stage was carried
+#  out, and the time and memory that each stage
+#  took (see '/Code/Modules/runInstrumentation.py').
+def sweepParticipant(file, settings, combinations):
+    participantNumber = participantNumberFromFile(file)
+    combinations = [dict(settings, **combination) for combination in combinations]
+    results = [None] * len(combinations)
+    numberOfTimesPerStage = {stageName: 0 for stageName, parameterNames in sweepStages}
+
+    # The power scores only need to cover the
+    #  frequency bands of the combinations that
+    #  share them (see 'computePowerScores').
+    #  Since the bands do not affect the power
+    #  scores themselves, we calculate them for
+    #  the smallest range that covers all of
+    #  those bands.
+    def coveringSettings(groupSettings, groupIndices):
+        bandLimits = [limit for index in groupIndices
+                      for band in [combinations[index]['thetaRange']] +
+                      list(combinations[index]['otherFrequencyBands'].values())
+                      for limit in band]
+        return dict(groupSettings, thetaRange=[min(bandLimits), max(bandLimits)], otherFrequencyBands={})
+
+    def carryOutStage(stageNumber, groupSettings, groupIndices, outcome):
+        stageName = sweepStages[stageNumber][0]
+        numberOfTimesPerStage[stageName] += 1
+        if stageName == 'Filtered raw':
+            return filterRaw(outcome.copy(), groupSettings)
+        if stageName == 'Epochs':
+            return createEpochs(outcome, participantNumber, groupSettings)
+        if stageName == 'Power scores':
+            return computePowerScores(outcome, coveringSettings(groupSettings, groupIndices))
+        frequencyBands = dict(Theta=groupSettings['thetaRange'], **groupSettings['otherFrequencyBands'])
+        return dict(bandNames=list(frequencyBands),
+                    bandScores=computeBandPower(outcome['powerScores'], outcome['samplingFrequencies'][0],
+                                                frequencyBands),
+                    numberOfEpochsPerCondition=outcome['numberOfEpochsPerCondition'],
+                    numberOfRejectedEpochs=outcome['numberOfRejectedEpochs'])
+
+    # We walk through the stages depth-first,
+    #  so that only one outcome per stage is
+    #  kept in memory at any time.
+    def visit(stageNumber, groupIndices, outcome):
+        if stageNumber == len(sweepStages):
+            for index in groupIndices:
+                results[index] = outcome
+            return
+        parameterNames = sweepStages[stageNumber][1]
+        groups = {}
+        for index in groupIndices:
+            groupKey = describeValue([combinations[index][parameterName] for parameterName in parameterNames])
+            groups.setdefault(groupKey, []).append(index)
+        for indices in groups.values():
+            nextOutcome = carryOutStage(stageNumber, combinations[indices[0]], indices, outcome)
+            visit(stageNumber + 1, indices, nextOutcome)
+            del nextOutcome
+
+    visit(0, list(range(len(combinations))), cleanRaw(file, participantNumber, settings))
+    return dict(participantNumber=participantNumber, results=results,
+                numberOfTimesPerStage=numberOfTimesPerStage,
+                stageRecords=collectStageRecords(participantNumber))
@@ -0,0 +1,1042 @@
+# ----------------------------------- #
+#       Participant Processing        #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module contains the subject-  #
+#  level computations (part 2) of the #
+#  EEG processing pipeline. They live #
+#  in a separate module so that they  #
+#  can be handed to worker processes: #
+#  every participant can then be pro- #
+#  cessed independently of the others #
+#  on a core of their own.            #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+from os import path
+from mne.preprocessing import ICA
+import numpy as np
+from icaStorage import saveIcaSolution, loadIcaSolution
+from streamingIngestion import streamPreprocessedRaw
+from spectralEstimators import spectralEstimators
+from stageCache import fingerprintFiles, stageKeys, loadStage, storeStage, evictLeastRecentlyUsed
+from participantResults import loadParticipantResult, storeParticipantResult
+from bandPower import computeBandPower
+from runInstrumentation import startStage, finishStage, collectStageRecords
+from epochRejection import dropBadEpochs, storeAmplitudes, loadAmplitudes
+from interpolationCache import interpolateBadChannels, badChannelInterpolation
+from linearOperators import channelSelectionOperator, averageReferenceOperator, interpolationOperator, \
+    icaCleaningOperator, composeOperators
+from recordingCatalog import participantNumberFromFile
+from threadLimits import setThreadingVariables
+
+
+# If several participants are processed at the
+#  same time, every worker process should only
+#  use a few threads for its matrix operations.
+#  Otherwise, 32 workers that each start 32 BLAS
+#  threads would fight over the same 32 cores.
+#  The environment variables only take effect
+#  before NumPy is imported, which is why the
+#  main script also sets them at step 1.1 (see
+#  '/Code/Modules/threadLimits.py'). If
+#  the 'threadpoolctl' package is installed, we
+#  also limit the thread pools that are already
+#  running in the worker process.
+def limitThreads(threadsPerWorker):
+    setThreadingVariables(threadsPerWorker)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=threadsPerWorker)
+
+# This function tells us in which folder
+#  the ICA solution of a participant is stored.
+def icaSolutionDirectory(participantNumber, settings):
+    return settings['mainDirectory'] + '/Output/ICA solutions/P' + participantNumber
+
+
+# This function processes the EEG data of a
+#  single participant: the data is loaded,
+#  cleaned, epoched and turned into power
+#  spectral density scores. The dictionary
+#  'settings' contains everything from part 1
+#  of the main script that is needed to do so.
+#  We return the normalised power scores per
+#  condition, the sampling frequencies and the
+#  measurement info of the epochs (which we
+#  need to draw topoplots later on).
+def processParticipant(file, settings):
+
+    # We derive the identification number
+    #  of this subject from the name of their
+    #  .vhdr file (see step 2.2.1).
+    participantNumber = participantNumberFromFile(file)
+    ### ---------- Step 2.2.3 ---------- ###
+
+    # We recorded our data with the Brain-
+    #  Vision Recorder software. The files
+    #  we refer to in the array we called
+    #  'files' (step 1.2) are .vhdr files.
+    #  For each participant, the BrainVision
+    #  Recorder software we used also gene-
+    #  rated two other (eponymous) files that
+    #  are also important: a .eeg file and a
+    #  .vmrk file. The .vhdr file merely con-
+    #  tains metadata. The .eeg file contains
+    #  the raw data that we need. The .vmrk
+    #  file contains information about events
+    #  (e.g. button presses and stimulus on-
+    #  sets) that occurred during the experi-
+    #  ment. The main script already checked
+    #  that all three files exist and can be
+    #  read, before processing started (see
+    #  '/Code/Modules/preflightValidation.py').
+    #  We do not check them again here: this
+    #  function may run in a worker process,
+    #  which should raise an error rather than
+    #  stop the whole run with 'exit()'.
+
+    # The computations for this participant
+    #  consist of three stages: pre-processing
+    #  the raw data (steps 2.2.4 to 2.2.11),
+    #  creating clean epochs (steps 2.2.8 and
+    #  2.2.12 to 2.2.15) and calculating power
+    #  scores. If we did not set 'useStageCache'
+    #  to 'True', we simply carry them out.
+    if not settings['useStageCache']:
+        raw = preprocessRaw(file, participantNumber, settings)
+        epochs = createEpochs(raw, participantNumber, settings)
+        result = computePowerScores(epochs, settings)
+        result['participantNumber'] = participantNumber
+        result['stageRecords'] = collectStageRecords(participantNumber)
+        return result
+
+    # Otherwise, we look for the outcome of
+    #  the last stage in the stage cache first.
+    #  If it is not there, we look for the
+    #  outcome of the stage before it, and so
+    #  on. We then only need to carry out the
+    #  stages that come after the last stage
+    #  that we found. If we set 'completeICA'
+    #  to 'True', we always start from scratch,
+    #  because a new ICA solution is needed.
+    #  The keys of the stages depend on the ICA
+    #  solution, so we only calculate them once
+    #  the ICA solution is available.
+    cacheDirectory = settings['mainDirectory'] + '/Output/Stage cache'
+    raw, epochs, result = None, None, None
+    if settings['completeICA']:
+        raw = preprocessRaw(file, participantNumber, settings)
+        keys = participantStageKeys(file, participantNumber, settings, cacheDirectory)
+        storeStage(cacheDirectory, 'raw', keys['raw'], raw)
+    else:
+        keys = participantStageKeys(file, participantNumber, settings, cacheDirectory)
+        result = loadStage(cacheDirectory, 'psd', keys['psd'])
+        if result is None:
+            epochs = loadStage(cacheDirectory, 'epochs', keys['epochs'])
+        if result is None and epochs is None:
+            raw = loadStage(cacheDirectory, 'raw', keys['raw'])
+            if raw is None:
+                raw = preprocessRaw(file, participantNumber, settings)
+                storeStage(cacheDirectory, 'raw', keys['raw'], raw)
+    if result is None and epochs is None:
+        epochs = createEpochs(raw, participantNumber, settings)
+        storeStage(cacheDirectory, 'epochs', keys['epochs'], epochs)
+    if result is None:
+        result = computePowerScores(epochs, settings)
+        storeStage(cacheDirectory, 'psd', keys['psd'], result)
+
+    # We make sure that the stage cache does
+    #  not grow beyond the size we allowed.
+    evictLeastRecentlyUsed(cacheDirectory, settings['stageCacheSizeLimit'] * 1e9)
+    result['participantNumber'] = participantNumber
+    result['stageRecords'] = collectStageRecords(participantNumber)
+    return result
+
+
+# This function does the same as 'process-
+#  Participant', but it first looks for the
+#  results of the participant in the folder
+#  '/Output/Participant results' (see '/Code/
+#  Modules/participantResults.py'). If they
+#  are there, and they were stored with the
+#  same input files and parameters, we simply
+#  load them. Otherwise, we process the parti-
+#  cipant and store the results, together with
+#  their band scores (one per condition-elec-
+#  trode-band combination). If we set 'com-
+#  pleteICA' to 'True', every participant is
+#  processed again.
+def processParticipantIncrementally(file, settings):
+    participantNumber = participantNumberFromFile(file)
+    resultDirectory = settings['mainDirectory'] + '/Output/Participant results'
+    fingerprintDirectory = resultDirectory + '/Fingerprints'
+    inputFiles = [file, file[:len(file) - 4] + 'eeg', file[:len(file) - 4] + 'vmrk']
+    key = None
+    if not settings['completeICA'] and all(path.exists(inputFile) for inputFile in inputFiles) \
+            and path.isdir(icaSolutionDirectory(participantNumber, settings)):
+        key = participantStageKeys(file, participantNumber, settings, fingerprintDirectory)['bands']
+        result = loadParticipantResult(resultDirectory, participantNumber, key)
+        if result is not None:
+            result['participantNumber'] = participantNumber
+            result['processedAgain'] = False
+            result['stageRecords'] = []
+            return result
+
+    result = processParticipant(file, settings)
+    if key is None:
+        key = participantStageKeys(file, participantNumber, settings, fingerprintDirectory)['bands']
+    frequencyBands = dict(Theta=settings['thetaRange'], **settings['otherFrequencyBands'])
+    result['bandNames'] = np.array(list(frequencyBands))
+    result['bandScores'] = computeBandPower(result['powerScores'], result['samplingFrequencies'][0], frequencyBands)
+    stageRecords = result.pop('stageRecords')
+    storeParticipantResult(resultDirectory, participantNumber, key, result)
+    result['processedAgain'] = True
+    result['stageRecords'] = stageRecords
+    return result
+
+
+# This function calculates the keys under
+#  which the stages of a participant are
+#  stored in the stage cache. Each key
+#  depends on the participant's .vhdr, .eeg
+#  and .vmrk file, and on every parameter
+#  that affects the stage or the stages
+#  before it (including the version of MNE).
+def participantStageKeys(file, participantNumber, settings, cacheDirectory):
+    inputFiles = [file, file[:len(file) - 4] + 'eeg', file[:len(file) - 4] + 'vmrk']
+    inputFingerprint = fingerprintFiles(inputFiles, cacheDirectory)
+    icaDirectory = icaSolutionDirectory(participantNumber, settings)
+    icaFingerprint = fingerprintFiles([path.join(icaDirectory, fileName)
+                                       for fileName in sorted(os.listdir(icaDirectory))], cacheDirectory)
+
+    # The power scores only depend on the fre-
+    #  quency bands if we entered a 'normali-
+    #  sationRange': only then do we restrict the
+    #  sampling frequencies to the bands (see the
+    #  function 'computePowerScores'). Otherwise,
+    #  changing a band (e.g. 'thetaRange') should
+    #  not make us calculate the power scores
+    #  again. The band scores of the last stage
+    #  ('bands', which is not stored in the stage
+    #  cache but in '/Output/Participant results')
+    #  always depend on the frequency bands.
+    frequencyBands = dict(Theta=settings['thetaRange'], **settings['otherFrequencyBands'])
+    psdFrequencyBands = None
+    if settings['normalisationRange'] is not None:
+        psdFrequencyBands = frequencyBands
+    stageParameters = [
+        ('raw', dict(participantNumber=participantNumber, mneVersion=mne.__version__,
+                     droppedChannels=['hEOG', 'vEOG'], reference=['TP8', 'average'],
+                     montage='standard_1020',
+                     badChannels=settings['badChannelsPerSubject'][int(participantNumber) - 1],
+                     icaSolution=icaFingerprint,
+                     unwantedComponents=settings['unwantedComponentsPerSubject'][int(participantNumber) - 1],
+                     filterRange=settings['filterRange'],
+                     streamingMode=settings['streamingMode'],
+                     fuseSpatialOperators=fusesSpatialOperators(settings),
+                     downsamplingRate=settings['downsamplingRate'])),
+        ('epochs', dict(epochWindow=settings['epochWindow'],
+                        analysedEvents=settings['analysedEvents'],
+                        rejectCriteria=settings['rejectCriteria'],
+                        flatCriteria=settings['flatCriteria'],
+                        interpolation='spherical spline')),
+        ('psd', dict(method=settings['psdMethod'], picks='eeg',
+                     frequencyBands=psdFrequencyBands,
+                     normalisation='sum over conditions and frequencies',
+                     normalisationRange=settings['normalisationRange'],
+                     contents=['powerScores', 'samplingFrequencies',
+                               'numberOfEpochsPerCondition', 'numberOfRejectedEpochs'])),
+        ('bands', dict(frequencyBands=frequencyBands))]
+    return stageKeys(inputFingerprint, stageParameters)
+
+
+# This function carries out the first stage:
+#  it loads the raw data of a participant and
+#  pre-processes it (steps 2.2.4 to 2.2.11).
+#  This happens in two parts: the data is
+#  cleaned (steps 2.2.4 to 2.2.10, see the
+#  function 'cleanRaw') and then filtered
+#  (step 2.2.11, see the function 'filter-
+#  Raw'). A parameter sweep (see '/Code/
+#  Modules/parameterSweep.py') filters the
+#  same cleaned data in several ways.
+def preprocessRaw(file, participantNumber, settings):
+
+    # If we set 'streamingMode' to 'True',
+    #  the recording is processed one chunk
+    #  at a time instead (see below).
+    if settings['streamingMode']:
+        return downsampleRaw(preprocessRawInChunks(file, participantNumber, settings), settings)
+    return filterRaw(cleanRaw(file, participantNumber, settings), settings)
+
+
+# This function loads the raw data of a
+#  participant and cleans it (steps 2.2.4
+#  to 2.2.10).
+def cleanRaw(file, participantNumber, settings):
+
+    # If we set 'fuseSpatialOperators' to 'True',
+    #  the data is re-referenced, cleaned with the
+    #  ICA solution and interpolated in a single
+    #  step instead (see below).
+    if fusesSpatialOperators(settings):
+        return cleanRawFused(file, participantNumber, settings)
+
+    ### ---------- Step 2.2.4 ---------- ###
+
+    # We load the data. Since we make use
+    #  of BrainVision data, we should apply
+    #  a non-standard read function here. We
+    #  keep track of the time and memory that
+    #  this stage (and each of the following
+    #  stages) takes (see '/Code/Modules/run-
+    #  Instrumentation.py').
+    stage = startStage('Load')
+    raw = mne.io.read_raw_brainvision(file, preload=True)
+    finishStage(stage, raw)
+
+    # We can inspect the loaded data.
+    if False:
+        print(raw.info)
+        print(raw.info.ch_names)
+
+    ### ~~~~~~~~ Pre-processing ~~~~~~~~ ###
+
+    ### ---------- Step 2.2.5 ---------- ###
+
+    # We have 32 EEG channels and 2 MISC
+    #  channels. The two MISC channels are
+    #  labeled 'hEOG' and 'vEOG'. They only
+    #  contain useful data for the first 20
+    #  participants or so. We want to treat
+    #  each data file in a similar manner,
+    #  so let us simply discard the two
+    #  MISC channels for all participants.
+    stage = startStage('Reference')
+    raw.drop_channels(['hEOG', 'vEOG'])
+
+    ### ---------- Step 2.2.6 ---------- ###
+
+    # When we recorded our data, we used TP8
+    #  as our reference electrode. It would
+    #  be better to make use of an average
+    #  reference, however, since that would
+    #  reduce a potential bias towards brain
+    #  activity in the left hemisphere. We
+    #  add TP8 to our set of electrodes and
+    #  then calculate an average reference.
+    mne.add_reference_channels(raw, ref_channels=['TP8'], copy=False)
+    raw.set_eeg_reference(ref_channels='average')
+    finishStage(stage, raw)
+
+    ### ---------- Step 2.2.7 ---------- ###
+
+    # We should indicate how the EEG electrodes
+    #  were positioned on the subject's head (i.e.
+    #  what electrode montage we used). We
+    #  made use of the so-called 10-20 system.
+    stage = startStage('Montage')
+    raw.set_montage(mne.channels.make_standard_montage('standard_1020'))
+    finishStage(stage)
+
+    # We can visualise our electrode montage.
+    if False:
+        raw.plot_sensors(kind='topomap', ch_type='eeg', block=True)
+        raw.plot_sensors(kind='3d', ch_type='eeg', block=True)
+
+    # Step 2.2.8, at which we extract all
+    #  events from the data, is carried out
+    #  right before epoching (see the function
+    #  'createEpochs' below). That way, it also
+    #  works on pre-processed data that we
+    #  loaded from the stage cache.
+
+    ### ---------- Step 2.2.9 ---------- ###
+
+    # Were there any bad channels when
+    #  we recorded this participant's
+    #  brain activity? At step 1.2 above,
+    #  we loaded this information into an
+    #  array called 'badChannelsPerSubject'.
+    #  Let us extract the information that
+    #  we need from that array and link it
+    #  to the current subject's EEG data.
+    #  We will interpolate the bad channels
+    #  later, at step 2.2.14 of this code.
+    raw.info['bads'] = settings['badChannelsPerSubject'][int(participantNumber) - 1]
+
+    ### ---------- Step 2.2.10 --------- ###
+
+    # Eye blinks, eye movements, heartbeats
+    #  and environmental factors may have
+    #  caused there to be artefacts (bits
+    #  of noise) in our data. We can try to
+    #  get rid of those artefacts by means
+    #  of a technique known as independent
+    #  component analysis (ICA). If we set
+    #  'completeICA' to 'True' earlier, we
+    #  will now generate a new ICA solution
+    #  for this participant. Please note that
+    #  this may take some time (~90 seconds).
+    if settings['completeICA']:
+
+        #  We first make a copy of our data, which
+        #  we will use to create an ICA solution.
+        stage = startStage('ICA fit')
+        raw_copy = raw.copy()
+
+        # We need to remove all major frequency
+        #  drifts from the copy of our data, since
+        #  such frequency drifts can make it hard
+        #  to create an ICA solution. The reason
+        #  we made a copy of our data earlier, is
+        #  that we do not want to remove any drifts
+        #  from our original data yet at this point.
+        raw_copy.load_data().filter(l_freq=0.1, h_freq=30)
+
+        # We will now create the ICA solution for
+        #  the current participant's data and store
+        #  it (see the function 'fitIcaSolution').
+        ica = fitIcaSolution(raw_copy, participantNumber, settings)
+        finishStage(stage, raw_copy)
+        del raw_copy
+
+    # If we set 'completeICA' to 'False' earlier,
+    #  we will not generate a new ICA solution for
+    #  this participant. Instead, we will make use
+    #  of a solution that we already found earlier.
+    #  Loading the solution is counted as part of
+    #  applying it.
+    stage = startStage('ICA apply')
+    if not settings['completeICA']:
+
+        # Let us load the ICA solution from
+        #  the folder we stored it in earlier.
+        ica = loadParticipantIcaSolution(participantNumber, settings)
+
+    # When we created our ICA solution for the
+    #  current participant, we essentially
+    #  tried to split up that participant's
+    #  EEG data into various independent parts
+    #  (or 'components'). We can now examine
+    #  all of those components one by one.
+    if False:
+        raw.load_data()
+        ica.plot_components()
+        ica.plot_sources(raw, block=True)
+
+    # We may want to get rid of some of the
+    #  components we have identified, such
+    #  as components that seem to have captured
+    #  ECG or EOG (rather than EEG) activity. I
+    #  already identified all unwanted components
+    #  for each subject. We loaded this information
+    #  into an array called 'unwantedComponentsPer-
+    #  Subject' at step 1.2. Let us extract the
+    #  information that we need from that array.
+    ica.exclude = [int(i) for i in settings['unwantedComponentsPerSubject'][int(participantNumber) - 1]]
+
+    # We are now ready to apply the ICA solution
+    #  that we created to our original data. This
+    #  essentially means that we are now ready to
+    #  reconstruct our original EEG data, this
+    #  time with much less noise. Let us do this.
+    ica.apply(raw)
+    finishStage(stage, raw)
+    return raw
+
+
+# This function tells us whether the spatial
+#  steps (re-referencing, the ICA solution and
+#  interpolating bad channels) are combined
+#  into one matrix. In streaming mode, they
+#  are not (see 'preprocessRawInChunks').
+def fusesSpatialOperators(settings):
+    return settings['fuseSpatialOperators'] and not settings['streamingMode']
+
+
+# This function does the same as 'cleanRaw',
+#  but it combines the steps that multiply the
+#  data by a matrix into a single matrix (see
+#  '/Code/Modules/linearOperators.py'): drop-
+#  ping the EOG channels and adding TP8 (step
+#  2.2.5), the average reference (step 2.2.5),
+#  removing the unwanted ICA components (step
+#  2.2.10) and interpolating the bad channels
+#  (step 2.2.14). Since the last one normally
+#  takes place after filtering and epoching,
+#  which treat every channel separately, the
+#  outcome is the same. The bad channels stay
+#  marked as bad until bad epochs have been
+#  dropped (see step 2.2.14), so that they are
+#  ignored there, just like before. To find
+#  the channel information of the outcome, we
+#  carry out the usual steps on a single sample
+#  of the data.
+def cleanRawFused(file, participantNumber, settings):
+    stage = startStage('Load')
+    raw = mne.io.read_raw_brainvision(file, preload=True)
+    finishStage(stage, raw)
+
+    stage = startStage('Spatial operator')
+    template = mne.io.RawArray(raw._data[:, :1].copy(), raw.info.copy(), first_samp=raw.first_samp,
+                               verbose=False)
+    template.drop_channels(['hEOG', 'vEOG'])
+    mne.add_reference_channels(template, ref_channels=['TP8'], copy=False)
+    template.set_eeg_reference(ref_channels='average', verbose=False)
+    template.set_montage(mne.channels.make_standard_montage('standard_1020'))
+    template.info['bads'] = settings['badChannelsPerSubject'][int(participantNumber) - 1]
+    channelNames = template.ch_names
+    operators = [(channelSelectionOperator(raw.ch_names, channelNames), None),
+                 (averageReferenceOperator(channelNames, channelNames), None)]
+    finishStage(stage)
+
+    # If a new ICA solution is needed, we fit it
+    #  on a re-referenced and filtered copy of
+    #  the data, just like at step 2.2.10.
+    if settings['completeICA']:
+        stage = startStage('ICA fit')
+        referenceMatrix = composeOperators(operators)[0]
+        raw_copy = mne.io.RawArray(referenceMatrix @ raw._data, template.info.copy(),
+                                   first_samp=raw.first_samp, verbose=False)
+        raw_copy.filter(l_freq=0.1, h_freq=30)
+        ica = fitIcaSolution(raw_copy, participantNumber, settings)
+        finishStage(stage, raw_copy)
+        del raw_copy
+
+    # We combine all steps into one matrix and
+    #  one offset (the ICA solution adds a con-
+    #  stant to each channel), and apply them to
+    #  the data with a single matrix multiplica-
+    #  tion.
+    stage = startStage('Spatial operator')
+    if not settings['completeICA']:
+        ica = loadParticipantIcaSolution(participantNumber, settings)
+    ica.exclude = [int(i) for i in settings['unwantedComponentsPerSubject'][int(participantNumber) - 1]]
+    operators.append(icaCleaningOperator(ica, channelNames, template.info['bads']))
+    interpolation = badChannelInterpolation(template.info,
+                                            settings['mainDirectory'] + '/Output/Interpolation matrices')
+    if interpolation is not None:
+        interpolationMatrix, goodChannels, badChannels = interpolation
+        operators.append((interpolationOperator(interpolationMatrix, channelNames, goodChannels, badChannels), None))
+    matrix, offset = composeOperators(operators)
+    data = matrix @ raw._data
+    data += offset[:, np.newaxis]
+    cleanedRaw = mne.io.RawArray(data, template.info, first_samp=raw.first_samp, verbose=False)
+    cleanedRaw.set_annotations(raw.annotations)
+    del raw, data
+    finishStage(stage, cleanedRaw)
+    return cleanedRaw
+
+
+# This function filters the cleaned data
+#  of a participant (step 2.2.11).
+def filterRaw(raw, settings):
+
+    ### ---------- Step 2.2.11 --------- ###
+
+    # We now filter all major frequency
+    #  drifts from our data, to further
+    #  enhance the data's overall quality.
+    stage = startStage('Filter')
+    raw.load_data().filter(l_freq=settings['filterRange'][0], h_freq=settings['filterRange'][1])
+    finishStage(stage, raw)
+
+    # If we set 'downsamplingRate', we also
+    #  lower the sampling rate of our data
+    #  (see the function 'downsampleRaw').
+    return downsampleRaw(raw, settings)
+
+
+# After step 2.2.11, our data no longer con-
+#  tains any activity above 30 Hz or so, yet
+#  it is still sampled at 500 Hz. If we set
+#  'downsamplingRate' in the main script, we
+#  resample the data at that (lower) rate.
+#  This makes the epochs much smaller and
+#  the power scores much faster to calculate.
+#  MNE applies an anti-aliasing filter while
+#  resampling. The events are stored in
+#  seconds, so step 2.2.8 finds them at the
+#  right samples of the resampled data.
+def downsampleRaw(raw, settings):
+    if settings['downsamplingRate'] is None:
+        return raw
+    stage = startStage('Downsample')
+    raw.resample(settings['downsamplingRate'])
+    finishStage(stage, raw)
+    return raw
+
+
+# The algorithms that can be used to create
+#  ICA solutions. 'Picard' needs the package
+#  'python-picard'.
+icaMethods = ['fastica', 'picard', 'infomax']
+
+
+# This function checks the ICA settings of the
+#  main script ('icaMethod', 'icaMethodPer-
+#  Participant', 'icaDecimation' and 'ica-
+#  Components'). We return a description of
+#  the first problem we find, or 'None' if
+#  there is none.
+def checkIcaMethods(settings):
+    for method in [settings['icaMethod']] + list(settings['icaMethodPerParticipant'].values()):
+        if method not in icaMethods:
+            return "\'{}\' is not a known ICA algorithm (choose from: {})".format(method, ', '.join(icaMethods))
+        if method == 'picard' and settings['completeICA']:
+            try:
+                import picard
+            except ImportError:
+                return "The \'picard\' algorithm needs the package \'python-picard\'"
+    if not isinstance(settings['icaDecimation'], int) or settings['icaDecimation'] < 1:
+        return "\'icaDecimation\' should be a whole number of at least 1"
+    numberOfComponents = settings['icaComponents']
+    if numberOfComponents is not None and not (isinstance(numberOfComponents, int) and numberOfComponents > 1) \
+            and not (isinstance(numberOfComponents, float) and 0 < numberOfComponents < 1):
+        return "\'icaComponents\' should be \'None\', a number of components or a fraction between 0 and 1"
+    return None
+
+
+# This function creates the ICA solution for
+#  the data in 'raw_copy' (see step 2.2.10).
+#  By default, we make use of the 'FastICA'
+#  algorithm, since I found (after several
+#  trial sessions) that this algorithm tends to
+#  converge faster than its key competitors:
+#  the 'infomax' algorithm and the 'Picard'
+#  algorithm. Since 'FastICA' does not con-
+#  verge for participant 27 (for unknown rea-
+#  sons), 'icaMethodPerParticipant' makes us
+#  use 'Picard' for that subject. The solution
+#  is fitted on every 'icaDecimation'-th sample
+#  and on 'icaComponents' components (by de-
+#  fault: one less than the number of good
+#  channels, since the average reference re-
+#  moves one dimension from the data).
+def createIcaSolution(raw_copy, participantNumber, settings):
+    algorithm = settings['icaMethodPerParticipant'].get(int(participantNumber), settings['icaMethod'])
+    numberOfComponents = settings['icaComponents']
+    if numberOfComponents is None:
+        numberOfComponents = raw_copy.info['nchan']-len(raw_copy.info['bads'])-1
+    ica = ICA(n_components=numberOfComponents, random_state=91, method=algorithm)
+    ica.fit(raw_copy, decim=settings['icaDecimation'])
+    return ica
+
+
+# This function creates the ICA solution of
+#  a participant and stores it in a folder
+#  called '/Output/ICA solutions' so we can use
+#  it again in the future. We store the matri-
+#  ces that make up the solution rather than
+#  the ICA object itself (see '/Code/Modules/
+#  icaStorage.py').
+def fitIcaSolution(raw_copy, participantNumber, settings):
+    ica = createIcaSolution(raw_copy, participantNumber, settings)
+    saveIcaSolution(ica, icaSolutionDirectory(participantNumber, settings))
+    return ica
+
+
+# This function loads the ICA solution that
+#  we stored for a participant earlier. Solu-
+#  tions that were stored as pickled ICA
+#  objects ('P[NN].data') should be converted
+#  first, with the code in '/Code/Other/Con-
+#  verting ICA solutions.py'.
+def loadParticipantIcaSolution(participantNumber, settings):
+    icaDirectory = icaSolutionDirectory(participantNumber, settings)
+    if not path.isdir(icaDirectory):
+        raise FileNotFoundError("The ICA solution \'{}\' could not be found".format(icaDirectory))
+    return loadIcaSolution(icaDirectory)
+
+
+# This function carries out the first stage
+#  in streaming mode (see 'streamingMode' in
+#  the main script). The outcome is the same
+#  as that of 'preprocessRaw', but the data
+#  is processed one chunk at a time and kept
+#  in a memory-mapped file on disk (see
+#  '/Code/Modules/streamingIngestion.py'). If
+#  a new ICA solution is needed, we first
+#  stream a filtered copy of the data (just
+#  like at step 2.2.10) and fit the ICA
+#  solution on it.
+def preprocessRawInChunks(file, participantNumber, settings):
+    badChannels = settings['badChannelsPerSubject'][int(participantNumber) - 1]
+    workingDirectory = settings['mainDirectory'] + '/Output/Temporary files'
+    if settings['completeICA']:
+        stage = startStage('ICA fit')
+        raw_copy = streamPreprocessedRaw(file, badChannels, None, [0.1, 30],
+                                         settings['streamingChunkDuration'], workingDirectory)
+        ica = fitIcaSolution(raw_copy, participantNumber, settings)
+        finishStage(stage, raw_copy)
+        del raw_copy
+    stage = startStage('Streaming pre-processing')
+    if not settings['completeICA']:
+        ica = loadParticipantIcaSolution(participantNumber, settings)
+    ica.exclude = [int(i) for i in settings['unwantedComponentsPerSubject'][int(participantNumber) - 1]]
+    raw = streamPreprocessedRaw(file, badChannels, ica, settings['filterRange'],
+                                settings['streamingChunkDuration'], workingDirectory)
+    finishStage(stage, raw)
+    return raw
+
+
+# This function carries out the second stage:
+#  it extracts epochs from the pre-processed
+#  data and cleans them (steps 2.2.8 and 2.2.12
+#  to 2.2.15). If 'returnAmplitudes' is 'True',
+#  we also return the peak-to-peak amplitudes
+#  of all epochs (see step 2.2.13).
+def createEpochs(raw, participantNumber, settings, returnAmplitudes=False):
+
+    ### ---------- Step 2.2.8 ---------- ###
+
+    # During the experiment, many events
+    #  (e.g. button presses and stimulus
+    #  onsets) occurred. Let us extract all
+    #  event information for the current
+    #  participant from the data and store
+    #  it in an array called 'events'. Finding
+    #  the events is counted as part of epoching.
+    stage = startStage('Epoch')
+    events, notNeeded = mne.events_from_annotations(raw)
+
+    # Each type of event is described by a
+    #  so-called 'stimulus code'. Different
+    #  types of events are described by
+    #  different stimulus codes. Let us in-
+    #  dicate what each stimulus code means.
+    event_dictionary = \
+        {'Required1': 1, 'Required2': 2,
+         'Required3': 3, 'Required4': 4,
+         'Required5': 5, 'Required6': 6,
+         'Required7': 7, 'Required8': 8,
+         'Required9': 9, 'Pressed0': 210,
+         'Pressed1': 201, 'Pressed2': 202,
+         'Pressed3': 203, 'Pressed4': 204,
+         'Pressed5': 205, 'Pressed6': 206,
+         'Pressed7': 207, 'Pressed8': 208,
+         'Pressed9': 209,  'PressedSB': 211,
+         'Add0_StimulusAppears': 100,
+         'Add0_StimulusDisappears': 150,
+         'Add1_StimulusAppears': 101,
+         'Add1_StimulusDisappears': 151,
+         'Add2_StimulusAppears': 102,
+         'Add2_StimulusDisappears': 152,
+         'Practice': 155}
+
+    # There is one stimulus code that we did
+    #  not include in the above dictionary
+    #  yet: '10' (meaning: 'Required0'). That
+    #  code was (by accident) not included in
+    #  the data for participant 1. It was in-
+    #  cluded in the data for the remaining 36
+    #  participants, however, so we will add
+    #  the code to their event dictionaries.
+    if int(participantNumber) != 1:
+        event_dictionary['Required0'] = 10
+
+    # We can visualise which events
+    #  occurred at which points in time.
+    if False:
+        figure = mne.viz.plot_events(events,
+                                     event_id=event_dictionary,
+                                     sfreq=raw.info['sfreq'],
+                                     first_samp=raw.first_samp)
+    ### ~~~~~~~~~~~ Epoching ~~~~~~~~~~~ ###
+
+    ### ---------- Step 2.2.12 --------- ###
+
+    # An epoch is a segment of EEG data
+    #  that is centered around an event.
+    #  Let us extract epochs from this
+    #  subject's data. By default, one
+    #  epoch will be created for each
+    #  event, even though we are only
+    #  interested in epochs centered
+    #  around a specific type of event:
+    #  'Add[N]_StimulusAppears' with
+    #  N ∈ {0, 1, 2}.
+    #  We can determine how long each
+    #  epoch should be, however. The
+    #  settings that are used here were
+    #  chosen because they seem suitable
+    #  for the epochs we are interested
+    #  in. For details, please see
+    #  sections 2 and 4 of my thesis.
+
+    # Only the epochs around the events in
+    #  'analysedEvents' (see the main script)
+    #  are used later on, so we only create
+    #  those. The other events remain in
+    #  'event_dictionary' so that they can
+    #  still be visualised (see above and
+    #  step 2.2.15). If 'analysedEvents' is
+    #  'None', we create epochs for all events.
+    epoching_dictionary = event_dictionary
+    if settings['analysedEvents'] is not None:
+        epoching_dictionary = {eventName: eventCode for eventName, eventCode in event_dictionary.items()
+                               if eventName in settings['analysedEvents']}
+    epochs = mne.Epochs(raw, events,
+                        event_id=epoching_dictionary,
+                        tmin=settings['epochWindow'][0],
+                        tmax=settings['epochWindow'][1], preload=True)
+    finishStage(stage, epochs)
+
+    ### ---------- Step 2.2.13 --------- ###
+
+    # We already tried to clean our data
+    #  in various ways, but unfortunately
+    #  there may still be some artefacts
+    #  left. We will now throw away all
+    #  epochs that contain major artefacts.
+    #  If the difference between the
+    #  highest recorded amplitude and
+    #  the lowest recorded amplitude in
+    #  an epoch is larger than 150 µV, we
+    #  reject that epoch. Brain activity
+    #  fluctuations are unlikely to cause
+    #  such large amplitude fluctuations.
+    reject_criteria = settings['rejectCriteria']
+
+    # If the difference between the
+    #  highest recorded amplitude and
+    #  the lowest recorded amplitude in
+    #  an epoch is smaller than 0.1 µV,
+    #  we reject that epoch. Brain ac-
+    #  tivity fluctuations typically
+    #  give rise to larger amplitude
+    #  fluctuations, so it seems there
+    #  has been a measurement error.
+    flat_criteria = settings['flatCriteria']
+
+    # Now that we have specified our epoch
+    #  rejection criteria, let us get rid of
+    #  all epochs that meet those criteria. We
+    #  calculate the peak-to-peak amplitudes of
+    #  all epochs and channels at once (see
+    #  '/Code/Modules/epochRejection.py'), so
+    #  that other thresholds can be tried with-
+    #  out epoching the data again (see the func-
+    #  tion 'participantAmplitudes' below).
+    originalNumberOfEpochs = len(epochs)
+    stage = startStage('Drop bad epochs')
+    amplitudeTable = dropBadEpochs(epochs, reject_criteria, flat_criteria)
+    finishStage(stage, epochs)
+
+    # We can print some statistics
+    #  about how many epochs were dropped.
+    if False:
+        epochs.plot_drop_log()
+        remainingNumberOfEpochs = len(epochs)
+        percentageDropped = (originalNumberOfEpochs - remainingNumberOfEpochs)/(originalNumberOfEpochs/100)
+        print("Percentage of epochs that were dropped: {}".format(percentageDropped))
+
+    ### ---------- Step 2.2.14 --------- ###
+
+    # At step 2.2.9, we marked all of
+    #  the bad channels for this subject.
+    #  Instead of simply dropping those
+    #  channels and pretending they were
+    #  never part of our electrode montage,
+    #  we will try to repair them by looking
+    #  at the EEG data that was recorded by
+    #  other (good) channels in the same
+    #  area. This technique is known as
+    #  interpolation. We make use of the
+    #  so-called spherical spline method.
+    #  Since many participants have the same
+    #  bad channels, the interpolation matrix
+    #  of each set of bad channels is stored in
+    #  a folder called '/Output/Interpolation
+    #  matrices' and used again (see '/Code/
+    #  Modules/interpolationCache.py').
+    #  If we set 'fuseSpatialOperators' to 'True',
+    #  the bad channels were already interpolated
+    #  before filtering, so we only need to stop
+    #  marking them as bad.
+    stage = startStage('Interpolate bad channels')
+    if fusesSpatialOperators(settings):
+        epochs.info['bads'] = []
+    else:
+        interpolateBadChannels(epochs, settings['mainDirectory'] + '/Output/Interpolation matrices')
+    finishStage(stage, epochs)
+
+    ### ---------- Step 2.2.15 --------- ###
+
+    # We can visualise the epochs around,
+    #  for example, all events that are
+    #  of type 'Add0_StimulusAppears'.
+    if False:
+        eventsToHighlight_simple = [100, 150, 1, 2, 3, 4, 5, 6, 7, 8, 9, 210,
+                                    201, 202, 203, 204, 205, 206, 207, 208, 209]
+        eventsToHighlight_complex = mne.pick_events(events, include=eventsToHighlight)
+        colourSettings = dict(Add0_StimulusAppears='red', Add0_StimulusDisappears='blue',
+                              Required1='green', Required2='green', Required3='green',
+                              Required4='green', Required5='green', Required6='green',
+                              Required7='green', Required8='green', Required9='green',
+                              Pressed0='purple', Pressed1='purple', Pressed2='purple',
+                              Pressed3='purple', Pressed4='purple', Pressed5='purple',
+                              Pressed6='purple', Pressed7='purple', Pressed8='purple', Pressed9='purple')
+        epochs['Add0_StimulusAppears'].plot(events=eventsToHighlight_complex, event_id=event_dictionary,
+                                            n_epochs=3, block=True, event_color=colourSettings)
+
+    if returnAmplitudes:
+        return epochs, amplitudeTable
+    return epochs
+
+
+# This function returns the peak-to-peak
+#  amplitudes of a participant's epochs (see
+#  step 2.2.13). They are stored in a folder
+#  called '/Output/Peak-to-peak amplitudes',
+#  under the key of the epoching stage (see
+#  the function 'participantStageKeys'). That
+#  key depends on the input files, the ICA
+#  solution and every parameter up to and
+#  including the epoching, so the amplitudes
+#  are only loaded if they were calculated in
+#  exactly the same way. Otherwise, we pre-
+#  process and epoch the data and store them.
+#  If we set 'completeICA' to 'True', a new
+#  ICA solution is needed first, so we always
+#  start from scratch.
+def participantAmplitudes(file, settings):
+    participantNumber = participantNumberFromFile(file)
+    amplitudeDirectory = settings['mainDirectory'] + '/Output/Peak-to-peak amplitudes'
+    fingerprintDirectory = amplitudeDirectory + '/Fingerprints'
+    amplitudeTable, raw = None, None
+    if settings['completeICA']:
+        raw = preprocessRaw(file, participantNumber, settings)
+    else:
+        key = participantStageKeys(file, participantNumber, settings, fingerprintDirectory)['epochs']
+        amplitudeTable = loadAmplitudes(amplitudeDirectory, participantNumber, key)
+    if amplitudeTable is None:
+        if raw is None:
+            raw = preprocessRaw(file, participantNumber, settings)
+        epochs, amplitudeTable = createEpochs(raw, participantNumber, settings, returnAmplitudes=True)
+        key = participantStageKeys(file, participantNumber, settings, fingerprintDirectory)['epochs']
+        storeAmplitudes(amplitudeDirectory, participantNumber, key, amplitudeTable)
+    amplitudeTable['participantNumber'] = participantNumber
+    return amplitudeTable
+
+
+# The power scores are calculated for the
+#  epochs around the onsets of the stimuli in
+#  the three conditions.
+conditionNames = ['Add' + str(condition) + '_StimulusAppears' for condition in range(0, 3)]
+
+
+# This function checks 'analysedEvents' (see
+#  the main script): epochs should be created
+#  around the onsets of the stimuli in all
+#  three conditions. We return a description
+#  of the problem, or 'None' if there is none.
+def checkAnalysedEvents(settings):
+    if settings['analysedEvents'] is None:
+        return None
+    missingConditions = [conditionName for conditionName in conditionNames
+                         if conditionName not in settings['analysedEvents']]
+    if len(missingConditions) > 0:
+        return "\'analysedEvents\' should be \'None\' or contain {}".format(', '.join(missingConditions))
+    return None
+
+
+# This function carries out the third stage:
+#  it calculates the power scores of all
+#  conditions and normalises them.
+def computePowerScores(epochs, settings):
+
+    ### ~~~~~~~~~ Power scores ~~~~~~~~~ ###
+
+    # We will now calculate the power scores
+    #  for this participant. We only need the
+    #  scores within the frequency bands we
+    #  are interested in (see 'thetaRange' and
+    #  'otherFrequencyBands' in the main script)
+    #  and within the range of frequencies that
+    #  we use to normalise them (see 'normali-
+    #  sationRange'). We therefore only keep the
+    #  sampling frequencies between the lowest
+    #  and the highest of those limits. If we
+    #  set 'normalisationRange' to 'None', we
+    #  keep all sampling frequencies.
+    frequencyBands = dict(Theta=settings['thetaRange'], **settings['otherFrequencyBands'])
+    normalisationRange = settings['normalisationRange']
+    lowestFrequency, highestFrequency = 0, np.inf
+    if normalisationRange is not None:
+        lowestFrequency = min([normalisationRange[0]] + [band[0] for band in frequencyBands.values()])
+        highestFrequency = max([normalisationRange[1]] + [band[1] for band in frequencyBands.values()])
+
+    # We calculate the power scores of all
+    #  epochs of all three conditions at once,
+    #  so that the tapers of the multitaper
+    #  method only have to be created once. We
+    #  use the method that we chose in 'psd-
+    #  Method' (see '/Code/Modules/spectral-
+    #  Estimators.py').
+    stage = startStage('Power scores')
+    epochsForAllConditions = epochs[conditionNames]
+    powerScoresPerEpoch, samplingFrequencies = \
+        spectralEstimators[settings['psdMethod']](epochsForAllConditions, lowestFrequency, highestFrequency)
+    finishStage(stage, powerScoresPerEpoch)
+
+    # We then average the power scores over
+    #  the epochs of each condition. We store
+    #  the outcome in an array called 'power-
+    #  ScoresPerCondition'. Please note that
+    #  all three conditions share the same
+    #  sampling frequencies.
+    eventCodes = epochsForAllConditions.events[:, 2]
+    powerScoresPerCondition = np.array(
+        [np.mean(powerScoresPerEpoch[eventCodes == epochs.event_id[conditionName]], axis=0)
+         for conditionName in conditionNames])
+
+    # We also count how many epochs of each
+    #  condition were used, and how many epochs
+    #  were rejected at step 2.2.13.
+    numberOfEpochsPerCondition = np.array(
+        [np.sum(eventCodes == epochs.event_id[conditionName]) for conditionName in conditionNames])
+    numberOfRejectedEpochs = sum(1 for reasons in epochs.drop_log
+                                 if len(reasons) > 0 and reasons != ('IGNORED',))
+
+    # We can visualise the topographical
+    #  distribution of theta activity for
+    #  each participant-condition tuple.
+    if False:
+        for condition in range(len(conditionNames)):
+            mne.viz.topomap.plot_psds_topomap(
+                psds=powerScoresPerCondition[condition], freqs=samplingFrequencies,
+                bands=[(settings['thetaRange'][0],settings['thetaRange'][1],'Theta')], dB=False, normalize=False,
+                show=True, ch_type='eeg', pos=epochsForAllConditions.info)
+
+    # We normalise the power scores for this
+    #  participant: per electrode, we divide
+    #  them by the sum of the scores of all
+    #  three conditions within the normali-
+    #  sation range (or at all frequencies).
+    normalisationMask = np.ones(len(samplingFrequencies), dtype=bool)
+    if normalisationRange is not None:
+        normalisationMask = (normalisationRange[0] <= samplingFrequencies) & \
+                            (samplingFrequencies <= normalisationRange[1])
+    sumOfAllPowerScores = powerScoresPerCondition[..., normalisationMask].sum(axis=-1, keepdims=True).sum(axis=0)
+    powerScoresPerCondition /= sumOfAllPowerScores
+
+    # We return the power scores, the sampling
+    #  frequencies and the numbers of epochs for
+    #  this participant, so they can be stored
+    #  in the arrays that were initialised at
+    #  step 2.1.
+    return {'powerScores': powerScoresPerCondition,
+            'samplingFrequencies': np.array([samplingFrequencies] * len(conditionNames)),
+            'numberOfEpochsPerCondition': numberOfEpochsPerCondition,
+            'numberOfRejectedEpochs': numberOfRejectedEpochs,
+            'info': epochsForAllConditions.info}
@@ -0,0 +1,67 @@
+# ----------------------------------- #
+#         Participant Results         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module keeps the results of   #
+#  each participant (power scores,    #
+#  band scores, numbers of epochs and #
+#  the measurement info) in a folder  #
+#  called '/Output/Participant re-    #
+#  sults', one file per participant.  #
+#  Each file also contains a key that #
+#  depends on the participant's input #
+#  files and on all parameters that   #
+#  affect the results. When new data  #
+#  comes in, only the participants    #
+#  that are new or whose key changed  #
+#  have to be processed again. Unlike #
+#  the stage cache, these files are   #
+#  never deleted automatically.       #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import numpy as np
+
+
+# This function tells us in which files the
+#  results of a participant are stored.
+def participantResultFiles(resultDirectory, participantNumber):
+    return (os.path.join(resultDirectory, 'P' + participantNumber + '.npz'),
+            os.path.join(resultDirectory, 'P' + participantNumber + '-info.fif'))
+
+
+# This function loads the results of a
+#  participant. If they cannot be found, or
+#  if they were stored under another key, we
+#  return 'None'.
+def loadParticipantResult(resultDirectory, participantNumber, key):
+    resultFile, infoFile = participantResultFiles(resultDirectory, participantNumber)
+    if not os.path.exists(resultFile) or not os.path.exists(infoFile):
+        return None
+    with np.load(resultFile) as archive:
+        if str(archive['key']) != key:
+            return None
+        result = {name: archive[name] for name in archive.files if name != 'key'}
+    result['info'] = mne.io.read_info(infoFile)
+    return result
+
+
+# This function stores the results of a
+#  participant under the given key. Just like
+#  in the stage cache, we first write to tem-
+#  porary files and then rename them, so that
+#  no file is ever only partly written.
+def storeParticipantResult(resultDirectory, participantNumber, key, result):
+    os.makedirs(resultDirectory, exist_ok=True)
+    resultFile, infoFile = participantResultFiles(resultDirectory, participantNumber)
+    temporaryResultFile = resultFile[:-4] + '-' + str(os.getpid()) + '.npz'
+    temporaryInfoFile = infoFile[:-9] + '-' + str(os.getpid()) + '-info.fif'
+    mne.io.write_info(temporaryInfoFile, result['info'])
+    np.savez(temporaryResultFile, key=key, **{name: result[name] for name in result if name != 'info'})
+    os.replace(temporaryInfoFile, infoFile)
+    os.replace(temporaryResultFile, resultFile)
@@ -0,0 +1,219 @@
+# ----------------------------------- #
+#         Performance Scoring         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module scores the answers     #
+#  that the participants gave during  #
+#  the Add-n task. Each trial starts  #
+#  with an event that tells us the    #
+#  condition (100, 101 or 102), which #
+#  is followed by the four digits     #
+#  that would have been correct (1 to #
+#  10, where 10 stands for '0') and,  #
+#  after those, by the keys that the  #
+#  participant pressed (201 to 210,   #
+#  where 210 stands for '0', and 211  #
+#  for the space bar). Rather than    #
+#  walking through the events one by  #
+#  one, we find all trials, digits    #
+#  and key presses at once with       #
+#  NumPy, for all conditions in one   #
+#  go. Exceptions for individual par- #
+#  ticipants are read from '/Miscel-  #
+#  laneous/Scoring exceptions.txt'.   #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import re
+import numpy as np
+import pandas as pd
+from brainVision import readBrainVisionMarkers
+
+# These are the event codes that mark the
+#  start of a trial in each condition, the
+#  number of digits per trial and the number
+#  of trials per condition (two blocks of 20).
+conditionCodes = {'Add-0': 100, 'Add-1': 101, 'Add-2': 102}
+digitsPerTrial = 4
+trialsPerCondition = 40
+
+
+# This function scores all trials in an array
+#  of event codes ('codes', in the order in
+#  which the events occurred). The first two
+#  events ('99999' and '10001') are never part
+#  of a trial. Trials that start at one of the
+#  positions in 'skippedTrials' are left out.
+#  For each trial, the required digits are the
+#  first four digits after its start. The en-
+#  tered digits are the first four key presses
+#  in the series of key presses (and space
+#  bars) that follows the first event after
+#  the required digits that is not a space
+#  bar. We return, per trial: the position of
+#  its first event, its condition code, the
+#  required and entered digits (with -1 for
+#  digits that are missing) and the number of
+#  entered digits that were correct.
+def scoreTrials(codes, skippedTrials=()):
+    # We add an event that is neither a digit
+    #  nor a key press to the end, so that every
+    #  search below ends within the array.
+    codes = np.append(np.asarray(codes, dtype=int), -1)
+    positions = np.arange(len(codes))
+    trialStarts = positions[np.isin(codes, list(conditionCodes.values())) & (positions >= 2)]
+    trialStarts = np.setdiff1d(trialStarts, np.asarray(skippedTrials, dtype=int))
+
+    # The required digits.
+    digitPositions = positions[(1 <= codes) & (codes <= 10)]
+    digitIndices = np.searchsorted(digitPositions, trialStarts, side='right')[:, np.newaxis] + \
+        np.arange(digitsPerTrial)
+    digitFound = digitIndices < len(digitPositions)
+    requiredPositions = np.append(digitPositions, len(codes) - 1)[np.minimum(digitIndices, len(digitPositions))]
+    requiredDigits = np.where(digitFound, codes[requiredPositions], -1)
+
+    # The entered digits.
+    otherThanSpaceBar = positions[codes != 211]
+    answerStarts = otherThanSpaceBar[np.searchsorted(otherThanSpaceBar, requiredPositions[:, -1], side='right')]
+    otherThanKeyPress = positions[(codes < 201) | (codes > 211)]
+    answerStops = otherThanKeyPress[np.searchsorted(otherThanKeyPress, answerStarts)]
+    keyPositions = positions[(201 <= codes) & (codes <= 210)]
+    keyIndices = np.searchsorted(keyPositions, answerStarts)[:, np.newaxis] + np.arange(digitsPerTrial)
+    enteredPositions = np.append(keyPositions, len(codes) - 1)[np.minimum(keyIndices, len(keyPositions))]
+    keyFound = (keyIndices < len(keyPositions)) & (enteredPositions < answerStops[:, np.newaxis])
+    enteredDigits = np.where(keyFound, codes[enteredPositions] - 200, -1)
+
+    correctDigits = (requiredDigits == enteredDigits) & digitFound & keyFound
+    return dict(trialStarts=trialStarts, conditions=codes[trialStarts], requiredDigits=requiredDigits,
+                enteredDigits=enteredDigits, numberOfCorrectDigits=correctDigits.sum(axis=1))
+
+
+# This function adds up the number of correct
+#  digits of all trials per condition.
+def correctDigitsPerCondition(trials):
+    return {conditionName: int(trials['numberOfCorrectDigits'][trials['conditions'] == conditionCode].sum())
+            for conditionName, conditionCode in conditionCodes.items()}
+
+
+# This function reads the exceptions in 'file-
+#  Name' (see '/Miscellaneous/Scoring excep-
+#  tions.txt'). Each line starts with the
+#  participant ('Pxx:'), followed by one of
+#  these exceptions:
+#  - 'fixedTotals Add-0=... Add-1=... Add-2=...'
+#    replaces the scores of all conditions
+#    by the given numbers of correct digits,
+#  - 'skipTrial ...' leaves out the trials
+#    that start at the given event numbers,
+#  - 'warning ...' adds the rest of the line
+#    as a warning to the outcomes.
+#  Empty lines and lines that start with '#'
+#  are ignored. We return a dictionary with
+#  the exceptions per participant number.
+def readScoringExceptions(fileName):
+    exceptions = {}
+    for lineNumber, line in enumerate(open(fileName, 'r').readlines(), start=1):
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+        match = re.fullmatch(r'P(\d+):\s*(\w+)\s*(.*)', line)
+        if match is None:
+            raise ValueError("line {} of \'{}\' does not start with \'Pxx:\'".format(lineNumber, fileName))
+        participantNumber, kind, arguments = match.groups()
+        participantExceptions = exceptions.setdefault(participantNumber, noExceptions())
+        if kind == 'fixedTotals':
+            fixedTotals = dict(argument.split('=') for argument in arguments.split())
+            if sorted(fixedTotals) != sorted(conditionCodes):
+                raise ValueError("line {} of \'{}\' should give a total for each of the conditions {}".format(
+                    lineNumber, fileName, ', '.join(conditionCodes)))
+            participantExceptions['fixedTotals'] = {condition: int(fixedTotals[condition])
+                                                    for condition in conditionCodes}
+        elif kind == 'skipTrial':
+            participantExceptions['skippedTrials'] += [int(argument) for argument in arguments.split()]
+        elif kind == 'warning':
+            participantExceptions['warnings'].append(arguments)
+        else:
+            raise ValueError("line {} of \'{}\' contains an unknown exception (\'{}\')".format(
+                lineNumber, fileName, kind))
+    return exceptions
+
+
+# These are the exceptions of a participant
+#  who is not mentioned in the file.
+def noExceptions():
+    return dict(fixedTotals=None, skippedTrials=[], warnings=[])
+
+
+# This function scores one participant: it
+#  reads the events from 'vmrkFile', applies
+#  the exceptions of the participant and
+#  scores all trials. We return the partici-
+#  pant number, a table with one row per trial
+#  (see 'trialTable') and the number of cor-
+#  rect digits per condition. Participants
+#  with fixed totals have no rows in the
+#  table, since their events cannot be scored
+#  trial by trial.
+def scoreParticipant(vmrkFile, participantNumber, exceptions):
+    participantExceptions = exceptions.get(participantNumber, noExceptions())
+    events, eventCodes = readBrainVisionMarkers(vmrkFile)
+    if participantExceptions['fixedTotals'] is not None:
+        return dict(participantNumber=participantNumber, trials=trialTable(participantNumber, events, None),
+                    correctDigits=dict(participantExceptions['fixedTotals']))
+    trials = scoreTrials(events[:, 2], participantExceptions['skippedTrials'])
+    return dict(participantNumber=participantNumber, trials=trialTable(participantNumber, events, trials),
+                correctDigits=correctDigitsPerCondition(trials))
+
+
+# This function creates a table with one row
+#  per trial: the participant, the condition,
+#  the number of the trial within its condi-
+#  tion, the event number and sample at which
+#  it started, the required and entered digits
+#  (as typed, so '0' instead of '10', and '-'
+#  for missing ones) and the number of entered
+#  digits that were correct.
+def trialTable(participantNumber, events, trials):
+    columns = ['Participant', 'Condition', 'Trial', 'Event', 'Sample', 'Required digits', 'Entered digits',
+               'Correct digits']
+    if trials is None or len(trials['trialStarts']) == 0:
+        return pd.DataFrame(columns=columns)
+    conditionNames = {conditionCode: conditionName for conditionName, conditionCode in conditionCodes.items()}
+    conditions = pd.Series(trials['conditions'])
+    return pd.DataFrame({'Participant': int(participantNumber),
+                         'Condition': conditions.map(conditionNames),
+                         'Trial': conditions.groupby(conditions).cumcount() + 1,
+                         'Event': trials['trialStarts'],
+                         'Sample': events[trials['trialStarts'], 0],
+                         'Required digits': typedDigits(trials['requiredDigits']),
+                         'Entered digits': typedDigits(trials['enteredDigits']),
+                         'Correct digits': trials['numberOfCorrectDigits']}, columns=columns)
+
+
+# This function writes each row of digits as
+#  they were typed (e.g. '0 8 4 7').
+def typedDigits(digits):
+    return [' '.join(str(digit % 10) if digit >= 0 else '-' for digit in row) for row in digits]
+
+
+# This function creates a table with one row
+#  per participant and condition: the number
+#  of correct digits, the percentage of the
+#  digits that could have been correct (see
+#  'trialsPerCondition'), whether the total
+#  was fixed in the exceptions, and the warn-
+#  ings for the participant.
+def totalsTable(participantResults, exceptions):
+    rows = []
+    for result in participantResults:
+        participantExceptions = exceptions.get(result['participantNumber'], noExceptions())
+        for condition, correctDigits in result['correctDigits'].items():
+            rows.append([int(result['participantNumber']), condition, correctDigits,
+                         correctDigits / (trialsPerCondition * digitsPerTrial / 100),
+                         participantExceptions['fixedTotals'] is not None,
+                         '; '.join(participantExceptions['warnings'])])
+    return pd.DataFrame(rows, columns=['Participant', 'Condition', 'Correct digits', 'Percentage correct',
+                                       'Fixed total', 'Warnings'])
@@ -0,0 +1,70 @@
+# ----------------------------------- #
+#          Pipeline Settings          #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  The subject-level computations of  #
+#  the EEG processing pipeline need a #
+#  dictionary with settings (see step #
+#  2.2 of the main script). This mo-  #
+#  dule puts that dictionary together #
+#  from the settings at the top of    #
+#  the main script, so that other     #
+#  scripts can use exactly the same   #
+#  settings as a (copied) pipeline,   #
+#  by reading them from its file      #
+#  rather than typing them again.     #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import ast
+
+# These are the settings at the top of the
+#  main script that the subject-level compu-
+#  tations need.
+participantSettingNames = ['completeICA', 'icaMethod', 'icaMethodPerParticipant', 'icaDecimation',
+                           'icaComponents', 'thetaRange', 'otherFrequencyBands', 'normalisationRange',
+                           'psdMethod', 'useStageCache', 'stageCacheSizeLimit', 'streamingMode',
+                           'streamingChunkDuration', 'fuseSpatialOperators', 'downsamplingRate',
+                           'analysedEvents']
+
+# These settings are fixed: the parameters
+#  of the filter (step 2.2.11), the length
+#  of the epochs (step 2.2.12) and the epoch
+#  rejection criteria (step 2.2.13).
+fixedSettings = dict(filterRange=[0.1, 30], epochWindow=[-0.5, 4.0],
+                     rejectCriteria=dict(eeg=150e-6), flatCriteria=dict(eeg=1e-7))
+
+
+# This function reads the settings at the top
+#  of a (copy of the) main script, without
+#  running it: every line of the form 'name =
+#  value' above the line that marks the start
+#  of the code. We return them by name.
+def readScriptSettings(scriptFile):
+    with open(scriptFile, 'r', encoding='utf-8') as filehandle:
+        script = filehandle.read()
+    settingsPart = script[:script.index('# =============== CODE')]
+    scriptSettings = {}
+    for statement in ast.parse(settingsPart).body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 and \
+                isinstance(statement.targets[0], ast.Name):
+            scriptSettings[statement.targets[0].id] = ast.literal_eval(statement.value)
+    return scriptSettings
+
+
+# This function puts together the settings
+#  of the subject-level computations, from
+#  the main directory, the bad channels and
+#  unwanted components per participant, and
+#  the settings at the top of the main script
+#  ('scriptSettings', which may contain other
+#  settings as well).
+def participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject, scriptSettings):
+    return dict(mainDirectory=mainDirectory,
+                badChannelsPerSubject=badChannelsPerSubject,
+                unwantedComponentsPerSubject=unwantedComponentsPerSubject,
+                **{name: scriptSettings[name] for name in participantSettingNames},
+                **fixedSettings)
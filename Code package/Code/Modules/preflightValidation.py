@@ -0,0 +1,120 @@
+# ----------------------------------- #
+#         Preflight Validation        #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  Before the EEG processing pipeline #
+#  starts processing, we check all    #
+#  selected recordings: whether their #
+#  .vhdr, .eeg and .vmrk files exist  #
+#  and can be read, whether the size  #
+#  of the .eeg file fits the number   #
+#  of channels and the data format in #
+#  the .vhdr file, whether there are  #
+#  any markers, and whether the par-  #
+#  ticipant has an entry in '/Miscel- #
+#  laneous/Bad channels.txt' and in   #
+#  '/Miscellaneous/Unwanted compo-    #
+#  nents.txt' (and, if needed, a      #
+#  stored ICA solution). We check the #
+#  entries of the recording catalog   #
+#  (see '/Code/Modules/recordingCata- #
+#  log.py'), which was brought up to  #
+#  date just before, so no recording  #
+#  is opened again. All problems are  #
+#  reported together, so that a typo  #
+#  no longer ends a run halfway.      #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+from recordingCatalog import recordingProblem
+from participantProcessing import icaSolutionDirectory
+
+
+# This function reads the lines of one of
+#  the files in '/Miscellaneous' that have one
+#  line per participant ('Pxx: ...'). The
+#  pipeline takes the entry of participant N
+#  from line N, so that is where we look.
+def participantLines(fileName):
+    return [line.strip() for line in open(fileName, 'r').readlines()]
+
+
+# This function checks whether line N of a
+#  file with one line per participant belongs
+#  to participant N. We return a description
+#  of the problem, or 'None' if there is none.
+def checkParticipantLine(lines, fileName, participantNumber):
+    lineNumber = int(participantNumber)
+    if lineNumber > len(lines) or not lines[lineNumber - 1].startswith('P' + participantNumber + ':'):
+        return "\'{}\' has no entry for P{} on line {}".format(os.path.basename(fileName), participantNumber,
+                                                                 lineNumber)
+    return None
+
+
+# This function checks a single recording,
+#  given by its entry in the recording cata-
+#  log. We return a list with a description
+#  of every problem we found (which is empty
+#  if there are none).
+def checkRecording(recording, settings, badChannelLines, componentLines):
+    participantNumber = recording['participantNumber']
+    file = settings['mainDirectory'] + recording['vhdrFile']
+
+    # The entries in '/Miscellaneous'.
+    badChannelProblem = checkParticipantLine(
+        badChannelLines, settings['mainDirectory'] + '/Miscellaneous/Bad channels.txt', participantNumber)
+    componentProblem = checkParticipantLine(
+        componentLines, settings['mainDirectory'] + '/Miscellaneous/Unwanted components.txt', participantNumber)
+    problems = [problem for problem in [badChannelProblem, componentProblem] if problem is not None]
+    if componentProblem is None and \
+            not all(component.isdigit() for component in componentLines[int(participantNumber) - 1][5:].split()):
+        problems.append("\'Unwanted components.txt\' contains a component for P{} that is not a number".format(
+            participantNumber))
+
+    # The stored ICA solution (only needed if
+    #  we do not create a new one).
+    if not settings['completeICA'] and not os.path.isdir(icaSolutionDirectory(participantNumber, settings)):
+        problems.append("The ICA solution \'{}\' could not be found".format(
+            icaSolutionDirectory(participantNumber, settings)))
+
+    # The .vhdr, .eeg and .vmrk files (the cata-
+    #  log tells us whether they exist and could
+    #  be read).
+    if not recording['complete']:
+        return problems + ["The recording \'{}\' cannot be processed, since {}".format(
+            file, recordingProblem(settings['mainDirectory'], recording))]
+    if badChannelProblem is None:
+        for channel in badChannelLines[int(participantNumber) - 1][5:].split():
+            if channel not in recording['channelNames']:
+                problems.append("\'Bad channels.txt\' contains a channel for P{} that is not in \'{}\' ({})".format(
+                    participantNumber, file, channel))
+
+    # The size of the .eeg file.
+    eegFile = settings['mainDirectory'] + recording['eegFile']
+    fileSize = recording['signatures']['eegFile'][0]
+    if fileSize == 0 or fileSize % recording['bytesPerSample'] != 0:
+        problems.append("The size of \'{}\' ({} bytes) does not fit {} channels of {} bytes each".format(
+            eegFile, fileSize, len(recording['channelNames']),
+            recording['bytesPerSample'] // len(recording['channelNames'])))
+
+    # The markers in the .vmrk file.
+    if sum(recording['eventCodeCounts'].values()) == 0:
+        problems.append("The file \'{}\' contains no markers".format(
+            settings['mainDirectory'] + recording['vmrkFile']))
+    return problems
+
+
+# This function checks all recordings in
+#  'recordings' (entries of the recording
+#  catalog). We return a list with a descrip-
+#  tion of every problem we found, in the
+#  order of 'recordings'.
+def preflightProblems(recordings, settings):
+    badChannelLines = participantLines(settings['mainDirectory'] + '/Miscellaneous/Bad channels.txt')
+    componentLines = participantLines(settings['mainDirectory'] + '/Miscellaneous/Unwanted components.txt')
+    return [problem for recording in recordings
+            for problem in checkRecording(recording, settings, badChannelLines, componentLines)]
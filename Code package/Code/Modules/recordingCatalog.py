@@ -0,0 +1,189 @@
+# ----------------------------------- #
+#          Recording Catalog          #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module keeps a catalog of all #
+#  recordings listed in '/Miscella-   #
+#  neous/File paths.txt', in '/Out-   #
+#  put/Recording catalog.json'. For   #
+#  each recording, it stores the par- #
+#  ticipant number, the batch, the    #
+#  paths to the .vhdr, .eeg and .vmrk #
+#  files, the sampling frequency, the #
+#  channels, the number of samples    #
+#  (and of bytes per sample) and how  #
+#  often each event code occurs. An   #
+#  entry is only created again if the #
+#  size or the modification time of   #
+#  one of its files has changed, so   #
+#  that scripts can query the catalog #
+#  instead of opening every recording #
+#  when they start.                   #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+import json
+from collections import Counter
+from brainVision import readBrainVisionHeader, readBrainVisionMarkers
+
+# These are the errors that a damaged .vhdr
+#  or .vmrk file can cause while it is read.
+readingErrors = (ValueError, KeyError, IndexError, UnicodeError)
+
+# This is the version of the layout of the
+#  catalog. A catalog with another version
+#  is created again from scratch.
+catalogVersion = 2
+
+
+# This function derives the identification
+#  number of a participant from the name of
+#  their .vhdr file: '01_F_26_R_AD.vhdr' be-
+#  longs to participant '01' (see step 2.2.1
+#  of the EEG processing pipeline). The num-
+#  ber is everything before the first under-
+#  score, so that it can also have three di-
+#  gits (as in large synthetic cohorts, see
+#  '/Code/Modules/syntheticData.py').
+def participantNumberFromFile(file):
+    return os.path.basename(file).split('_')[0]
+
+
+# This function tells us where the catalog
+#  is stored.
+def catalogFile(mainDirectory):
+    return mainDirectory + '/Output/Recording catalog.json'
+
+
+# This function describes the current state
+#  of a file: its size and the time at which
+#  it was last modified (or 'None' if it does
+#  not exist).
+def fileSignature(fileName):
+    try:
+        status = os.stat(fileName)
+    except FileNotFoundError:
+        return None
+    return [status.st_size, status.st_mtime_ns]
+
+
+# This function creates the entry of one re-
+#  cording. 'vhdrPath' is the path as it is
+#  listed in '/Miscellaneous/File paths.txt'
+#  (relative to 'mainDirectory'). If one of
+#  the three files is missing or cannot be
+#  read, the entry says so, and only contains
+#  the paths.
+def catalogEntry(mainDirectory, vhdrPath):
+    entry = dict(participantNumber=participantNumberFromFile(vhdrPath),
+                 batch=os.path.basename(os.path.dirname(vhdrPath)),
+                 vhdrFile=vhdrPath, eegFile=vhdrPath[:-4] + 'eeg', vmrkFile=vhdrPath[:-4] + 'vmrk',
+                 complete=False, signatures={})
+    entry['signatures']['vhdrFile'] = fileSignature(mainDirectory + vhdrPath)
+    if entry['signatures']['vhdrFile'] is None:
+        return entry
+
+    # The .vhdr file tells us where the other
+    #  two files are (normally next to it, with
+    #  the same name). If it cannot be read, we
+    #  keep the reason.
+    try:
+        header = readBrainVisionHeader(mainDirectory + vhdrPath)
+    except readingErrors as error:
+        entry['readingError'] = "\'{}\' could not be read ({})".format(vhdrPath, error)
+        return entry
+    directory = os.path.dirname(vhdrPath)
+    entry['eegFile'] = directory + '/' + os.path.basename(header['eegFile'])
+    entry['vmrkFile'] = directory + '/' + os.path.basename(header['vmrkFile'])
+    entry['signatures']['eegFile'] = fileSignature(mainDirectory + entry['eegFile'])
+    entry['signatures']['vmrkFile'] = fileSignature(mainDirectory + entry['vmrkFile'])
+    if entry['signatures']['eegFile'] is None or entry['signatures']['vmrkFile'] is None:
+        return entry
+
+    try:
+        events, eventCodes = readBrainVisionMarkers(mainDirectory + entry['vmrkFile'])
+    except readingErrors as error:
+        entry['readingError'] = "the markers in \'{}\' could not be read ({})".format(entry['vmrkFile'], error)
+        return entry
+    entry.update(complete=True,
+                 samplingFrequency=header['samplingFrequency'],
+                 channelNames=header['channelNames'],
+                 bytesPerSample=len(header['channelNames']) * header['dataType'].itemsize,
+                 numberOfSamples=entry['signatures']['eegFile'][0] //
+                 (len(header['channelNames']) * header['dataType'].itemsize),
+                 eventCodeCounts={str(code): count
+                                  for code, count in sorted(Counter(events[:, 2].tolist()).items())})
+    return entry
+
+
+# This function tells us whether an entry
+#  still describes the files on disk.
+def entryIsCurrent(mainDirectory, entry):
+    return all(fileSignature(mainDirectory + entry[fileKind]) == signature
+               for fileKind, signature in entry['signatures'].items())
+
+
+# This function loads the catalog, brings it
+#  up to date with '/Miscellaneous/File paths.
+#  txt' and the files on disk, and stores it
+#  again if anything changed. We return the
+#  entries in the order of 'File paths.txt'.
+def loadRecordingCatalog(mainDirectory):
+    vhdrPaths = [fileName.strip() for fileName
+                 in open(mainDirectory + '/Miscellaneous/File paths.txt', 'r').readlines() if fileName.strip()]
+    storedEntries = {}
+    if os.path.exists(catalogFile(mainDirectory)):
+        try:
+            with open(catalogFile(mainDirectory), 'r') as filehandle:
+                catalog = json.load(filehandle)
+            if catalog.get('version') == catalogVersion:
+                storedEntries = catalog['recordings']
+        except (ValueError, KeyError):
+            storedEntries = {}
+
+    entries = []
+    changed = set(storedEntries) != set(vhdrPaths)
+    for vhdrPath in vhdrPaths:
+        entry = storedEntries.get(vhdrPath)
+        if entry is None or not entryIsCurrent(mainDirectory, entry):
+            entry = catalogEntry(mainDirectory, vhdrPath)
+            changed = True
+        entries.append(entry)
+
+    if changed:
+        os.makedirs(os.path.dirname(catalogFile(mainDirectory)), exist_ok=True)
+        temporaryFileName = catalogFile(mainDirectory)[:-5] + '-' + str(os.getpid()) + '.json'
+        with open(temporaryFileName, 'w') as filehandle:
+            json.dump(dict(version=catalogVersion, recordings={entry['vhdrFile']: entry for entry in entries}),
+                      filehandle, indent=1)
+        os.replace(temporaryFileName, catalogFile(mainDirectory))
+    return entries
+
+
+# This function returns the entry of the
+#  recording whose .vhdr file is called 'file-
+#  Name', or 'None' if there is none.
+def findRecording(entries, fileName):
+    for entry in entries:
+        if os.path.basename(entry['vhdrFile']) == fileName:
+            return entry
+    return None
+
+
+# This function describes why a recording is
+#  not complete: which of its files are mis-
+#  sing, or which of them could not be read.
+#  We return 'None' if it is complete.
+def recordingProblem(mainDirectory, entry):
+    if entry['complete']:
+        return None
+    missing = [mainDirectory + entry[fileKind] for fileKind, signature in entry['signatures'].items()
+               if signature is None]
+    if len(missing) > 0:
+        return "the following files could not be found: " + \
+            ', '.join("\'{}\'".format(fileName) for fileName in missing)
+    return entry['readingError']
@@ -0,0 +1,78 @@
+# ----------------------------------- #
+#              Rescaling              #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module implements the rescal- #
+#  ing method of Jing et al. (2006)   #
+#  (DOI: 10.1016/j.jneumeth.2005.08.- #
+#  002). Two conditions A and B are   #
+#  rescaled such that overall ampli-  #
+#  tude differences between them are  #
+#  removed, while their topographies  #
+#  are kept. The method is applied to #
+#  all participants and all pairs of  #
+#  conditions at once.                #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+from itertools import combinations
+
+
+# This function rescales the scores in the
+#  array 'scores', which should have one
+#  entry per participant-condition-electrode
+#  combination. 'conditionPairs' is a list of
+#  [A, B] pairs; by default, all pairs of
+#  conditions are used. For each participant
+#  and pair, we calculate the scaling factors
+#  (pA and pB) and the offsets (cA and cB).
+#  We return those, together with an array
+#  that contains the rescaled scores per
+#  pair-participant-condition-electrode com-
+#  bination. Conditions that are not part of
+#  a pair get a score of -1 for that pair.
+def rescaleConditionPairs(scores, conditionPairs=None):
+    scores = np.asarray(scores, dtype=float)
+    numberOfParticipants, numberOfConditions, numberOfElectrodes = scores.shape
+    if conditionPairs is None:
+        conditionPairs = list(combinations(range(numberOfConditions), 2))
+    conditionPairs = np.array(conditionPairs)
+
+    # We select the scores of conditions A and
+    #  B for all pairs. Both arrays have one
+    #  entry per participant-pair-electrode
+    #  combination.
+    scoresA = scores[:, conditionPairs[:, 0], :]
+    scoresB = scores[:, conditionPairs[:, 1], :]
+    sumA = scoresA.sum(axis=-1)
+    sumB = scoresB.sum(axis=-1)
+
+    # First, we calculate the scaling factors
+    #  for both conditions (pA and pB).
+    numerator = numberOfElectrodes * (scoresA * scoresB).sum(axis=-1) - sumA * sumB
+    denominatorA = numberOfElectrodes * (scoresA ** 2).sum(axis=-1) - sumA ** 2
+    denominatorB = numberOfElectrodes * (scoresB ** 2).sum(axis=-1) - sumB ** 2
+    pA = numerator / denominatorA
+    pB = numerator / denominatorB
+
+    # Next, we calculate the offsets
+    #  for both conditions (cA and cB).
+    cA = -1 * pA * (sumA / numberOfElectrodes) + (sumB / numberOfElectrodes)
+    cB = -1 * pB * (sumB / numberOfElectrodes) + (sumA / numberOfElectrodes)
+
+    # Finally, we calculate the rescaled
+    #  power scores for both conditions.
+    pairIndices = np.arange(len(conditionPairs))[:, None]
+    participantIndices = np.arange(numberOfParticipants)[None, :]
+    rescaledScores = np.full((len(conditionPairs),) + scores.shape, -1.0)
+    rescaledScores[pairIndices, participantIndices, conditionPairs[:, 0][:, None]] = \
+        (scoresA * pA[..., None] + cA[..., None]).transpose(1, 0, 2)
+    rescaledScores[pairIndices, participantIndices, conditionPairs[:, 1][:, None]] = \
+        (scoresB * pB[..., None] + cB[..., None]).transpose(1, 0, 2)
+
+    return {'conditionPairs': conditionPairs, 'pA': pA, 'pB': pB,
+            'cA': cA, 'cB': cB, 'rescaledScores': rescaledScores}
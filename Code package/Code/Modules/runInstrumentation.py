@@ -0,0 +1,209 @@
+# ----------------------------------- #
+#         Run Instrumentation         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module keeps track of where   #
+#  the time and memory go while the   #
+#  EEG processing pipeline runs. For  #
+#  each stage (loading the data, the  #
+#  ICA, filtering, epoching, calcu-   #
+#  lating power scores, exporting the #
+#  tables, and so on) we record the   #
+#  wall time, the CPU time, the peak  #
+#  memory of the process (peak RSS)   #
+#  and the size of the data that the  #
+#  stage produced. At the end of a    #
+#  run, the records of all partici-   #
+#  pants are written to a run report  #
+#  (a JSON file and a CSV file) and   #
+#  summarised in a short table.       #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+import sys
+import json
+import time
+import datetime
+import platform
+import numpy as np
+import pandas as pd
+
+# The 'resource' module is only available
+#  on Linux and macOS.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The records of the stages that were
+#  finished in this process, but that
+#  have not been collected yet.
+stageRecords = []
+
+
+# On Linux, the peak memory of a process
+#  can be reset, which allows us to mea-
+#  sure the peak memory of each stage. We
+#  return whether this worked.
+def resetPeakMemory():
+    try:
+        with open('/proc/self/clear_refs', 'w') as filehandle:
+            filehandle.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# This function returns the memory that the
+#  process uses right now (in bytes), or 'None'
+#  if we cannot find out (i.e. if we are not
+#  on Linux).
+def currentMemory():
+    return readProcessStatus('VmRSS:')
+
+
+# This function returns the peak memory of
+#  the process (in bytes) since it was last
+#  reset. If it cannot be reset, we return
+#  the peak memory since the process started
+#  (or 'None' if even that is unknown).
+def peakMemory():
+    memory = readProcessStatus('VmHWM:')
+    if memory is None and resource is not None:
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return memory
+
+
+# This function reads an entry (in kB) from
+#  the status file of the process on Linux.
+def readProcessStatus(entryName):
+    try:
+        with open('/proc/self/status', 'r') as filehandle:
+            for line in filehandle:
+                if line.startswith(entryName):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+# This function returns the size (in bytes)
+#  of the arrays in 'data': a NumPy array, an
+#  MNE object (such as a Raw or Epochs object)
+#  or a dictionary of arrays. We return 'None'
+#  if we do not know how large it is.
+def dataSize(data):
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(getattr(data, '_data', None), np.ndarray):
+        return data._data.nbytes
+    if isinstance(data, dict):
+        return sum(value.nbytes for value in data.values() if isinstance(value, np.ndarray))
+    return None
+
+
+# This function is called right before a
+#  stage starts. We return a record that
+#  should be handed to 'finishStage' once
+#  the stage is done. Stages should not be
+#  nested, since every stage resets the
+#  peak memory.
+def startStage(stageName):
+    return dict(stage=stageName, peakMemoryPerStage=resetPeakMemory(), startMemory=currentMemory(),
+                startTime=time.perf_counter(), startCpuTime=time.process_time())
+
+
+# This function is called right after a
+#  stage has finished. 'data' is what the
+#  stage produced (if anything). Besides the
+#  peak memory, we record by how much it ex-
+#  ceeded the memory in use when the stage
+#  started, which is what the stage itself
+#  needed. Memory and sizes are stored in MB.
+def finishStage(record, data=None):
+    memory = peakMemory()
+    size = dataSize(data) if data is not None else None
+    memoryIncrease = None
+    if memory is not None and record['startMemory'] is not None and record['peakMemoryPerStage']:
+        memoryIncrease = max(memory - record['startMemory'], 0) / 1e6
+    stageRecords.append(dict(participant=None, stage=record['stage'],
+                             wallTime=time.perf_counter() - record['startTime'],
+                             cpuTime=time.process_time() - record['startCpuTime'],
+                             peakMemory=memory / 1e6 if memory is not None else None,
+                             peakMemoryIncrease=memoryIncrease,
+                             peakMemoryPerStage=record['peakMemoryPerStage'],
+                             dataSize=size / 1e6 if size is not None else None,
+                             processId=os.getpid()))
+
+
+# This function returns the records that
+#  were not collected yet, and forgets them.
+#  Records without a participant are assigned
+#  to 'participantNumber' (if it is given).
+def collectStageRecords(participantNumber=None):
+    records = list(stageRecords)
+    stageRecords.clear()
+    for record in records:
+        if record['participant'] is None:
+            record['participant'] = participantNumber
+    return records
+
+
+# This function summarises the records per
+#  stage: how often the stage was carried
+#  out, how long it took in total and on
+#  average, how much memory it needed at most
+#  (in total, and on top of the memory that was
+#  already in use) and how much data it pro-
+#  duced on average. Times are in seconds,
+#  memory and sizes in MB.
+def summariseStages(records):
+    table = pd.DataFrame(records, columns=['participant', 'stage', 'wallTime', 'cpuTime',
+                                           'peakMemory', 'peakMemoryIncrease', 'dataSize'])
+    table = table.astype({'wallTime': float, 'cpuTime': float, 'peakMemory': float,
+                          'peakMemoryIncrease': float, 'dataSize': float})
+    summary = table.groupby('stage', sort=False).agg(
+        numberOfTimes=('wallTime', 'size'), totalWallTime=('wallTime', 'sum'), meanWallTime=('wallTime', 'mean'),
+        totalCpuTime=('cpuTime', 'sum'), maximumPeakMemory=('peakMemory', 'max'),
+        maximumPeakMemoryIncrease=('peakMemoryIncrease', 'max'), meanDataSize=('dataSize', 'mean'))
+    return summary.reset_index()
+
+
+# This function writes the run report: a
+#  JSON file with some information about the
+#  run ('runInformation'), all records and
+#  the summary, and a CSV file with all re-
+#  cords. Both files are stored in 'report-
+#  Directory' and named after the time at
+#  which the report was written. We return
+#  the summary.
+def writeRunReport(records, reportDirectory, runInformation):
+    os.makedirs(reportDirectory, exist_ok=True)
+    fileName = reportDirectory + '/Run report ' + datetime.datetime.now().strftime('%Y-%m-%d %H-%M-%S')
+    summary = summariseStages(records)
+    report = dict(runInformation, python=platform.python_version(), platform=platform.platform(),
+                  records=records,
+                  summary=summary.astype(object).where(summary.notna(), None).to_dict(orient='records'))
+    with open(fileName + '.json', 'w') as filehandle:
+        json.dump(report, filehandle, indent=1, default=str)
+    pd.DataFrame(records).to_csv(fileName + '.csv', index=False)
+    return summary
+
+
+# This function prints the summary of a run.
+#  Values that are unknown are shown as '-'.
+def printStageSummary(summary):
+    formatValue = lambda value, template: template.format(value) if not np.isnan(value) else '-'
+    print("\n--------------------------------------------------------------------------------------")
+    print("{:<26}{:>6}{:>12}{:>11}{:>11}{:>10}{:>10}".format('Stage', 'Times', 'Total time', 'Mean time',
+                                                           'Peak mem.', 'Increase', 'Data'))
+    for row in summary.itertuples():
+        print("{:<26}{:>6}{:>12}{:>11}{:>11}{:>10}{:>10}".format(
+            row.stage, row.numberOfTimes, formatValue(row.totalWallTime, '{:.1f}s'),
+            formatValue(row.meanWallTime, '{:.2f}s'), formatValue(row.maximumPeakMemory, '{:.0f}MB'),
+            formatValue(row.maximumPeakMemoryIncrease, '{:.0f}MB'), formatValue(row.meanDataSize, '{:.1f}MB')))
+    print("--------------------------------------------------------------------------------------")
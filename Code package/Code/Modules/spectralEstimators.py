@@ -0,0 +1,83 @@
+# ----------------------------------- #
+#         Spectral Estimators         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module contains the methods   #
+#  that can be used to calculate the  #
+#  power spectral density scores of   #
+#  the epochs (see 'psdMethod' in the #
+#  main script). The multitaper me-   #
+#  thod is the most accurate, but     #
+#  also the slowest. Welch's method   #
+#  and a single (windowed) FFT are    #
+#  faster, which makes them useful    #
+#  for quick screening runs. Each     #
+#  method handles all epochs and      #
+#  channels at once. All of them use  #
+#  the same sampling frequencies, so  #
+#  their (normalised) scores can be   #
+#  compared directly. The methods run #
+#  on the data of the EEG channels    #
+#  (which we get with 'get_data'), so #
+#  that they only depend on MNE's     #
+#  array functions.                   #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+
+
+# This function returns the data of the
+#  (good) EEG channels of the epochs (one
+#  value per epoch-channel-sample combina-
+#  tion) and their sampling rate.
+def eegData(epochs):
+    return epochs.get_data(picks=mne.pick_types(epochs.info, eeg=True)), epochs.info['sfreq']
+
+
+# The multitaper method multiplies each epoch
+#  by several tapers (DPSS windows) and aver-
+#  ages the spectra of the outcomes.
+def multitaperPowerScores(epochs, lowestFrequency, highestFrequency):
+    data, samplingRate = eegData(epochs)
+    return mne.time_frequency.psd_array_multitaper(data, samplingRate, fmin=lowestFrequency,
+                                                   fmax=highestFrequency)
+
+
+# Welch's method averages the spectra of over-
+#  lapping segments of each epoch. We use seg-
+#  ments that are half as long as the epochs
+#  (with 50% overlap), and pad them with zeros
+#  to the length of the epochs, so that we get
+#  the same sampling frequencies as with the
+#  multitaper method.
+def welchPowerScores(epochs, lowestFrequency, highestFrequency):
+    data, samplingRate = eegData(epochs)
+    numberOfSamples = data.shape[-1]
+    return mne.time_frequency.psd_array_welch(data, samplingRate, fmin=lowestFrequency, fmax=highestFrequency,
+                                              n_fft=numberOfSamples, n_per_seg=numberOfSamples // 2,
+                                              n_overlap=numberOfSamples // 4)
+
+
+# The plain FFT method calculates a single
+#  spectrum per epoch, after multiplying the
+#  epoch by a Hann window.
+def fftPowerScores(epochs, lowestFrequency, highestFrequency):
+    data, samplingRate = eegData(epochs)
+    numberOfSamples = data.shape[-1]
+    return mne.time_frequency.psd_array_welch(data, samplingRate, fmin=lowestFrequency, fmax=highestFrequency,
+                                              n_fft=numberOfSamples, n_per_seg=numberOfSamples,
+                                              n_overlap=0, window='hann')
+
+
+# These are the methods that can be chosen
+#  in the main script. Each of them returns
+#  the power scores (one per epoch-channel-
+#  frequency combination) and the sampling
+#  frequencies.
+spectralEstimators = {'multitaper': multitaperPowerScores,
+                      'welch': welchPowerScores,
+                      'fft': fftPowerScores}
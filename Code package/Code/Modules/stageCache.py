@@ -0,0 +1,174 @@
+# ----------------------------------- #
+#             Stage Cache             #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module stores the outcomes of #
+#  the three stages of the subject-   #
+#  level computations on disk: the    #
+#  pre-processed raw data, the clean  #
+#  epochs and the power scores. Each  #
+#  outcome is stored under a key: a   #
+#  hash of the input files and of all #
+#  parameters that affect the stage   #
+#  and the stages before it. If only  #
+#  the parameters of a later stage    #
+#  change, the earlier stages can be  #
+#  loaded instead of being recomputed.#
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import json
+import hashlib
+import numpy as np
+
+# Each stage is stored in its own format.
+#  Raw data and epochs are stored as FIF
+#  files (in double precision, so that a
+#  cached stage is identical to a freshly
+#  computed one). Power scores are stored
+#  as a NumPy archive, together with the
+#  measurement info of the epochs.
+stageSuffixes = {'raw': '_raw.fif',
+                 'epochs': '-epo.fif',
+                 'psd': '-psd.npz'}
+infoSuffix = '-info.fif'
+fingerprintSuffix = '-fingerprint.json'
+
+
+# This function calculates a hash of the
+#  contents of the given files (e.g. the
+#  .vhdr, .eeg and .vmrk file of one parti-
+#  cipant). Reading a large .eeg file takes
+#  a while, so we remember the hash of each
+#  file along with its size and modification
+#  time. As long as those do not change, we
+#  reuse the hash we calculated before.
+def fingerprintFiles(files, cacheDirectory):
+    os.makedirs(cacheDirectory, exist_ok=True)
+    combinedHash = hashlib.sha256()
+    for file in files:
+        status = os.stat(file)
+        pathHash = hashlib.sha1(os.path.abspath(file).encode()).hexdigest()
+        memoryFile = os.path.join(cacheDirectory, pathHash + fingerprintSuffix)
+        fileHash = None
+        if os.path.exists(memoryFile):
+            with open(memoryFile, 'r') as filehandle:
+                memory = json.load(filehandle)
+            if memory['size'] == status.st_size and memory['mtime'] == status.st_mtime_ns:
+                fileHash = memory['hash']
+        if fileHash is None:
+            fileHash = hashlib.sha256()
+            with open(file, 'rb') as filehandle:
+                for block in iter(lambda: filehandle.read(1 << 20), b''):
+                    fileHash.update(block)
+            fileHash = fileHash.hexdigest()
+            with open(memoryFile, 'w') as filehandle:
+                json.dump({'size': status.st_size, 'mtime': status.st_mtime_ns,
+                           'hash': fileHash}, filehandle)
+        combinedHash.update(fileHash.encode())
+    return combinedHash.hexdigest()
+
+
+# This function calculates the key of each
+#  stage. 'stageParameters' is a list of
+#  (stage name, parameters) tuples, in the
+#  order in which the stages are carried
+#  out. The key of a stage depends on the
+#  key of the stage before it, so changing
+#  a parameter of one stage changes the keys
+#  of that stage and of all later stages,
+#  but not the keys of the earlier stages.
+def stageKeys(inputFingerprint, stageParameters):
+    keys = {}
+    previousKey = inputFingerprint
+    for stage, parameters in stageParameters:
+        description = json.dumps([previousKey, stage, parameters],
+                                 sort_keys=True, default=str)
+        previousKey = hashlib.sha256(description.encode()).hexdigest()
+        keys[stage] = previousKey
+    return keys
+
+
+# This function loads a stage from the
+#  cache. If the stage cannot be found, we
+#  return 'None'. We update the modification
+#  time of the files we load, so that the
+#  files that were used least recently can
+#  be recognised when the cache gets full.
+def loadStage(cacheDirectory, stage, key):
+    fileName = os.path.join(cacheDirectory, key + stageSuffixes[stage])
+    if not os.path.exists(fileName):
+        return None
+    if stage == 'raw':
+        value = mne.io.read_raw_fif(fileName, preload=True)
+    elif stage == 'epochs':
+        value = mne.read_epochs(fileName, preload=True)
+    else:
+        infoFileName = os.path.join(cacheDirectory, key + infoSuffix)
+        if not os.path.exists(infoFileName):
+            return None
+        with np.load(fileName) as archive:
+            value = {name: archive[name] for name in archive.files}
+        value['info'] = mne.io.read_info(infoFileName)
+        os.utime(infoFileName)
+    os.utime(fileName)
+    return value
+
+
+# This function stores a stage in the cache.
+#  Several worker processes may use the same
+#  cache at the same time, so we first write
+#  to a temporary file and then rename it.
+#  That way, no process will ever load a
+#  file that is only partly written.
+def storeStage(cacheDirectory, stage, key, value):
+    os.makedirs(cacheDirectory, exist_ok=True)
+    fileName = os.path.join(cacheDirectory, key + stageSuffixes[stage])
+    temporaryFileName = os.path.join(cacheDirectory, key + '-' + str(os.getpid()) + stageSuffixes[stage])
+    if stage in ('raw', 'epochs'):
+        value.save(temporaryFileName, fmt='double', overwrite=True)
+    else:
+        infoFileName = os.path.join(cacheDirectory, key + infoSuffix)
+        temporaryInfoFileName = os.path.join(cacheDirectory, key + '-' + str(os.getpid()) + infoSuffix)
+        mne.io.write_info(temporaryInfoFileName, value['info'])
+        os.replace(temporaryInfoFileName, infoFileName)
+        np.savez(temporaryFileName, **{name: value[name] for name in value if name != 'info'})
+    os.replace(temporaryFileName, fileName)
+
+
+# This function keeps the cache below the
+#  given size (in bytes). If the cache is
+#  too large, we delete the stages that were
+#  used least recently until it is not. All
+#  files that belong to one stage start with
+#  the same key, so they are deleted together.
+def evictLeastRecentlyUsed(cacheDirectory, sizeLimit):
+    if not os.path.isdir(cacheDirectory):
+        return
+    entries = {}
+    for fileName in os.listdir(cacheDirectory):
+        if fileName.endswith(fingerprintSuffix):
+            continue
+        try:
+            status = os.stat(os.path.join(cacheDirectory, fileName))
+        except FileNotFoundError:
+            continue
+        key = fileName[:64]
+        size, lastUsed, fileNames = entries.get(key, (0, 0, []))
+        entries[key] = (size + status.st_size, max(lastUsed, status.st_mtime), fileNames + [fileName])
+    totalSize = sum(size for size, lastUsed, fileNames in entries.values())
+    for key in sorted(entries, key=lambda key: entries[key][1]):
+        if totalSize <= sizeLimit:
+            break
+        size, lastUsed, fileNames = entries[key]
+        for fileName in fileNames:
+            try:
+                os.remove(os.path.join(cacheDirectory, fileName))
+            except FileNotFoundError:
+                pass
+        totalSize -= size
@@ -0,0 +1,143 @@
+# ----------------------------------- #
+#         Streaming Ingestion         #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  Loading a recording with 'preload= #
+#  True' keeps the complete recording #
+#  in memory (as 64-bit numbers), and #
+#  every copy of it (e.g. the one we  #
+#  use to fit an ICA solution) takes  #
+#  up that much memory again. This    #
+#  module carries out the pre-proces- #
+#  sing steps that are applied to the #
+#  raw data (re-referencing, applying #
+#  the ICA solution and filtering) on #
+#  one chunk of the recording at a    #
+#  time. The .eeg file is memory-     #
+#  mapped rather than read, and the   #
+#  outcome is written to a temporary  #
+#  file on disk that is memory-mapped #
+#  as well. The amount of memory we   #
+#  need therefore no longer depends   #
+#  on the length of the recording.    #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import tempfile
+import numpy as np
+from scipy.signal import oaconvolve
+from brainVision import readBrainVisionHeader, mapBrainVisionData
+from linearOperators import icaCleaningOperator
+
+
+# This function pre-processes the recording
+#  that belongs to 'vhdrFile' in the same way
+#  as steps 2.2.4 to 2.2.11 of the EEG pro-
+#  cessing pipeline: the channels 'hEOG' and
+#  'vEOG' are dropped, TP8 is added and an
+#  average reference is applied, the 10-20
+#  montage is set, the channels in 'bad-
+#  Channels' are marked as bad, the ICA solu-
+#  tion 'ica' is applied (unless it is 'None')
+#  and the data is filtered between the two
+#  frequencies in 'filterRange'. We use the
+#  same filter as MNE (a zero-phase FIR filter
+#  with 'reflect_limited' padding at both
+#  ends of the recording). Every chunk of
+#  'chunkDuration' seconds is filtered toge-
+#  ther with half a filter length of data on
+#  either side of it, so the outcome does not
+#  depend on where the chunks begin and end.
+#  We return a Raw object whose data is the
+#  memory-mapped temporary file, which is
+#  created in 'workingDirectory'.
+def streamPreprocessedRaw(vhdrFile, badChannels, ica, filterRange, chunkDuration, workingDirectory):
+    header = readBrainVisionHeader(vhdrFile)
+    recording = mapBrainVisionData(header)
+    numberOfSamples = recording.shape[0]
+    samplingFrequency = header['samplingFrequency']
+
+    # We determine which columns of the .eeg
+    #  file we keep, and how the channels of
+    #  the pre-processed data will be called.
+    keptColumns = [columnIndex for columnIndex, channel in enumerate(header['channelNames'])
+                   if channel not in ['hEOG', 'vEOG']]
+    scalingFactors = header['scalingFactors'][keptColumns]
+    channelNames = [header['channelNames'][columnIndex] for columnIndex in keptColumns] + ['TP8']
+    if ica is not None:
+        icaMatrix, icaOffset = icaCleaningOperator(ica, channelNames, badChannels)
+
+    # This function reads the samples with the
+    #  given indices from the .eeg file, converts
+    #  them to volts, adds TP8, applies the
+    #  average reference and the ICA solution.
+    def cleanedSamples(indices):
+        samples = np.zeros((len(channelNames), len(indices)))
+        samples[:-1] = (recording[indices][:, keptColumns] * scalingFactors).T
+        samples -= samples.mean(axis=0, keepdims=True)
+        if ica is not None:
+            samples = icaMatrix @ samples + icaOffset[:, None]
+        return samples
+
+    # We design the filter. Every filtered sample
+    #  depends on 'halfLength' samples on either
+    #  side of it.
+    filterCoefficients = mne.filter.create_filter(None, samplingFrequency, l_freq=filterRange[0],
+                                                  h_freq=filterRange[1], verbose=False)
+    halfLength = (len(filterCoefficients) - 1) // 2
+    if numberOfSamples <= halfLength:
+        raise ValueError("The recording in \'{}\' is too short to be processed in "
+                         "streaming mode".format(vhdrFile))
+
+    # Before the first sample and after the last
+    #  sample, the recording is extended by
+    #  mirroring it around its first and last
+    #  sample, respectively ('reflect_limited').
+    firstSample = cleanedSamples(np.array([0]))
+    lastSample = cleanedSamples(np.array([numberOfSamples - 1]))
+
+    # We create the temporary file. It is removed
+    #  as soon as it is no longer used.
+    os.makedirs(workingDirectory, exist_ok=True)
+    temporaryFile = tempfile.TemporaryFile(dir=workingDirectory)
+    data = np.memmap(temporaryFile, dtype=np.float64, mode='w+',
+                     shape=(len(channelNames), numberOfSamples))
+
+    # We pre-process the recording one chunk
+    #  at a time.
+    chunkLength = max(int(chunkDuration * samplingFrequency), 1)
+    for chunkStart in range(0, numberOfSamples, chunkLength):
+        chunkStop = min(chunkStart + chunkLength, numberOfSamples)
+        indices = np.arange(chunkStart - halfLength, chunkStop + halfLength)
+        beforeStart = indices < 0
+        afterStop = indices >= numberOfSamples
+        mirroredIndices = np.where(beforeStart, -indices,
+                                   np.where(afterStop, 2 * (numberOfSamples - 1) - indices, indices))
+        segment = cleanedSamples(mirroredIndices)
+        segment[:, beforeStart] = 2 * firstSample - segment[:, beforeStart]
+        segment[:, afterStop] = 2 * lastSample - segment[:, afterStop]
+        data[:, chunkStart:chunkStop] = oaconvolve(segment, filterCoefficients[None, :],
+                                                   mode='valid', axes=1)
+    data.flush()
+
+    # We wrap the pre-processed data in a Raw
+    #  object, without copying it into memory.
+    info = mne.create_info(channelNames, samplingFrequency, 'eeg')
+    info['custom_ref_applied'] = mne.io.constants.FIFF.FIFFV_MNE_CUSTOM_REF_ON
+    info['highpass'] = float(filterRange[0])
+    info['lowpass'] = float(filterRange[1])
+    raw = mne.io.RawArray(data, info, copy='auto', verbose=False)
+    raw.set_montage(mne.channels.make_standard_montage('standard_1020'))
+    raw.info['bads'] = list(badChannels)
+
+    # Finally, we add the events from the
+    #  .vmrk file (see step 2.2.8).
+    annotations = mne.read_annotations(header['vmrkFile'], samplingFrequency)
+    raw.set_meas_date(annotations.orig_time)
+    raw.set_annotations(annotations)
+    return raw
@@ -0,0 +1,349 @@
+# ----------------------------------- #
+#           Synthetic Data            #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  This module creates synthetic re-  #
+#  cordings of the Add-n task, with   #
+#  the same channels (31 EEG channels #
+#  recorded against TP8, plus hEOG    #
+#  and vEOG), the same file format    #
+#  (.vhdr, .eeg and .vmrk) and the    #
+#  same event codes as the real data. #
+#  The EEG consists of pink back-     #
+#  ground activity, occipital alpha   #
+#  activity, frontal midline theta    #
+#  activity, eye blinks, eye move-    #
+#  ments, slow drifts and line noise. #
+#  The theta activity is made strong- #
+#  er after the onset of each stimu-  #
+#  lus, by a factor that depends on   #
+#  the condition. This allows us to   #
+#  test and benchmark the EEG proces- #
+#  sing pipeline on cohorts of any    #
+#  size, and to check whether it      #
+#  finds the effects that we put in.  #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import datetime
+import multiprocessing
+import numpy as np
+from scipy.signal import fftconvolve
+from concurrent.futures import ProcessPoolExecutor
+from brainVision import writeBrainVisionFiles
+
+# These are the EEG channels of the real
+#  recordings (in the same order), followed
+#  by the two EOG channels. TP8 was used as
+#  the reference electrode, so it is not
+#  part of the recordings.
+eegChannelNames = ['Fp1', 'F7', 'F3', 'F1', 'Fz', 'FT7', 'FC3', 'FCz', 'T7', 'C3', 'Cz',
+                   'TP7', 'CP3', 'CPz', 'P7', 'P3', 'Pz', 'PO7', 'Oz', 'PO8', 'P8', 'P4',
+                   'CP4', 'T8', 'C4', 'FT8', 'FC4', 'F8', 'F4', 'F2', 'Fp2']
+channelNames = eegChannelNames + ['hEOG', 'vEOG']
+
+# These are the event codes of the task
+#  (see step 2.2.8 of '/Code/Modules/parti-
+#  cipantProcessing.py'). The code of a digit
+#  is the digit itself, except for 0, which
+#  has code 10 (or 210 for a button press).
+stimulusAppearsCodes = [100, 101, 102]
+stimulusDisappearsCodes = [150, 151, 152]
+practiceCode = 155
+spaceBarCode = 211
+
+# This is what a trial looks like (in seconds
+#  after the onset of the stimulus): the sti-
+#  mulus disappears after 2 seconds, after
+#  which the four required digits are logged.
+#  The participant then presses four digits
+#  and the space bar. The next trial starts
+#  'trialDuration' seconds (plus a random
+#  jitter of up to half a second) later.
+#  Each block contains 'trialsPerBlock' tri-
+#  als of one condition; each condition has
+#  two blocks. The task is preceded by a few
+#  practice trials.
+disappearanceTime = 2.0
+firstPressTime = 2.6
+timeBetweenPresses = 0.45
+spaceBarTime = 4.4
+trialDuration = 6.5
+trialsPerBlock = 20
+blocksPerCondition = 2
+numberOfPracticeTrials = 5
+pauseBetweenBlocks = 8.0
+
+# These are the default properties of the
+#  synthetic participants: the factor by which
+#  the amplitude of the theta activity is mul-
+#  tiplied after the onset of a stimulus (per
+#  condition), and the probability that a
+#  pressed digit is correct (per condition).
+defaultThetaEffects = [1.0, 1.25, 1.5]
+defaultAccuracies = [0.97, 0.9, 0.8]
+
+
+# This function creates signals with a given
+#  amplitude spectrum (a function of the fre-
+#  quency) and random phases. Each signal is
+#  scaled to a root mean square of 1.
+def shapedNoise(numberOfSignals, numberOfSamples, samplingFrequency, spectrum, randomState):
+    frequencies = np.fft.rfftfreq(numberOfSamples, 1 / samplingFrequency)
+    coefficients = randomState.standard_normal((numberOfSignals, len(frequencies))) + \
+        1j * randomState.standard_normal((numberOfSignals, len(frequencies)))
+    coefficients *= spectrum(frequencies)
+    coefficients[:, 0] = 0
+    signals = np.fft.irfft(coefficients, n=numberOfSamples, axis=1)
+    return signals / np.sqrt(np.mean(signals ** 2, axis=1, keepdims=True))
+
+
+# These are the spectra of the background
+#  activity (pink noise) and of rhythmic
+#  activity around a certain frequency.
+def pinkSpectrum(frequencies):
+    return 1 / np.sqrt(np.maximum(frequencies, frequencies[1]))
+
+
+def rhythmSpectrum(centreFrequency, bandwidth):
+    return lambda frequencies: np.exp(-(frequencies - centreFrequency) ** 2 / (2 * bandwidth ** 2))
+
+
+# This function tells us how strongly a source
+#  near the electrode 'sourceElectrode' shows
+#  up at every electrode in 'positions' (a dic-
+#  tionary with the position of each electrode):
+#  the strength falls off with the distance to
+#  the source, in the shape of a bell curve
+#  with a width of 'width' metres.
+def topography(sourceElectrode, width, positions):
+    distances = np.linalg.norm(np.array(list(positions.values())) - positions[sourceElectrode], axis=1)
+    return np.exp(-distances ** 2 / (2 * width ** 2))
+
+
+# This function creates the markers of one
+#  recording of 'duration' seconds: a comment,
+#  a few practice trials and then the blocks
+#  of trials. If the recording is too short
+#  for blocks of 'trialsPerBlock' trials, the
+#  blocks are made shorter, so that every
+#  condition still occurs.
+#  The conditions of the blocks are shuffled
+#  per participant. We return the markers
+#  (type, description, sample) and the onset
+#  (in samples) and condition of every trial.
+def createMarkers(duration, samplingFrequency, accuracies, randomState):
+    markers = [('Comment', 'Synthetic recording', 0)]
+    trialOnsets = []
+    trialConditions = []
+
+    def addTrial(onset, condition):
+        sample = lambda time: int(round((onset + time) * samplingFrequency))
+        requiredDigits = randomState.integers(0, 10, 4)
+        pressedDigits = requiredDigits.copy()
+        if condition is not None:
+            markers.append(('Stimulus', 'S{:>3}'.format(stimulusAppearsCodes[condition]), sample(0)))
+            markers.append(('Stimulus', 'S{:>3}'.format(stimulusDisappearsCodes[condition]),
+                            sample(disappearanceTime)))
+            mistakes = randomState.random(4) > accuracies[condition]
+            pressedDigits[mistakes] = (pressedDigits[mistakes] +
+                                       randomState.integers(1, 10, mistakes.sum())) % 10
+        else:
+            markers.append(('Stimulus', 'S{:>3}'.format(practiceCode), sample(0)))
+        for digitNumber, digit in enumerate(requiredDigits):
+            markers.append(('Stimulus', 'S{:>3}'.format(digit if digit > 0 else 10),
+                            sample(disappearanceTime + 0.01 * (digitNumber + 1))))
+        for digitNumber, digit in enumerate(pressedDigits):
+            markers.append(('Stimulus', 'S{:>3}'.format(200 + (digit if digit > 0 else 10)),
+                            sample(firstPressTime + timeBetweenPresses * digitNumber)))
+        markers.append(('Stimulus', 'S{:>3}'.format(spaceBarCode), sample(spaceBarTime)))
+
+    time = 10.0
+    for trialNumber in range(numberOfPracticeTrials):
+        addTrial(time, None)
+        time += trialDuration + randomState.uniform(0, 0.5)
+
+    blockConditions = randomState.permutation(np.repeat(np.arange(3), blocksPerCondition))
+    remainingTime = duration - time - len(blockConditions) * pauseBetweenBlocks
+    trialsPerBlockThatFit = max(1, min(trialsPerBlock, int(remainingTime / len(blockConditions) /
+                                                           (trialDuration + 0.5))))
+    for condition in blockConditions:
+        time += pauseBetweenBlocks
+        for trialNumber in range(trialsPerBlockThatFit):
+            if time + trialDuration > duration:
+                break
+            addTrial(time, condition)
+            trialOnsets.append(int(round(time * samplingFrequency)))
+            trialConditions.append(condition)
+            time += trialDuration + randomState.uniform(0, 0.5)
+    return markers, np.array(trialOnsets, dtype=int), np.array(trialConditions, dtype=int)
+
+
+# This function creates the signals of one
+#  recording, with one row per channel (in
+#  volts). The sources are mixed into the po-
+#  tentials at all electrodes (including TP8),
+#  after which TP8 is subtracted from the EEG
+#  channels, just like during the recording.
+def createSignals(numberOfSamples, samplingFrequency, trialOnsets, trialConditions,
+                  thetaEffects, randomState):
+    electrodeNames = eegChannelNames + ['TP8']
+    montagePositions = mne.channels.make_standard_montage('standard_1020').get_positions()['ch_pos']
+    positions = {name: montagePositions[name] for name in electrodeNames}
+    sourceTopography = lambda sourceElectrode, width: topography(sourceElectrode, width, positions)
+    times = np.arange(numberOfSamples) / samplingFrequency
+
+    # Background activity: a few pink noise
+    #  sources at random places, plus pink
+    #  noise at every electrode.
+    sourceElectrodes = randomState.choice(electrodeNames, 8, replace=False)
+    potentials = 6e-6 * np.array([sourceTopography(electrode, 0.05) for electrode in sourceElectrodes]).T @ \
+        shapedNoise(len(sourceElectrodes), numberOfSamples, samplingFrequency, pinkSpectrum, randomState)
+    potentials += 3e-6 * shapedNoise(len(electrodeNames), numberOfSamples, samplingFrequency,
+                                     pinkSpectrum, randomState)
+
+    # Alpha activity (around 10 Hz) over the
+    #  occipital electrodes.
+    alphaFrequency = randomState.uniform(9, 11)
+    potentials += 8e-6 * np.outer(sourceTopography('Oz', 0.05), shapedNoise(
+        1, numberOfSamples, samplingFrequency, rhythmSpectrum(alphaFrequency, 0.7), randomState)[0])
+
+    # Theta activity (around 6 Hz) over the
+    #  frontal midline electrodes. Its ampli-
+    #  tude is multiplied by the effect of the
+    #  condition during the four seconds after
+    #  the onset of each stimulus (with a
+    #  smooth rise and fall).
+    thetaFrequency = randomState.uniform(5, 6.5)
+    theta = shapedNoise(1, numberOfSamples, samplingFrequency,
+                        rhythmSpectrum(thetaFrequency, 0.5), randomState)[0]
+    envelope = np.ones(numberOfSamples)
+    window = np.hanning(int(4 * samplingFrequency))
+    for onset, condition in zip(trialOnsets, trialConditions):
+        end = min(onset + len(window), numberOfSamples)
+        envelope[onset:end] += (thetaEffects[condition] - 1) * window[:end - onset]
+    potentials += 4e-6 * np.outer(sourceTopography('Fz', 0.045), theta * envelope)
+
+    # Eye blinks (about one every four se-
+    #  conds) near Fp1 and Fp2, and eye move-
+    #  ments (a new gaze direction about every
+    #  two seconds) that show up with opposite
+    #  signs at F7 and F8.
+    blinkSamples = randomState.choice(numberOfSamples, int(times[-1] / 4), replace=False)
+    blinks = np.zeros(numberOfSamples)
+    blinks[blinkSamples] = randomState.uniform(60e-6, 120e-6, len(blinkSamples))
+    blinkShape = np.exp(-(np.arange(-0.3, 0.3, 1 / samplingFrequency) / 0.07) ** 2 / 2)
+    blinks = fftconvolve(blinks, blinkShape, mode='same')
+    blinkTopography = (sourceTopography('Fp1', 0.03) + sourceTopography('Fp2', 0.03)) / 2
+    potentials += np.outer(blinkTopography, blinks)
+    gazeChanges = np.cumsum(randomState.random(numberOfSamples) < 0.5 / samplingFrequency)
+    gaze = randomState.normal(0, 15e-6, gazeChanges[-1] + 1)[gazeChanges]
+    potentials += np.outer(0.3 * (sourceTopography('F7', 0.03) - sourceTopography('F8', 0.03)), gaze)
+
+    # Slow drifts at every electrode, and
+    #  line noise (50 Hz).
+    potentials += 20e-6 * shapedNoise(len(electrodeNames), numberOfSamples, samplingFrequency,
+                                      rhythmSpectrum(0, 0.05), randomState)
+    potentials += 1.5e-6 * np.outer(randomState.uniform(0.5, 1.5, len(electrodeNames)),
+                                    np.sin(2 * np.pi * 50 * times))
+
+    # We subtract the reference (TP8) from
+    #  the EEG channels and add the EOG chan-
+    #  nels (which are bipolar, so they are
+    #  not affected by the reference).
+    eeg = potentials[:-1] - potentials[-1]
+    hEOG = gaze + 2e-6 * randomState.standard_normal(numberOfSamples)
+    vEOG = -1.5 * blinks + 2e-6 * randomState.standard_normal(numberOfSamples)
+    return np.vstack([eeg, hEOG, vEOG])
+
+
+# This function creates a complete recording of
+#  a participant: the signals, the markers and
+#  the bad channels. Every participant gets a
+#  random generator of their own (derived from
+#  'seed' and their identification number), so
+#  that a participant always looks the same, no
+#  matter how many participants we create. Some
+#  participants (about one in four) get a bad
+#  channel, which contains strong noise.
+def createRecording(participantNumber, duration, samplingFrequency, thetaEffects, accuracies, seed):
+    randomState = np.random.default_rng([seed, participantNumber])
+    markers, trialOnsets, trialConditions = createMarkers(duration, samplingFrequency, accuracies, randomState)
+    numberOfSamples = int(duration * samplingFrequency)
+    data = createSignals(numberOfSamples, samplingFrequency, trialOnsets, trialConditions,
+                         thetaEffects, randomState)
+    badChannels = []
+    if randomState.random() < 0.25:
+        badChannel = randomState.choice(len(eegChannelNames))
+        data[badChannel] += 40e-6 * randomState.standard_normal(numberOfSamples)
+        badChannels.append(eegChannelNames[badChannel])
+    return data, markers, badChannels
+
+
+# This function writes the recording of one
+#  participant to 'vhdrFile' (and the .eeg and
+#  .vmrk files next to it). We return the bad
+#  channels of the participant.
+def writeParticipant(vhdrFile, participantNumber, duration, samplingFrequency, thetaEffects, accuracies, seed):
+    data, markers, badChannels = createRecording(participantNumber, duration, samplingFrequency,
+                                                 thetaEffects, accuracies, seed)
+    recordingDate = datetime.datetime(2019, 4, 1, 9, 0) + datetime.timedelta(hours=participantNumber)
+    writeBrainVisionFiles(vhdrFile, data, samplingFrequency, channelNames, markers, recordingDate)
+    return badChannels
+
+
+# This function creates a synthetic cohort of
+#  'numberOfParticipants' participants in the
+#  folder 'mainDirectory', laid out just like
+#  the real data: the recordings are stored
+#  in '/Data', in batches of 20 participants,
+#  and '/Miscellaneous' contains the files
+#  'File paths.txt', 'Bad channels.txt' and
+#  'Unwanted components.txt' (in which no
+#  components are listed). The recordings are
+#  'duration' seconds long; the default (930
+#  seconds) fits the whole task. Recordings
+#  can be written by several worker processes
+#  at the same time.
+def createSyntheticCohort(mainDirectory, numberOfParticipants, duration=930, samplingFrequency=500,
+                          thetaEffects=defaultThetaEffects, accuracies=defaultAccuracies, seed=0,
+                          numberOfWorkers=1):
+    numberOfDigits = max(2, len(str(numberOfParticipants)))
+    randomState = np.random.default_rng(seed)
+    relativePaths = []
+    for participantNumber in range(1, numberOfParticipants + 1):
+        firstNumber = (participantNumber - 1) // 20 * 20 + 1
+        lastNumber = min(firstNumber + 19, numberOfParticipants)
+        batchFolder = 'Batch {} (P{:0{digits}d}-P{:0{digits}d}) [Synthetic]'.format(
+            (participantNumber - 1) // 20 + 1, firstNumber, lastNumber, digits=numberOfDigits)
+        fileName = '{:0{}d}_{}_{}_R_AD.vhdr'.format(participantNumber, numberOfDigits,
+                                                     randomState.choice(['F', 'M']), randomState.integers(18, 31))
+        relativePaths.append('/Data/' + batchFolder + '/' + fileName)
+        os.makedirs(mainDirectory + '/Data/' + batchFolder, exist_ok=True)
+
+    arguments = [(mainDirectory + relativePath, participantNumber, duration, samplingFrequency,
+                  thetaEffects, accuracies, seed)
+                 for participantNumber, relativePath in enumerate(relativePaths, start=1)]
+    if numberOfWorkers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                 mp_context=multiprocessing.get_context('fork')) as executor:
+            badChannelsPerSubject = list(executor.map(writeParticipant, *zip(*arguments)))
+    else:
+        badChannelsPerSubject = [writeParticipant(*argument) for argument in arguments]
+
+    os.makedirs(mainDirectory + '/Miscellaneous', exist_ok=True)
+    with open(mainDirectory + '/Miscellaneous/File paths.txt', 'w') as filehandle:
+        filehandle.write('\n'.join(relativePaths) + '\n')
+    with open(mainDirectory + '/Miscellaneous/Bad channels.txt', 'w') as filehandle:
+        filehandle.write('\n'.join('P{:0{}d}: {}'.format(participantNumber, numberOfDigits, ' '.join(badChannels))
+                                   for participantNumber, badChannels
+                                   in enumerate(badChannelsPerSubject, start=1)) + '\n')
+    with open(mainDirectory + '/Miscellaneous/Unwanted components.txt', 'w') as filehandle:
+        filehandle.write('\n'.join('P{:0{}d}:'.format(participantNumber, numberOfDigits)
+                                   for participantNumber in range(1, numberOfParticipants + 1)) + '\n')
+    return [mainDirectory + relativePath for relativePath in relativePaths]
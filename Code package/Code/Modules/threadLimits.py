@@ -0,0 +1,37 @@
+# ----------------------------------- #
+#            Thread Limits            #
+# ----------------------------------- #
+
+# ----------------------------------- #
+#              Overview               #
+# ----------------------------------- #
+#  When several participants are pro- #
+#  cessed side by side, every worker  #
+#  process should only use a few      #
+#  threads for its matrix operations. #
+#  The usual BLAS/OpenMP back-ends of #
+#  NumPy read the number of threads   #
+#  from environment variables, but    #
+#  only when NumPy is imported. This  #
+#  module therefore does not import   #
+#  NumPy (or anything that does), so  #
+#  that scripts can use it before     #
+#  they import NumPy themselves.      #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import os
+
+# The names of the environment variables
+#  that control how many threads the usual
+#  BLAS/OpenMP back-ends of NumPy may use.
+threadingVariables = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                      'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                      'VECLIB_MAXIMUM_THREADS']
+
+
+# This function sets all of these environment
+#  variables to 'threadsPerWorker'.
+def setThreadingVariables(threadsPerWorker):
+    for variable in threadingVariables:
+        os.environ[variable] = str(threadsPerWorker)
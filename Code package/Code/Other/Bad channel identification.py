@@ -7,6 +7,8 @@
 # ----------------------------------------- #
 #  This code can be used to plot raw EEG    #
 #  data in order to identify bad channels.  #
+#  To get proposals for all recordings at   #
+#  once, see 'Detecting bad channels.py'.   #
 # ----------------------------------------- #
 #      a.n.j.p.m.haas@gmail.com (2021)      #
 # ----------------------------------------- #
@@ -22,42 +24,48 @@ fileName = '01_F_26_R_AD.vhdr'
 ### -------------- Step A --------------- ###
 
 # We import the Python modules we need.
+import sys
 import mne
-from os import path
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from recordingCatalog import loadRecordingCatalog, findRecording, recordingProblem
 
 ### -------------- Step B --------------- ###
 
 # In total, there were 37 participants.
 #  Their data is stored in two directories.
+#  Rather than working out which directory
+#  holds the file we are looking for, we
+#  look it up in the catalog of recordings
+#  (see '/Code/Modules/recordingCatalog.py').
 mainDirectory = '../..'
-subDirectory1 = '/Data/Batch 1 (P01-P20) [2019]/'
-subDirectory2 = '/Data/Batch 2 (P21-P37) [2021]/'
-
-# The data for the first 20 participants is stored
-#  in subdirectory 1. The data for the remaining 17
-#  participants is stored in subdirectory 2. Where can
-#  we find the data file that we are looking for?
-if int(fileName[0:2]) <= 20:
-    filePath = mainDirectory + subDirectory1 + fileName
-else:
-    filePath = mainDirectory + subDirectory2 + fileName
+recording = findRecording(loadRecordingCatalog(mainDirectory), fileName)
 
 ### -------------- Step C --------------- ###
 
-# We check whether the specified
-#  file actually exists.
-if not path.exists(filePath):
-    print("\nThe following file could not be found: \'{}\'.".format(filePath))
+# We check whether the specified file is
+#  listed in '/Miscellaneous/File paths.txt',
+#  and whether its files actually exist.
+if recording is None:
+    print("\nThe following file is not listed in \'/Miscellaneous/File paths.txt\': \'{}\'.".format(fileName))
+    exit()
+if recordingProblem(mainDirectory, recording) is not None:
+    print("\nThe recording cannot be plotted, since {}.".format(recordingProblem(mainDirectory, recording)))
     exit()
+print("\nParticipant {} ({}): {} channels, {} Hz, {:.1f} minutes.".format(
+    recording['participantNumber'], recording['batch'], len(recording['channelNames']),
+    recording['samplingFrequency'], recording['numberOfSamples'] / recording['samplingFrequency'] / 60))
 
 ### -------------- Step D --------------- ###
 
 # We load the data. Since we make use
 #  of BrainVision data, we should apply
 #  a non-standard read function here.
-raw = mne.io.read_raw_brainvision(filePath)
+raw = mne.io.read_raw_brainvision(mainDirectory + recording['vhdrFile'])
 
 ### -------------- Step E --------------- ###
 
 # We plot the raw EEG data.
-raw.plot(block=True)
\ No newline at end of file
+raw.plot(block=True)
@@ -0,0 +1,196 @@
+# --------------------------------- #
+#      Benchmarking ICA Fits        #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  Creating new ICA solutions is by #
+#  far the most time-consuming part #
+#  of the EEG processing pipeline.  #
+#  The code in this file fits the   #
+#  ICA solution of some partici-    #
+#  pants with several choices of    #
+#  the ICA settings (the algorithm, #
+#  the decimation of the data and   #
+#  the number of components, see    #
+#  the main code). For each choice, #
+#  it reports how long the fit took #
+#  and how well the new components  #
+#  match those of the stored solu-  #
+#  tions in '/Output/ICA solutions' #
+#  (which are not overwritten). It  #
+#  also tells us which new compo-   #
+#  nents match the unwanted ones.   #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which participants should be used?
+selectedParticipants = [1, 2, 3]
+
+# Which choices should be compared?
+#  Each choice replaces some of the
+#  ICA settings of the main code. The
+#  first choice should be the one with
+#  which the stored solutions were
+#  created, since the speed-up of the
+#  other choices is calculated relative
+#  to it.
+fitConfigurations = {
+    'Stored settings': dict(),
+    'Decimated by 5': dict(icaDecimation=5),
+    'Decimated by 5, 99.9% of variance': dict(icaDecimation=5, icaComponents=0.999),
+    'Picard, decimated by 5': dict(icaMethod='picard', icaMethodPerParticipant={}, icaDecimation=5),
+    'Infomax, decimated by 5': dict(icaMethod='infomax', icaMethodPerParticipant={}, icaDecimation=5)}
+
+# Above which (absolute) correlation
+#  do we consider a new component to
+#  be the same as a stored one?
+matchThreshold = 0.9
+
+# The time courses of the components
+#  are compared on every n-th sample.
+comparisonDecimation = 5
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import os
+import sys
+import time
+import mne
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from participantProcessing import participantNumberFromFile, createIcaSolution, loadParticipantIcaSolution, \
+    checkIcaMethods
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline, and
+#  select the participants.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files if int(participantNumberFromFile(file)) in selectedParticipants]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the selected participants could be found.")
+    exit()
+
+# These are the ICA settings of the main
+#  code. Each choice in 'fitConfigurations'
+#  replaces some of them. We check all of
+#  the choices before we start.
+settings = dict(mainDirectory=mainDirectory, completeICA=True,
+                icaMethod='fastica', icaMethodPerParticipant={27: 'picard'},
+                icaDecimation=1, icaComponents=None)
+configurationSettings = {configurationName: dict(settings, **configuration)
+                         for configurationName, configuration in fitConfigurations.items()}
+for configurationName, configuration in configurationSettings.items():
+    problem = checkIcaMethods(configuration)
+    if problem is not None:
+        print("\n[ERROR] {} (\'{}\').".format(problem, configurationName))
+        exit()
+
+
+# This function matches the components of a
+#  new ICA solution to those of the stored one.
+#  We correlate the time courses of all pairs
+#  of components, and pair them up such that
+#  the sum of the absolute correlations is as
+#  large as possible (the sign of a component
+#  is arbitrary). For each stored component,
+#  we return the number of the new component
+#  it was paired with (or -1 if there are
+#  fewer new components) and the absolute
+#  correlation of the pair (or 0).
+def matchComponents(storedSources, newSources):
+    correlations = np.abs(np.corrcoef(storedSources, newSources)[:len(storedSources), len(storedSources):])
+    storedComponents, newComponents = linear_sum_assignment(-correlations)
+    matchedComponents = np.full(len(storedSources), -1)
+    matchedComponents[storedComponents] = newComponents
+    matchedCorrelations = np.zeros(len(storedSources))
+    matchedCorrelations[storedComponents] = correlations[storedComponents, newComponents]
+    return matchedComponents, matchedCorrelations
+
+
+### ---------- Step C ----------- ###
+
+# For each participant, we prepare the data
+#  on which ICA solutions are fitted, just like
+#  at steps 2.2.4 to 2.2.10 of the EEG proces-
+#  sing pipeline, and load the stored solution.
+#  Then we fit a new solution with each choice
+#  of settings and compare it to the stored one.
+rows = []
+for file in selectedFiles:
+    participantNumber = participantNumberFromFile(file)
+    raw = mne.io.read_raw_brainvision(file, preload=True, verbose=False)
+    raw.drop_channels(['hEOG', 'vEOG'])
+    mne.add_reference_channels(raw, ref_channels=['TP8'], copy=False)
+    raw.set_eeg_reference(ref_channels='average', verbose=False)
+    raw.set_montage(mne.channels.make_standard_montage('standard_1020'))
+    raw.info['bads'] = badChannelsPerSubject[int(participantNumber) - 1]
+    raw.filter(l_freq=0.1, h_freq=30, verbose=False)
+    storedIca = loadParticipantIcaSolution(participantNumber, settings)
+    storedSources = storedIca.get_sources(raw).get_data()[:, ::comparisonDecimation]
+    unwantedComponents = [int(i) for i in unwantedComponentsPerSubject[int(participantNumber) - 1]]
+    for configurationName, configuration in configurationSettings.items():
+        startTime = time.perf_counter()
+        ica = createIcaSolution(raw, participantNumber, configuration)
+        fitTime = time.perf_counter() - startTime
+        newSources = ica.get_sources(raw).get_data()[:, ::comparisonDecimation]
+        matchedComponents, matchedCorrelations = matchComponents(storedSources, newSources)
+        rows.append(['P' + participantNumber, configurationName, ica.method, fitTime,
+                     ica.n_components_, getattr(ica, 'n_iter_', None),
+                     matchedCorrelations.mean(), np.mean(matchedCorrelations >= matchThreshold),
+                     matchedCorrelations[unwantedComponents].min() if len(unwantedComponents) > 0 else np.nan,
+                     ' '.join(str(matchedComponents[i]) for i in unwantedComponents)])
+        print("P{} - {}: {:.1f}s".format(participantNumber, configurationName, fitTime))
+    del raw
+
+### ---------- Step D ----------- ###
+
+# We store the results in a folder called
+#  '/Output/ICA benchmark'. The last column
+#  lists the new numbers of the unwanted com-
+#  ponents, which can be entered in '/Miscel-
+#  laneous/Unwanted components.txt' if the new
+#  solutions are adopted.
+table = pd.DataFrame(rows, columns=['Participant', 'Choice', 'Algorithm', 'Fit time (s)', 'Components',
+                                    'Iterations', 'Mean correlation', 'Share matched',
+                                    'Lowest correlation (unwanted)', 'Unwanted components (new numbers)'])
+os.makedirs('../../Output/ICA benchmark', exist_ok=True)
+table.to_csv('../../Output/ICA benchmark/ICA fits.csv', index=False)
+
+# We print a summary: the average fit time
+#  per participant, the speed-up relative to
+#  the first choice, the average correlation
+#  of the matched components, the share of
+#  the stored components that were found
+#  again, and the lowest correlation of an
+#  unwanted component.
+referenceTime = table[table['Choice'] == list(fitConfigurations)[0]]['Fit time (s)'].mean()
+print("\n-------------------------------------------------------------------------------------")
+print("{:<36}{:>10}{:>10}{:>12}{:>10}{:>12}".format('Choice', 'Fit time', 'Speed-up', 'Mean corr.',
+                                                     'Matched', 'Unwanted'))
+for configurationName, configurationRows in table.groupby('Choice', sort=False):
+    print("{:<36}{:>9.1f}s{:>9.1f}x{:>12.3f}{:>9.0f}%{:>12.3f}".format(
+        configurationName, configurationRows['Fit time (s)'].mean(),
+        referenceTime / configurationRows['Fit time (s)'].mean(), configurationRows['Mean correlation'].mean(),
+        100 * configurationRows['Share matched'].mean(), configurationRows['Lowest correlation (unwanted)'].min()))
+print("-------------------------------------------------------------------------------------")
@@ -0,0 +1,257 @@
+# --------------------------------- #
+#     Benchmarking the Pipeline     #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The code in this file measures   #
+#  how the EEG processing pipeline  #
+#  scales with the number of parti- #
+#  cipants. For each cohort size,   #
+#  it creates a synthetic cohort    #
+#  (see '/Code/Modules/synthetic-   #
+#  Data.py') with a copy of the     #
+#  folder '/Code', and runs the     #
+#  copied pipeline on it from start #
+#  to finish (including new ICA     #
+#  solutions). It reports the time  #
+#  and the peak memory of each run. #
+#  For a few participants, it also  #
+#  reports the time, the CPU time   #
+#  and the peak memory of each sub- #
+#  ject-level stage. Finally, it    #
+#  checks whether the pipeline      #
+#  finds the theta effects that we  #
+#  put into the synthetic data.     #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# For which cohort sizes should the
+#  pipeline be benchmarked? Please
+#  note that each recording takes up
+#  about 30 MB of disk space, and that
+#  a run with 500 participants takes
+#  many hours unless many workers can
+#  run side by side (see below).
+cohortSizes = [10, 100, 500]
+
+# How long (in seconds) should each
+#  recording be, and at which rate
+#  (in Hz) should it be sampled?
+recordingDuration = 930
+samplingRate = 500
+
+# By which factor should the ampli-
+#  tude of the theta activity be mul-
+#  tiplied after the onset of a sti-
+#  mulus, in each condition?
+thetaEffects = [1.0, 1.25, 1.5]
+
+# With which settings should the copied
+#  pipeline be run? These replace the
+#  settings at the top of the copied
+#  'EEG processing pipeline.py'.
+pipelineSettings = dict(limitedFocus=False, excludedParticipants=[], completeICA=True,
+                        outputFormats=['csv'], parallelProcessing=True,
+                        numberOfWorkers=8, threadsPerWorker=1)
+
+# For how many participants (of the
+#  first cohort) should the subject-
+#  level stages be profiled?
+profiledParticipants = 3
+
+# In which folder should the cohorts
+#  and the results be stored? Should
+#  the recordings be kept after each
+#  run?
+benchmarkDirectory = '../../Output/Benchmark'
+keepRecordings = False
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import os
+import re
+import sys
+import time
+import shutil
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from syntheticData import createSyntheticCohort
+from participantProcessing import preprocessRaw, createEpochs, computePowerScores, participantNumberFromFile
+from pipelineSettings import readScriptSettings, participantSettings
+
+# This is the (small) script with which we
+#  run the copied pipeline. Once the pipe-
+#  line has finished, it reports the peak
+#  memory of the main process and of the
+#  largest worker process (on Linux and
+#  macOS only).
+runnerScript = """
+import runpy
+runpy.run_path('EEG processing pipeline.py', run_name='__main__')
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    print('PEAK MEMORY', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+"""
+
+# On macOS, the peak memory is reported in
+#  bytes. On Linux, it is reported in kB.
+peakMemoryUnit = 1 if sys.platform == 'darwin' else 1024
+
+
+# This function replaces the settings at the
+#  top of a copy of the main script. Each
+#  setting is a line of the form 'name = value'.
+def adjustSettings(scriptFile, newSettings):
+    with open(scriptFile, 'r', encoding='utf-8') as filehandle:
+        script = filehandle.read()
+    for name, value in newSettings.items():
+        script, numberOfReplacements = re.subn(r'^' + name + r' = .*$', name + ' = ' + repr(value),
+                                               script, count=1, flags=re.MULTILINE)
+        if numberOfReplacements == 0:
+            print("\n[ERROR] The setting \'{}\' could not be found in \'{}\'.".format(name, scriptFile))
+            exit()
+    with open(scriptFile, 'w', encoding='utf-8') as filehandle:
+        filehandle.write(script)
+
+
+### ---------- Step B ----------- ###
+
+# We create each cohort in a folder of its
+#  own, with a copy of the folder '/Code' and
+#  the output folders that the pipeline needs.
+#  Then we run the copied pipeline. If this
+#  is the first cohort, we first profile the
+#  subject-level stages (see step C).
+runStatistics = []
+stageStatistics = []
+thetaRatios = []
+for cohortSize in cohortSizes:
+    cohortDirectory = benchmarkDirectory + '/' + str(cohortSize) + ' participants'
+    if os.path.exists(cohortDirectory):
+        shutil.rmtree(cohortDirectory)
+    startTime = time.perf_counter()
+    files = createSyntheticCohort(cohortDirectory, cohortSize, duration=recordingDuration,
+                                  samplingFrequency=samplingRate, thetaEffects=thetaEffects,
+                                  numberOfWorkers=pipelineSettings['numberOfWorkers'])
+    generationTime = time.perf_counter() - startTime
+    shutil.copytree('..', cohortDirectory + '/Code', ignore=shutil.ignore_patterns('__pycache__'))
+    for outputFolder in ['Theta topoplots', 'ICA solutions']:
+        os.makedirs(cohortDirectory + '/Output/' + outputFolder, exist_ok=True)
+    adjustSettings(cohortDirectory + '/Code/Main/EEG processing pipeline.py', pipelineSettings)
+
+    ### ---------- Step C ----------- ###
+
+    # We profile the subject-level stages for
+    #  the first few participants of the first
+    #  cohort, with the same settings as the
+    #  copied pipeline: we read them from the
+    #  top of its main script (see '/Code/Mod-
+    #  ules/pipelineSettings.py'). For each
+    #  stage, we keep track of the time, the CPU
+    #  time and the memory that was needed at
+    #  most.
+    if cohortSize == cohortSizes[0]:
+        settings = participantSettings(
+            cohortDirectory,
+            [line.strip()[5:].split() for line in open(
+                cohortDirectory + '/Miscellaneous/Bad channels.txt', 'r').readlines()],
+            [line.strip()[5:].split() for line in open(
+                cohortDirectory + '/Miscellaneous/Unwanted components.txt', 'r').readlines()],
+            readScriptSettings(cohortDirectory + '/Code/Main/EEG processing pipeline.py'))
+        for file in files[:profiledParticipants]:
+            participantNumber = participantNumberFromFile(file)
+            stages = [('Pre-processing', lambda outcome: preprocessRaw(file, participantNumber, settings)),
+                      ('Epoching', lambda outcome: createEpochs(outcome, participantNumber, settings)),
+                      ('Power scores', lambda outcome: computePowerScores(outcome, settings))]
+            outcome = None
+            for stageName, stage in stages:
+                tracemalloc.start()
+                startTime = time.perf_counter()
+                startCpuTime = time.process_time()
+                outcome = stage(outcome)
+                stageStatistics.append(['P' + participantNumber, stageName, time.perf_counter() - startTime,
+                                        time.process_time() - startCpuTime,
+                                        tracemalloc.get_traced_memory()[1] / 1e6])
+                tracemalloc.stop()
+            del outcome
+
+    ### ---------- Step D ----------- ###
+
+    # We run the copied pipeline in a new
+    #  process, from its own folder, and
+    #  keep track of its time and memory.
+    startTime = time.perf_counter()
+    completedProcess = subprocess.run([sys.executable, '-c', runnerScript],
+                                      cwd=cohortDirectory + '/Code/Main',
+                                      env=dict(os.environ, MPLBACKEND='Agg'),
+                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                      universal_newlines=True)
+    runTime = time.perf_counter() - startTime
+    peakMemoryLines = [line for line in completedProcess.stdout.splitlines() if line.startswith('PEAK MEMORY')]
+    if completedProcess.returncode != 0 or '[ERROR]' in completedProcess.stdout:
+        print(completedProcess.stdout[-3000:])
+        print("\n[ERROR] The pipeline did not finish for the cohort of {} participants.".format(cohortSize))
+        exit()
+    peakMemory = [np.nan, np.nan]
+    if len(peakMemoryLines) > 0:
+        peakMemory = [int(value) * peakMemoryUnit / 1e6 for value in peakMemoryLines[-1].split()[2:]]
+    runStatistics.append([cohortSize, generationTime, runTime, runTime / cohortSize] + peakMemory)
+
+    # We check whether the pipeline found the
+    #  theta effects: per condition, we divide
+    #  the average theta power score (over all
+    #  participants and electrodes) by that of
+    #  the first condition (Add-0).
+    longTable = pd.read_csv(cohortDirectory + '/Output/Theta power scores/Long format.csv')
+    averageScores = longTable.groupby('Condition')['Theta power score'].mean().values
+    thetaRatios.append(averageScores / averageScores[0])
+
+    # Unless we want to keep them, we delete
+    #  the recordings of this cohort.
+    if not keepRecordings:
+        shutil.rmtree(cohortDirectory + '/Data')
+
+### ---------- Step E ----------- ###
+
+# We store the results in the folder
+#  'benchmarkDirectory' and print a summary.
+runTable = pd.DataFrame(runStatistics, columns=['Participants', 'Generation time (s)', 'Run time (s)',
+                                                'Run time per participant (s)', 'Peak memory (MB)',
+                                                'Peak memory per worker (MB)'])
+stageTable = pd.DataFrame(stageStatistics, columns=['Participant', 'Stage', 'Time (s)', 'CPU time (s)',
+                                                    'Peak memory (MB)'])
+runTable.to_csv(benchmarkDirectory + '/Whole runs.csv', index=False)
+stageTable.to_csv(benchmarkDirectory + '/Subject-level stages.csv', index=False)
+
+print("\n-------------------------------------------------------------------")
+print("{:<16}{:>12}{:>14}{:>14}".format('Stage', 'Time', 'CPU time', 'Peak memory'))
+for stageName, stageRows in stageTable.groupby('Stage', sort=False):
+    print("{:<16}{:>11.1f}s{:>13.1f}s{:>12.0f}MB".format(
+        stageName, stageRows['Time (s)'].mean(), stageRows['CPU time (s)'].mean(),
+        stageRows['Peak memory (MB)'].mean()))
+print("-------------------------------------------------------------------")
+print("{:<14}{:>10}{:>16}{:>12}{:>14}".format('Participants', 'Run time', 'Per participant',
+                                              'Peak main', 'Peak worker'))
+for row in runStatistics:
+    print("{:<14}{:>9.0f}s{:>15.1f}s{:>10.0f}MB{:>12.0f}MB".format(row[0], row[2], row[3], row[4], row[5]))
+print("-------------------------------------------------------------------")
+for cohortSize, ratios in zip(cohortSizes, thetaRatios):
+    print("{} participants: theta power relative to Add-0: {}".format(
+        cohortSize, ', '.join('Add-{}: {:.3f}'.format(condition, ratio) for condition, ratio in enumerate(ratios))))
+print("-------------------------------------------------------------------")
@@ -0,0 +1,146 @@
+# --------------------------------- #
+#      Checking Downsampling        #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The EEG processing pipeline can  #
+#  resample the data at a lower     #
+#  rate after filtering (see 'down- #
+#  samplingRate' in the main code). #
+#  The code in this file processes  #
+#  a few participants twice, once   #
+#  at the original rate and once at #
+#  the lower rate, and checks whe-  #
+#  ther their theta power scores    #
+#  stay within a given tolerance of #
+#  each other. It also reports how  #
+#  much memory the epochs take up   #
+#  and how long each stage takes.   #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which participants should be used
+#  for the comparison?
+participantsToCheck = [1, 2, 3]
+
+# Which (lower) sampling rate should
+#  be compared to the original one?
+downsamplingRate = 100
+
+# By how much (relative to the score
+#  at the original rate) may a theta
+#  power score change? The check fails
+#  if any participant-condition-elec-
+#  trode combination changes by more.
+tolerance = 0.01
+
+# Which frequencies (in Hz) make up
+#  the theta band?
+thetaRange = [4.0, 7.0]
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import sys
+import time
+import numpy as np
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import preprocessRaw, createEpochs, computePowerScores, participantNumberFromFile
+from bandPower import computeBandPower
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files if int(participantNumberFromFile(file)) in participantsToCheck]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the participants in \'participantsToCheck\' could be found.")
+    exit()
+
+# These settings are the same as in
+#  the EEG processing pipeline.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+#  We use the theta band we entered above.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+settings['thetaRange'] = thetaRange
+
+### ---------- Step C ----------- ###
+
+# We process each participant at both
+#  rates. We keep the theta power scores
+#  (one per condition-electrode combina-
+#  tion), the size of the epochs and the
+#  time that each stage took.
+thetaScores = {None: [], downsamplingRate: []}
+statistics = {None: [], downsamplingRate: []}
+for file in selectedFiles:
+    participantNumber = participantNumberFromFile(file)
+    for rate in [None, downsamplingRate]:
+        settings['downsamplingRate'] = rate
+        startTime = time.perf_counter()
+        raw = preprocessRaw(file, participantNumber, settings)
+        preprocessingTime = time.perf_counter() - startTime
+        startTime = time.perf_counter()
+        epochs = createEpochs(raw, participantNumber, settings)
+        epochingTime = time.perf_counter() - startTime
+        startTime = time.perf_counter()
+        result = computePowerScores(epochs, settings)
+        powerScoreTime = time.perf_counter() - startTime
+        thetaScores[rate].append(computeBandPower(result['powerScores'], result['samplingFrequencies'][0],
+                                                  {'Theta': thetaRange})[..., 0])
+        statistics[rate].append([epochs.get_data().nbytes / 1e6, result['powerScores'].shape[-1],
+                                 preprocessingTime, epochingTime, powerScoreTime])
+        del raw, epochs
+
+### ---------- Step D ----------- ###
+
+# We compare the theta power scores.
+thetaScoresAtOriginalRate = np.array(thetaScores[None])
+thetaScoresAtLowerRate = np.array(thetaScores[downsamplingRate])
+relativeDifferences = np.abs(thetaScoresAtLowerRate - thetaScoresAtOriginalRate) / thetaScoresAtOriginalRate
+largestDifferencePerParticipant = relativeDifferences.reshape(len(selectedFiles), -1).max(axis=1)
+
+### ---------- Step E ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("{:<13}{:>10}{:>12}{:>10}{:>10}{:>10}".format(
+    'Rate', 'Epochs', 'Frequencies', 'Stage 1', 'Stage 2', 'Stage 3'))
+for rate in [None, downsamplingRate]:
+    averages = np.mean(statistics[rate], axis=0)
+    print("{:<13}{:>8.1f}MB{:>12.0f}{:>9.1f}s{:>9.1f}s{:>9.1f}s".format(
+        'Original' if rate is None else '{} Hz'.format(rate), *averages))
+print("-------------------------------------------------------------------")
+for file, largestDifference in zip(selectedFiles, largestDifferencePerParticipant):
+    print("P{}: largest relative difference in theta power: {:.2e}".format(
+        participantNumberFromFile(file), largestDifference))
+print("-------------------------------------------------------------------")
+if largestDifferencePerParticipant.max() <= tolerance:
+    print("All theta power scores are within the tolerance ({}).".format(tolerance))
+else:
+    print("[WARNING] Some theta power scores are not within the tolerance ({}).".format(tolerance))
+print("-------------------------------------------------------------------")
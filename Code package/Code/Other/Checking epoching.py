@@ -0,0 +1,124 @@
+# --------------------------------- #
+#        Checking Epoching          #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  By default, the EEG processing   #
+#  pipeline only creates epochs     #
+#  around the events that are used  #
+#  to calculate power scores (see   #
+#  'analysedEvents' in the main     #
+#  code). The code in this file     #
+#  compares this to creating epochs #
+#  around all events: it reports    #
+#  how much memory and time both    #
+#  approaches take, and checks whe- #
+#  ther they give the same power    #
+#  scores.                          #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which participants should be used
+#  for the comparison?
+participantsToCheck = [1, 2, 3]
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import preprocessRaw, createEpochs, computePowerScores, participantNumberFromFile
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files if int(participantNumberFromFile(file)) in participantsToCheck]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the participants in \'participantsToCheck\' could be found.")
+    exit()
+
+# These settings are the same as in
+#  the EEG processing pipeline.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+
+# These are the two approaches that we
+#  compare: epochs around all events, and
+#  epochs around the analysed events only.
+approaches = {'All events': None,
+              'Analysed events': ['Add0_StimulusAppears', 'Add1_StimulusAppears', 'Add2_StimulusAppears']}
+
+### ---------- Step C ----------- ###
+
+# We pre-process each participant once.
+#  Then, for both approaches, we create
+#  the epochs and calculate the power
+#  scores. We keep track of the number of
+#  epochs, the memory that was needed at
+#  most while creating them, and the time
+#  that both stages took.
+powerScores = {approach: [] for approach in approaches}
+statistics = {approach: [] for approach in approaches}
+for file in selectedFiles:
+    participantNumber = participantNumberFromFile(file)
+    raw = preprocessRaw(file, participantNumber, settings)
+    for approach, analysedEvents in approaches.items():
+        settings['analysedEvents'] = analysedEvents
+        tracemalloc.start()
+        startTime = time.perf_counter()
+        epochs = createEpochs(raw, participantNumber, settings)
+        epochingTime = time.perf_counter() - startTime
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        startTime = time.perf_counter()
+        result = computePowerScores(epochs, settings)
+        powerScoreTime = time.perf_counter() - startTime
+        powerScores[approach].append(result['powerScores'])
+        statistics[approach].append([len(epochs), peakMemory / 1e6, epochingTime, powerScoreTime])
+        del epochs
+    del raw
+
+### ---------- Step D ----------- ###
+
+# We compare the power scores.
+largestDifference = np.max(np.abs(np.array(powerScores['All events']) - np.array(powerScores['Analysed events'])))
+
+### ---------- Step E ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("{:<18}{:>10}{:>14}{:>12}{:>14}".format('Epochs around', 'Epochs', 'Peak memory', 'Epoching', 'Power scores'))
+for approach in approaches:
+    averages = np.mean(statistics[approach], axis=0)
+    print("{:<18}{:>10.0f}{:>12.1f}MB{:>11.2f}s{:>13.2f}s".format(approach, *averages))
+print("-------------------------------------------------------------------")
+print("Largest difference between the power scores: {:.2e}".format(largestDifference))
+print("-------------------------------------------------------------------")
@@ -0,0 +1,128 @@
+# --------------------------------- #
+#     Checking Fused Operators      #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The EEG processing pipeline can  #
+#  combine re-referencing, the ICA  #
+#  solution and the interpolation   #
+#  of bad channels into a single    #
+#  matrix (see 'fuseSpatialOpera-   #
+#  tors' in the main code). The     #
+#  code in this file processes a    #
+#  few participants both ways, and  #
+#  checks whether the clean epochs  #
+#  and the power scores stay within #
+#  a given tolerance of each other. #
+#  It also reports how long the     #
+#  pre-processing takes both ways.  #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which participants should be used
+#  for the comparison?
+participantsToCheck = [1, 2, 3]
+
+# By how much may the outcomes differ?
+#  For the epochs, the largest diffe-
+#  rence is divided by the largest am-
+#  plitude; for the power scores, each
+#  difference is divided by the score.
+tolerance = 1e-6
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import sys
+import time
+import numpy as np
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import preprocessRaw, createEpochs, computePowerScores, participantNumberFromFile
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files if int(participantNumberFromFile(file)) in participantsToCheck]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the participants in \'participantsToCheck\' could be found.")
+    exit()
+
+# These settings are the same as in
+#  the EEG processing pipeline.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+
+### ---------- Step C ----------- ###
+
+# We process each participant both ways.
+#  We compare the clean epochs (which should
+#  be the same epochs, with the same bad
+#  channels interpolated) and the power
+#  scores, and keep the time that the pre-
+#  processing took.
+rows = []
+for file in selectedFiles:
+    participantNumber = participantNumberFromFile(file)
+    outcomes = {}
+    for fused in [False, True]:
+        settings['fuseSpatialOperators'] = fused
+        startTime = time.perf_counter()
+        raw = preprocessRaw(file, participantNumber, settings)
+        preprocessingTime = time.perf_counter() - startTime
+        epochs = createEpochs(raw, participantNumber, settings)
+        outcomes[fused] = (epochs, computePowerScores(epochs, settings), preprocessingTime)
+        del raw
+    (epochs, result, preprocessingTime), (fusedEpochs, fusedResult, fusedPreprocessingTime) = \
+        outcomes[False], outcomes[True]
+    sameEpochs = np.array_equal(epochs.selection, fusedEpochs.selection) and \
+        epochs.info['bads'] == fusedEpochs.info['bads']
+    epochDifference = np.nan
+    if sameEpochs:
+        epochDifference = np.abs(fusedEpochs.get_data() - epochs.get_data()).max() / np.abs(epochs.get_data()).max()
+    powerScoreDifference = np.max(np.abs(fusedResult['powerScores'] - result['powerScores']) /
+                                  result['powerScores'])
+    rows.append([participantNumber, sameEpochs, epochDifference, powerScoreDifference,
+                 preprocessingTime, fusedPreprocessingTime])
+    del outcomes, epochs, fusedEpochs
+
+### ---------- Step D ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("{:<13}{:>8}{:>12}{:>12}{:>11}{:>11}".format('Participant', 'Epochs', 'Epoch diff.', 'Power diff.',
+                                                   'Separate', 'Fused'))
+for participantNumber, sameEpochs, epochDifference, powerScoreDifference, separateTime, fusedTime in rows:
+    print("{:<13}{:>8}{:>12.1e}{:>12.1e}{:>10.1f}s{:>10.1f}s".format(
+        'P' + participantNumber, 'same' if sameEpochs else 'differ', epochDifference, powerScoreDifference,
+        separateTime, fusedTime))
+print("-------------------------------------------------------------------")
+if all(row[1] and row[2] <= tolerance and row[3] <= tolerance for row in rows):
+    print("All outcomes are within the tolerance ({}).".format(tolerance))
+else:
+    print("[WARNING] Some outcomes are not within the tolerance ({}).".format(tolerance))
+print("-------------------------------------------------------------------")
@@ -0,0 +1,129 @@
+# --------------------------------- #
+#   Comparing Spectral Estimators   #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The EEG processing pipeline can  #
+#  calculate power scores in seve-  #
+#  ral ways (see 'psdMethod' in the #
+#  main code). The code in this     #
+#  file calculates them with every  #
+#  method for a few participants.   #
+#  It reports how long each method  #
+#  takes per participant and how    #
+#  far the theta power scores of    #
+#  the faster methods deviate from  #
+#  those of the multitaper method.  #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which participants should be used
+#  for the comparison?
+participantsToCheck = [1, 2, 3]
+
+# Which frequencies (in Hz) make up
+#  the theta band?
+thetaRange = [4.0, 7.0]
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import sys
+import time
+import numpy as np
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import preprocessRaw, createEpochs, computePowerScores, participantNumberFromFile
+from spectralEstimators import spectralEstimators
+from bandPower import computeBandPower
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files if int(participantNumberFromFile(file)) in participantsToCheck]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the participants in \'participantsToCheck\' could be found.")
+    exit()
+
+# These settings are the same as in
+#  the EEG processing pipeline.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+#  We use the theta band we entered above.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+settings['thetaRange'] = thetaRange
+
+### ---------- Step C ----------- ###
+
+# We create the epochs of each participant
+#  once. Then, for every method, we calcu-
+#  late the power scores and keep track of
+#  the time that this took. We store the
+#  theta power scores (one per condition-
+#  electrode combination) and the times.
+thetaScores = {method: [] for method in spectralEstimators}
+powerScoreTimes = {method: [] for method in spectralEstimators}
+for file in selectedFiles:
+    participantNumber = participantNumberFromFile(file)
+    epochs = createEpochs(preprocessRaw(file, participantNumber, settings), participantNumber, settings)
+    for method in spectralEstimators:
+        settings['psdMethod'] = method
+        startTime = time.perf_counter()
+        result = computePowerScores(epochs, settings)
+        powerScoreTimes[method].append(time.perf_counter() - startTime)
+        thetaScores[method].append(computeBandPower(result['powerScores'], result['samplingFrequencies'][0],
+                                                    {'Theta': thetaRange})[..., 0])
+    del epochs
+
+### ---------- Step D ----------- ###
+
+# For each participant, we calculate how far
+#  the theta power scores of every method
+#  deviate from those of the multitaper
+#  method (relative to the latter), on
+#  average and at most.
+referenceScores = np.array(thetaScores['multitaper'])
+averageDeviations = {}
+largestDeviations = {}
+for method in spectralEstimators:
+    relativeDeviations = np.abs(np.array(thetaScores[method]) - referenceScores) / referenceScores
+    averageDeviations[method] = relativeDeviations.reshape(len(selectedFiles), -1).mean(axis=1)
+    largestDeviations[method] = relativeDeviations.reshape(len(selectedFiles), -1).max(axis=1)
+
+### ---------- Step E ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("{:<14}{:<14}{:>10}{:>16}{:>16}".format('Participant', 'Method', 'Time', 'Mean deviation', 'Max deviation'))
+for participantIndex, file in enumerate(selectedFiles):
+    for method in spectralEstimators:
+        print("{:<14}{:<14}{:>9.2f}s{:>16.2e}{:>16.2e}".format(
+            'P' + participantNumberFromFile(file), method, powerScoreTimes[method][participantIndex],
+            averageDeviations[method][participantIndex], largestDeviations[method][participantIndex]))
+print("-------------------------------------------------------------------")
+for method in spectralEstimators:
+    print("{:<14}average time per participant: {:.2f}s".format(method, np.mean(powerScoreTimes[method])))
+print("-------------------------------------------------------------------")
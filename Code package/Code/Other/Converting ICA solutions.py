@@ -0,0 +1,102 @@
+# --------------------------------- #
+#     Converting ICA Solutions      #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  Older versions of the EEG pro-   #
+#  cessing pipeline stored each ICA #
+#  solution as a pickled ICA object #
+#  in a file called 'P[NN].data'.   #
+#  Such files can only be read with #
+#  the version of MNE that created  #
+#  them. The code in this file con- #
+#  verts them (once) into the array #
+#  format that the pipeline uses    #
+#  now: one folder per participant  #
+#  that contains the matrices of    #
+#  the ICA solution as .npy files.  #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Where are the pickled ICA solutions
+#  stored? The converted solutions
+#  will be stored in the same folder.
+icaDirectory = '../../Output/ICA solutions/'
+
+# Should the pickled ICA solutions be
+#  deleted once they have been con-
+#  verted (and checked) successfully?
+removePickledFiles = False
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import os
+import sys
+import pickle
+import numpy as np
+from os import path
+
+# We also import the functions that
+#  store and load ICA solutions. They
+#  can be found in '/Code/Modules'.
+sys.path.append('../Modules')
+from icaStorage import saveIcaSolution, loadIcaSolution, icaMatrices
+
+### ---------- Step B ----------- ###
+
+# We check whether the specified
+#  folder actually exists.
+if not path.isdir(icaDirectory):
+    print("\n[ERROR] The following folder could not be found: \'{}\'.".format(icaDirectory))
+    exit()
+
+# Which pickled ICA solutions are
+#  stored in the specified folder?
+pickledFiles = sorted(fileName for fileName in os.listdir(icaDirectory) if fileName.endswith('.data'))
+if len(pickledFiles) == 0:
+    print("\nThere are no pickled ICA solutions in \'{}\'.".format(icaDirectory))
+    exit()
+
+### ---------- Step C ----------- ###
+
+# We convert the ICA solutions one by
+#  one. After storing a solution in the
+#  new format, we load it again and check
+#  whether its matrices are identical to
+#  the matrices of the pickled solution.
+convertedFiles = []
+for fileName in pickledFiles:
+    with open(icaDirectory + fileName, 'rb') as filehandle:
+        ica = pickle.load(filehandle)
+    newDirectory = icaDirectory + fileName[:len(fileName) - 5]
+    saveIcaSolution(ica, newDirectory)
+    convertedIca = loadIcaSolution(newDirectory)
+    for attribute in icaMatrices.values():
+        if not np.array_equal(getattr(ica, attribute), getattr(convertedIca, attribute)):
+            print("\n[ERROR] The solution in \'{}\' was not converted correctly.".format(fileName))
+            exit()
+    if list(convertedIca.ch_names) != list(ica.ch_names):
+        print("\n[ERROR] The solution in \'{}\' was not converted correctly.".format(fileName))
+        exit()
+    convertedFiles.append(fileName)
+
+### ---------- Step D ----------- ###
+
+# If we set 'removePickledFiles' to
+#  'True', we delete the pickled files.
+if removePickledFiles:
+    for fileName in convertedFiles:
+        os.remove(icaDirectory + fileName)
+
+### ---------- Step E ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("The code was executed successfully. {} ICA solutions were converted.".format(len(convertedFiles)))
+print("-------------------------------------------------------------------")
@@ -0,0 +1,177 @@
+# --------------------------------- #
+#      Detecting Bad Channels       #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The bad channels in '/Miscella-  #
+#  neous/Bad channels.txt' were     #
+#  found by plotting each recording #
+#  (see 'Bad channel identification #
+#  .py'). The code in this file     #
+#  proposes bad channels for all    #
+#  recordings at once, based on     #
+#  four statistics per channel (see #
+#  '/Code/Modules/badChannelDetec-  #
+#  tion.py'). The proposals are     #
+#  stored in the same format as     #
+#  'Bad channels.txt', next to a    #
+#  table with all statistics and a  #
+#  list of the participants for     #
+#  whom the proposals differ from   #
+#  'Bad channels.txt'. Those are    #
+#  the recordings worth plotting.   #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# When should a channel be proposed?
+#  - 'varianceThreshold': if the robust
+#    z-score of its amplitude is larger
+#    than this (in either direction),
+#  - 'correlationThreshold': if its
+#    correlation with its neighbours
+#    is lower than this,
+#  - 'noiseThreshold': if the robust
+#    z-score of its high-frequency
+#    noise is larger than this,
+#  - 'flatFractionThreshold': if it is
+#    flat (a peak-to-peak amplitude
+#    below 'flatThreshold', in volts)
+#    in a larger share of the windows.
+detectionSettings = dict(varianceThreshold=6.0, correlationThreshold=0.3, noiseThreshold=5.0,
+                         flatFractionThreshold=0.05, flatThreshold=1e-7,
+                         bandRange=[1.0, 40.0], windowDuration=2.0, numberOfNeighbours=4)
+
+# Which participants should be used?
+#  Set 'limitedFocus' to 'True' to only
+#  use the participants in 'selected-
+#  Participants'.
+limitedFocus = False
+selectedParticipants = [1, 2, 3]
+
+# Should participants be processed side
+#  by side (see the main code)?
+parallelProcessing = True
+numberOfWorkers = 8
+threadsPerWorker = 1
+
+# In which formats should the table with
+#  the statistics be stored (see the main
+#  code)?
+outputFormats = ['xlsx']
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# If we process participants side by side,
+#  we limit the number of threads that each
+#  worker may use (see step 1.1 of the main
+#  code).
+import sys
+sys.path.append('../Modules')
+from threadLimits import setThreadingVariables
+if parallelProcessing:
+    setThreadingVariables(threadsPerWorker)
+
+# We import the Python modules we need.
+import time
+import multiprocessing
+from itertools import repeat
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+from recordingCatalog import loadRecordingCatalog, recordingProblem
+from badChannelDetection import detectBadChannels, readBadChannelFile, badChannelLines, badChannelDifferences
+from participantProcessing import limitThreads
+from outputTables import checkOutputFormats, writeTable
+
+### ---------- Step B ----------- ###
+
+# We look up the recordings in the catalog
+#  (see '/Code/Modules/recordingCatalog.py')
+#  and select the participants.
+mainDirectory = '../..'
+outputFolder = '../../Output/Bad channel proposals'
+recordings = [recording for recording in loadRecordingCatalog(mainDirectory)
+              if not limitedFocus or int(recording['participantNumber']) in selectedParticipants]
+for recording in recordings:
+    if recordingProblem(mainDirectory, recording) is not None:
+        print("\nThe following recording will not be analysed, since {}: \'{}\'.".format(
+            recordingProblem(mainDirectory, recording), mainDirectory + recording['vhdrFile']))
+recordings = [recording for recording in recordings if recording['complete']]
+if len(recordings) == 0:
+    print("\n[ERROR] None of the selected participants could be found.")
+    exit()
+problem = checkOutputFormats(outputFormats)
+if problem is not None:
+    print("\n[ERROR] {}.".format(problem))
+    exit()
+files = [mainDirectory + recording['vhdrFile'] for recording in recordings]
+participantNumbers = [recording['participantNumber'] for recording in recordings]
+
+### ---------- Step C ----------- ###
+
+# We calculate the statistics of all chan-
+#  nels of all selected participants, and
+#  propose their bad channels.
+startTime = time.perf_counter()
+if parallelProcessing and 'fork' in multiprocessing.get_all_start_methods():
+    executor = ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                   mp_context=multiprocessing.get_context('fork'),
+                                   initializer=limitThreads,
+                                   initargs=(threadsPerWorker,))
+    results = list(executor.map(detectBadChannels, files, participantNumbers, repeat(detectionSettings)))
+    executor.shutdown()
+else:
+    results = [detectBadChannels(file, participantNumber, detectionSettings)
+               for file, participantNumber in zip(files, participantNumbers)]
+detectionTime = time.perf_counter() - startTime
+
+### ---------- Step D ----------- ###
+
+# We store the proposals in the format of
+#  'Bad channels.txt', and the differences
+#  with that file.
+proposedChannels = {result['participantNumber']: result['badChannels'] for result in results}
+existingChannels = readBadChannelFile('../../Miscellaneous/Bad channels.txt')
+differences = badChannelDifferences(proposedChannels, existingChannels)
+Path(outputFolder).mkdir(parents=True, exist_ok=True)
+with open(outputFolder + '/Bad channels.txt', 'w') as outputFile:
+    outputFile.write('\n'.join(badChannelLines(proposedChannels)) + '\n')
+with open(outputFolder + '/Differences.txt', 'w') as outputFile:
+    outputFile.write(''.join(difference + '\n' for difference in differences))
+
+# We also store all statistics in a table
+#  with one row per participant and channel.
+table = pd.concat([pd.DataFrame({'Participant': int(result['participantNumber']),
+                                 'Channel': result['channelNames'],
+                                 'Variance z-score': result['statistics']['varianceZScores'],
+                                 'Neighbour correlation': result['statistics']['neighbourCorrelations'],
+                                 'Noise z-score': result['statistics']['noiseZScores'],
+                                 'Flat fraction': result['statistics']['flatFractions'],
+                                 'Reasons': result['reasons']}) for result in results], ignore_index=True)
+writeTable(table, outputFolder, 'Channel statistics', outputFormats)
+
+### ---------- Step E ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("{} participants analysed in {:.1f}s, {} channels proposed".format(
+    len(results), detectionTime, int(np.sum([len(result['badChannels']) for result in results]))))
+print("-------------------------------------------------------------------")
+if len(differences) == 0:
+    print("The proposals are the same as in \'Bad channels.txt\'.")
+else:
+    print("Differences with \'Bad channels.txt\' (+ proposed, - not proposed):")
+    for difference in differences:
+        print("  " + difference)
+print("-------------------------------------------------------------------")
+print("See \'.../Output/Bad channel proposals\' for the proposals and the statistics.")
+print("-------------------------------------------------------------------")
@@ -0,0 +1,98 @@
+# --------------------------------- #
+#     Generating Synthetic Data     #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The code in this file creates a  #
+#  synthetic cohort: a folder with  #
+#  the same layout as the main fol- #
+#  der of this project, containing  #
+#  .vhdr, .eeg and .vmrk files (in  #
+#  '/Data') and the usual files in  #
+#  '/Miscellaneous'. The recordings #
+#  have the same channels and event #
+#  codes as the real ones, and con- #
+#  tain theta activity that becomes #
+#  stronger after each stimulus, by #
+#  a factor that depends on the     #
+#  condition (see '/Code/Modules/   #
+#  syntheticData.py'). Copying the  #
+#  folder '/Code' into the new      #
+#  folder allows the EEG processing #
+#  pipeline to run on the cohort.   #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# In which folder should the cohort
+#  be created?
+cohortDirectory = '../../Output/Synthetic cohort'
+
+# How many participants should the
+#  cohort contain?
+numberOfParticipants = 10
+
+# How long (in seconds) should each
+#  recording be, and at which rate
+#  (in Hz) should it be sampled? A
+#  recording of 930 seconds contains
+#  the whole task (6 blocks of 20
+#  trials).
+recordingDuration = 930
+samplingRate = 500
+
+# By which factor should the ampli-
+#  tude of the theta activity be mul-
+#  tiplied after the onset of a sti-
+#  mulus, in each condition (Add-0,
+#  Add-1 and Add-2)?
+thetaEffects = [1.0, 1.25, 1.5]
+
+# The same seed always gives the
+#  same cohort.
+seed = 0
+
+# How many recordings may be written
+#  at the same time?
+numberOfWorkers = 4
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# We import the Python modules we need.
+import sys
+import time
+from os import path
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+sys.path.append('../Modules')
+from syntheticData import createSyntheticCohort
+
+### ---------- Step B ----------- ###
+
+# We make sure that we do not overwrite
+#  an existing cohort.
+if path.exists(cohortDirectory):
+    print("\n[ERROR] The folder \'{}\' already exists.".format(cohortDirectory))
+    exit()
+
+### ---------- Step C ----------- ###
+
+# We create the cohort.
+startTime = time.perf_counter()
+files = createSyntheticCohort(cohortDirectory, numberOfParticipants, duration=recordingDuration,
+                              samplingFrequency=samplingRate, thetaEffects=thetaEffects,
+                              seed=seed, numberOfWorkers=numberOfWorkers)
+
+### ---------- Step D ----------- ###
+
+# We print a summary.
+print("\n-------------------------------------------------------------------")
+print("Created {} recordings of {} seconds in {:.1f}s".format(
+    len(files), recordingDuration, time.perf_counter() - startTime))
+print("Cohort: {}".format(path.abspath(cohortDirectory)))
+print("-------------------------------------------------------------------")
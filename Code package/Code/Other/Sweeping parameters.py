@@ -0,0 +1,215 @@
+# --------------------------------- #
+#       Sweeping Parameters         #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  The outcomes of the EEG proces-  #
+#  sing pipeline depend on choices  #
+#  such as the theta range, the     #
+#  epoch rejection criteria, the    #
+#  filter and the length of the     #
+#  epochs. The code in this file    #
+#  processes all participants with  #
+#  every combination of the values  #
+#  in 'sweepGrid' and stores the    #
+#  band power scores of all combi-  #
+#  nations in one table, so that    #
+#  the sensitivity of the results   #
+#  to these choices can be studied. #
+#  Stages that several combinations #
+#  have in common are carried out   #
+#  only once (see '/Code/Modules/   #
+#  parameterSweep.py'). The ICA     #
+#  solutions in '/Output/ICA solu-  #
+#  tions' are used.                 #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which values should be tried for
+#  each parameter? All combinations
+#  of these values are processed. The
+#  parameters that can be swept are:
+#  'filterRange', 'downsamplingRate',
+#  'epochWindow', 'analysedEvents',
+#  'rejectCriteria', 'flatCriteria',
+#  'psdMethod', 'normalisationRange',
+#  'thetaRange' and 'otherFrequency-
+#  Bands'. The other parameters keep
+#  the values of the main code.
+sweepGrid = dict(thetaRange=[[4.0, 7.0], [4.0, 8.0], [3.5, 7.5]],
+                 rejectCriteria=[dict(eeg=100e-6), dict(eeg=150e-6), dict(eeg=200e-6)])
+
+# Which participants should be pro-
+#  cessed? Set 'limitedFocus' to 'True'
+#  to only process the participants in
+#  'selectedParticipants'. The parti-
+#  cipants in 'excludedParticipants'
+#  are never processed.
+limitedFocus = False
+selectedParticipants = [1, 2, 3]
+excludedParticipants = [22, 34]
+
+# Should participants be processed
+#  side by side (see the main code)?
+parallelProcessing = False
+numberOfWorkers = 8
+threadsPerWorker = 1
+
+# In which formats should the tables
+#  be stored (see the main code)?
+outputFormats = ['xlsx']
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# If we process participants side by side,
+#  we limit the number of threads that each
+#  worker may use (see step 1.1 of the main
+#  code).
+import sys
+sys.path.append('../Modules')
+from threadLimits import setThreadingVariables
+if parallelProcessing:
+    setThreadingVariables(threadsPerWorker)
+
+# We import the Python modules we need.
+import time
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import participantNumberFromFile, limitThreads
+from parameterSweep import checkSweepGrid, sweepCombinations, sweepParticipant, describeValue, sweepStages
+from outputTables import checkOutputFormats, longTable, writeTable
+from runInstrumentation import writeRunReport
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline, and
+#  select the participants.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files
+                 if (not limitedFocus or int(participantNumberFromFile(file)) in selectedParticipants)
+                 and int(participantNumberFromFile(file)) not in excludedParticipants]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the selected participants could be found.")
+    exit()
+
+# These settings are the same as in the
+#  EEG processing pipeline. The parameters
+#  in 'sweepGrid' replace them.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+
+# We check the sweep grid and the output
+#  formats.
+problem = checkSweepGrid(sweepGrid)
+if problem is not None:
+    print("\n[ERROR] {}.".format(problem))
+    exit()
+problem = checkOutputFormats(outputFormats)
+if problem is not None:
+    print("\n[ERROR] {}.".format(problem))
+    exit()
+
+### ---------- Step C ----------- ###
+
+# We list all combinations of parameter
+#  values and process each participant
+#  with all of them (side by side, if we
+#  set 'parallelProcessing' to 'True').
+combinations = sweepCombinations(sweepGrid)
+startTime = time.perf_counter()
+executor = None
+if parallelProcessing and 'fork' in multiprocessing.get_all_start_methods():
+    executor = ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                   mp_context=multiprocessing.get_context('fork'),
+                                   initializer=limitThreads,
+                                   initargs=(threadsPerWorker,))
+    sweeps = list(executor.map(sweepParticipant, selectedFiles, repeat(settings), repeat(combinations)))
+    executor.shutdown()
+else:
+    sweeps = [sweepParticipant(file, settings, combinations) for file in selectedFiles]
+sweepTime = time.perf_counter() - startTime
+participantNumbers = np.array([int(sweep['participantNumber']) for sweep in sweeps])
+
+### ---------- Step D ----------- ###
+
+# We create two tables. The first one con-
+#  tains one row per combination: the values
+#  of its parameters, and the average number
+#  of epochs that were used per condition and
+#  that were rejected. The second one contains
+#  the band power scores of all combinations
+#  in the 'long' format (see '/Code/Modules/
+#  outputTables.py'), preceded by the number
+#  and the parameter values of the combination.
+combinationRows = []
+scoreTables = []
+for combinationNumber, combination in enumerate(combinations):
+    results = [sweep['results'][combinationNumber] for sweep in sweeps]
+    parameterColumns = {parameterName: describeValue(value) for parameterName, value in combination.items()}
+    numberOfEpochs = np.mean([result['numberOfEpochsPerCondition'] for result in results], axis=0)
+    combinationRows.append(dict({'Combination': combinationNumber + 1}, **parameterColumns,
+                                **{'Epochs (Add-' + str(condition) + ')': numberOfEpochs[condition]
+                                   for condition in range(len(numberOfEpochs))},
+                                **{'Rejected epochs': np.mean([result['numberOfRejectedEpochs']
+                                                               for result in results])}))
+    scoreTable = longTable(np.array([result['bandScores'] for result in results]), participantNumbers,
+                           'Power score', bandNames=results[0]['bandNames'])
+    for columnNumber, (columnName, value) in enumerate(
+            [('Combination', combinationNumber + 1)] + list(parameterColumns.items())):
+        scoreTable.insert(columnNumber, columnName, value)
+    scoreTables.append(scoreTable)
+
+### ---------- Step E ----------- ###
+
+# We store both tables in a folder called
+#  '/Output/Parameter sweep', in every format
+#  in 'outputFormats', together with a run
+#  report (see '/Code/Modules/runInstrumen-
+#  tation.py').
+writeTable(pd.DataFrame(combinationRows), '../../Output/Parameter sweep', 'Combinations', outputFormats)
+writeTable(pd.concat(scoreTables, ignore_index=True), '../../Output/Parameter sweep',
+           'Band power scores', outputFormats)
+writeRunReport([record for sweep in sweeps for record in sweep['stageRecords']],
+               '../../Output/Parameter sweep/Run reports',
+               dict(sweepGrid=sweepGrid, numberOfParticipants=len(selectedFiles), sweepTime=sweepTime))
+
+### ---------- Step F ----------- ###
+
+# We print a summary: how often each stage
+#  was carried out per participant, compared
+#  to processing every combination separately.
+print("\n-------------------------------------------------------------------")
+print("{} combinations, {} participants, {:.1f}s in total".format(
+    len(combinations), len(selectedFiles), sweepTime))
+print("{:<20}{:>22}{:>24}".format('Stage', 'Times per participant', 'Without reuse'))
+for stageName, parameterNames in sweepStages:
+    print("{:<20}{:>22}{:>24}".format(stageName, sweeps[0]['numberOfTimesPerStage'][stageName],
+                                      len(combinations)))
+print("-------------------------------------------------------------------")
@@ -0,0 +1,176 @@
+# --------------------------------- #
+#  Sweeping Rejection Thresholds    #
+# --------------------------------- #
+
+# --------------------------------- #
+#             Overview              #
+# --------------------------------- #
+#  At step 2.2.13 of the EEG pro-   #
+#  cessing pipeline, epochs with a  #
+#  peak-to-peak amplitude above     #
+#  150 µV are rejected. The code in #
+#  this file shows, per participant #
+#  and condition, which share of    #
+#  the epochs would be rejected     #
+#  with other thresholds. It uses   #
+#  the peak-to-peak amplitudes that #
+#  the pipeline stored in '/Output/ #
+#  Peak-to-peak amplitudes' (see    #
+#  '/Code/Modules/epochRejection.   #
+#  py'). Only participants whose    #
+#  amplitudes are missing are pro-  #
+#  cessed (up to step 2.2.13).      #
+# --------------------------------- #
+
+# ============ SETTINGS =========== #
+
+# Which rejection thresholds (in µV)
+#  should be tried? The flatness
+#  threshold stays at 0.1 µV.
+rejectThresholds = [50, 75, 100, 125, 150, 175, 200, 250, 300, 400]
+
+# Which participants should be used?
+#  Set 'limitedFocus' to 'True' to only
+#  use the participants in 'selected-
+#  Participants'. The participants in
+#  'excludedParticipants' are never used.
+limitedFocus = False
+selectedParticipants = [1, 2, 3]
+excludedParticipants = [22, 34]
+
+# Should participants whose amplitudes
+#  are missing be processed side by side
+#  (see the main code)?
+parallelProcessing = False
+numberOfWorkers = 8
+threadsPerWorker = 1
+
+# In which formats should the table be
+#  stored (see the main code)?
+outputFormats = ['xlsx']
+
+# ============= CODE ============== #
+
+### ---------- Step A ----------- ###
+
+# If we process participants side by side,
+#  we limit the number of threads that each
+#  worker may use (see step 1.1 of the main
+#  code).
+import sys
+sys.path.append('../Modules')
+from threadLimits import setThreadingVariables
+if parallelProcessing:
+    setThreadingVariables(threadsPerWorker)
+
+# We import the Python modules we need.
+import time
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# We also import some functions from the
+#  folder '/Code/Modules'.
+from pipelineSettings import readScriptSettings, participantSettings
+from participantProcessing import participantNumberFromFile, participantAmplitudes, limitThreads
+from epochRejection import dropRates
+from outputTables import checkOutputFormats, writeTable
+
+### ---------- Step B ----------- ###
+
+# We load the paths to the .vhdr files,
+#  the bad channels and the unwanted
+#  components, just like at step 1.2
+#  of the EEG processing pipeline, and
+#  select the participants.
+mainDirectory = '../..'
+files = [mainDirectory + fileName.strip() for fileName
+         in open('../../Miscellaneous/File paths.txt', 'r').readlines()]
+badChannelsPerSubject = [line.strip()[5:].split() for line
+                         in open('../../Miscellaneous/Bad channels.txt', 'r').readlines()]
+unwantedComponentsPerSubject = [line.strip()[5:].split() for line
+                                in open('../../Miscellaneous/Unwanted components.txt', 'r').readlines()]
+selectedFiles = [file for file in files
+                 if (not limitedFocus or int(participantNumberFromFile(file)) in selectedParticipants)
+                 and int(participantNumberFromFile(file)) not in excludedParticipants]
+if len(selectedFiles) == 0:
+    print("\n[ERROR] None of the selected participants could be found.")
+    exit()
+problem = checkOutputFormats(outputFormats)
+if problem is not None:
+    print("\n[ERROR] {}.".format(problem))
+    exit()
+
+# These settings are the same as in the
+#  EEG processing pipeline. The stored
+#  amplitudes are only used if they were
+#  calculated with the same settings.
+#  We read them from the top of the main
+#  script (see '/Code/Modules/pipeline-
+#  Settings.py'). Every approach should
+#  use the stored ICA solutions, so we
+#  never fit new ones here.
+settings = participantSettings(mainDirectory, badChannelsPerSubject, unwantedComponentsPerSubject,
+                               readScriptSettings('../Main/EEG processing pipeline.py'))
+settings['completeICA'] = False
+
+# These are the conditions and the event
+#  codes of their epochs (see step 2.2.8).
+conditionCodes = {'Add-0': 100, 'Add-1': 101, 'Add-2': 102}
+
+### ---------- Step C ----------- ###
+
+# We load (or, if needed, calculate) the
+#  peak-to-peak amplitudes of all epochs
+#  of all selected participants.
+startTime = time.perf_counter()
+if parallelProcessing and 'fork' in multiprocessing.get_all_start_methods():
+    executor = ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                   mp_context=multiprocessing.get_context('fork'),
+                                   initializer=limitThreads,
+                                   initargs=(threadsPerWorker,))
+    amplitudeTables = list(executor.map(participantAmplitudes, selectedFiles, repeat(settings)))
+    executor.shutdown()
+else:
+    amplitudeTables = [participantAmplitudes(file, settings) for file in selectedFiles]
+loadingTime = time.perf_counter() - startTime
+
+### ---------- Step D ----------- ###
+
+# For every participant, we calculate which
+#  share of the epochs of each condition
+#  every threshold would reject. This takes
+#  no more than a few milliseconds.
+startTime = time.perf_counter()
+dropRatesPerParticipant = np.array(
+    [dropRates(amplitudeTable, np.array(rejectThresholds) * 1e-6, settings['flatCriteria'],
+               list(conditionCodes.values())) for amplitudeTable in amplitudeTables])
+sweepTime = time.perf_counter() - startTime
+
+# We store the drop rates in the 'long'
+#  format: one row per participant, con-
+#  dition and threshold.
+numberOfParticipants, numberOfThresholds, numberOfConditions = dropRatesPerParticipant.shape
+indices = np.indices(dropRatesPerParticipant.shape).reshape(3, -1)
+table = pd.DataFrame({'Participant': np.array([int(amplitudeTable['participantNumber'])
+                                               for amplitudeTable in amplitudeTables])[indices[0]],
+                      'Threshold (µV)': np.array(rejectThresholds)[indices[1]],
+                      'Condition': np.array(list(conditionCodes))[indices[2]],
+                      'Drop rate': dropRatesPerParticipant.reshape(-1)})
+writeTable(table, '../../Output/Rejection thresholds', 'Drop rates', outputFormats)
+
+### ---------- Step E ----------- ###
+
+# We print the average drop rate per thres-
+#  hold and condition (over participants).
+print("\n-------------------------------------------------------------------")
+print("{} participants loaded in {:.1f}s, {} thresholds applied in {:.1f}ms".format(
+    numberOfParticipants, loadingTime, numberOfThresholds, 1000 * sweepTime))
+print("{:<16}".format('Threshold') + ''.join("{:>12}".format(condition) for condition in conditionCodes))
+for thresholdNumber, threshold in enumerate(rejectThresholds):
+    print("{:<16}".format('{} µV'.format(threshold)) + ''.join(
+        "{:>11.1f}%".format(100 * np.nanmean(dropRatesPerParticipant[:, thresholdNumber, conditionNumber]))
+        for conditionNumber in range(numberOfConditions)))
+print("-------------------------------------------------------------------")
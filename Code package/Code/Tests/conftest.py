@@ -0,0 +1,14 @@
+# ----------------------------------- #
+#            Test Settings            #
+# ----------------------------------- #
+
+# The tests in this folder check the mod-
+#  ules in '/Code/Modules' against the code
+#  that they replaced, on small fixed inputs.
+#  They can be run with 'python -m pytest'
+#  from the folder '/Code/Tests'. We make
+#  the modules importable, just like the
+#  scripts do with 'sys.path.append'.
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Modules'))
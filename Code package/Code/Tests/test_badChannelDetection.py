@@ -0,0 +1,54 @@
+# ----------------------------------- #
+#     Bad Channel Detection Tests     #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import statistics
+import numpy as np
+from badChannelDetection import robustZScores, madScale, badChannelLines, badChannelDifferences
+
+
+# This function calculates robust z-scores
+#  one value at a time, with the 'statistics'
+#  module of Python.
+def loopRobustZScores(values):
+    knownValues = [value for value in values if not np.isnan(value)]
+    median = statistics.median(knownValues)
+    deviation = madScale * statistics.median([abs(value - median) for value in knownValues])
+    zScores = []
+    for value in values:
+        if value == median:
+            zScores.append(0.0)
+        else:
+            zScores.append((value - median) / deviation)
+    return zScores
+
+
+def testRobustZScoresMatchLoop():
+    values = np.random.default_rng(7).normal(size=31)
+    values[[4, 17]] = [8.0, -6.0]
+    np.testing.assert_allclose(robustZScores(values), loopRobustZScores(values.tolist()), rtol=1e-12)
+
+
+def testMissingValuesAreIgnored():
+    values = np.array([1.0, 2.0, np.nan, 4.0, 100.0])
+    zScores = robustZScores(values)
+    assert np.isnan(zScores[2])
+    np.testing.assert_allclose(zScores[[0, 1, 3, 4]], loopRobustZScores(values[[0, 1, 3, 4]].tolist()))
+
+
+# If most values are the same, the median
+#  absolute deviation is zero: those values
+#  get a z-score of zero, and the others an
+#  infinite one.
+def testConstantValues():
+    zScores = robustZScores(np.array([3.0, 3.0, 3.0, 3.0, 5.0]))
+    assert zScores[:4].tolist() == [0.0] * 4
+    assert zScores[4] == np.inf
+
+
+def testBadChannelLines():
+    proposed = {'01': ['PO8'], '02': [], '03': ['Fp1', 'Oz']}
+    existing = {'01': ['PO8'], '02': ['T7'], '03': ['Fp1']}
+    assert badChannelLines(proposed) == ['P01: PO8', 'P02:', 'P03: Fp1 Oz']
+    assert badChannelDifferences(proposed, existing) == ['P02: -T7', 'P03: +Oz']
@@ -0,0 +1,59 @@
+# ----------------------------------- #
+#          Band Power Tests           #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+import pytest
+from bandPower import bandMasks, computeBandPower
+
+
+# This is how the theta power scores used to
+#  be extracted (step 3.2 of the EEG process-
+#  ing pipeline): one electrode at a time, by
+#  averaging the scores at the sampling fre-
+#  quencies within the band.
+def loopBandPower(powerScores, frequencies, band):
+    bandIndices = [frequencyIndex for frequencyIndex in range(len(frequencies))
+                   if band[0] <= frequencies[frequencyIndex] <= band[1]]
+    result = []
+    for participant in powerScores:
+        conditions = []
+        for condition in participant:
+            electrodes = []
+            for electrode in condition:
+                bandScores = [electrode[scoreIndex] for scoreIndex in range(len(electrode))
+                              if scoreIndex in bandIndices]
+                electrodes.append(sum(bandScores) / len(bandScores))
+            conditions.append(electrodes)
+        result.append(conditions)
+    return np.array(result)
+
+
+# We use random power scores for 4 parti-
+#  cipants, 3 conditions, 5 electrodes and
+#  the sampling frequencies of a 4.5-second
+#  epoch (steps of 2/9 Hz), so that some of
+#  them lie exactly on the band limits.
+frequencies = np.arange(0, 135) * 2 / 9
+powerScores = np.random.default_rng(0).random((4, 3, 5, len(frequencies)))
+bands = {'Delta': [1.0, 4.0], 'Theta': [4.0, 7.0], 'Alpha': [8.0, 12.0], 'Beta': [13.0, 30.0]}
+
+
+def testBandPowerMatchesLoop():
+    bandPower = computeBandPower(powerScores, frequencies, bands)
+    assert bandPower.shape == (4, 3, 5, len(bands))
+    for bandIndex, band in enumerate(bands.values()):
+        np.testing.assert_allclose(bandPower[..., bandIndex], loopBandPower(powerScores, frequencies, band),
+                                   rtol=1e-12)
+
+
+def testBandMasksIncludeLimits():
+    masks = bandMasks(frequencies, {'Theta': [4.0, 7.0]})
+    assert frequencies[masks[0] == 1][0] == 4.0
+    assert masks[0].sum() == np.sum((frequencies >= 4.0) & (frequencies <= 7.0))
+
+
+def testEmptyBandIsRejected():
+    with pytest.raises(ValueError):
+        bandMasks(frequencies, {'Empty': [50.0, 60.0]})
@@ -0,0 +1,51 @@
+# ----------------------------------- #
+#          BrainVision Tests          #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import datetime
+import mne
+import numpy as np
+from brainVision import readBrainVisionMarkers, writeBrainVisionFiles
+from syntheticData import writeParticipant, defaultThetaEffects, defaultAccuracies
+
+
+# This function reads the events of a record-
+#  ing with MNE, just like the pipeline does
+#  at step 2.2.8.
+def mneEvents(vhdrFile):
+    raw = mne.io.read_raw_brainvision(vhdrFile, verbose=False)
+    return mne.events_from_annotations(raw, verbose=False)
+
+
+# The events of a synthetic recording should
+#  be identical to MNE's, since the event
+#  numbers in 'Scoring exceptions.txt' (e.g.
+#  'P10: skipTrial 143') refer to them.
+def testMarkersOfSyntheticRecordingMatchMne(tmp_path):
+    vhdrFile = str(tmp_path / '01_F_20_R_AD.vhdr')
+    writeParticipant(vhdrFile, 1, 120, 100, defaultThetaEffects, defaultAccuracies, 0)
+    events, eventCodes = readBrainVisionMarkers(vhdrFile[:-4] + 'vmrk')
+    expectedEvents, expectedEventCodes = mneEvents(vhdrFile)
+    assert len(events) > 100
+    np.testing.assert_array_equal(events, expectedEvents)
+    assert eventCodes == expectedEventCodes
+
+
+# The same should hold for markers of other
+#  types, for markers with the same onset and
+#  for markers that MNE leaves out (because
+#  their description starts with 'BAD' or
+#  'EDGE').
+def testOtherMarkersMatchMne(tmp_path):
+    vhdrFile = str(tmp_path / '02_M_25_R_AD.vhdr')
+    markers = [('Comment', 'Start', 0), ('Stimulus', 'S 10', 5), ('Response', 'R  1', 5),
+               ('Stimulus', 'S100', 12), ('Optic', 'O  3', 20), ('Bad', 'Segment', 25),
+               ('EDGE', 'boundary', 30), ('Stimulus', 'S  7', 40), ('Comment', 'Start', 45),
+               ('Stimulus', 'S211', 49)]
+    data = np.random.default_rng(0).normal(scale=10e-6, size=(3, 50))
+    writeBrainVisionFiles(vhdrFile, data, 100, ['Fz', 'Cz', 'Pz'], markers, datetime.datetime(2019, 4, 1, 9, 0))
+    events, eventCodes = readBrainVisionMarkers(vhdrFile[:-4] + 'vmrk')
+    expectedEvents, expectedEventCodes = mneEvents(vhdrFile)
+    np.testing.assert_array_equal(events, expectedEvents)
+    assert eventCodes == expectedEventCodes
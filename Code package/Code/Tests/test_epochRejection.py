@@ -0,0 +1,80 @@
+# ----------------------------------- #
+#        Epoch Rejection Tests        #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import numpy as np
+from epochRejection import dropBadEpochs, dropRates, peakToPeakAmplitudes, storeAmplitudes, loadAmplitudes
+
+# These are the rejection and flatness cri-
+#  teria of step 2.2.13.
+rejectCriteria = dict(eeg=150e-6)
+flatCriteria = dict(eeg=1e-7)
+
+
+# This function creates 30 epochs of 4 EEG
+#  channels and 1 EOG channel. A few epochs
+#  contain a large artefact or a flat EEG
+#  channel (one of them in a bad channel, which
+#  should be ignored), and one contains a
+#  large artefact in the EOG channel only.
+def createEpochs():
+    random = np.random.default_rng(5)
+    data = random.normal(scale=10e-6, size=(30, 5, 200))
+    data[3, 1, 50] = 400e-6
+    data[7, 2, :] = 0
+    data[11, 0, 100] = -300e-6
+    data[11, 3, :] = 0
+    data[15, 4, 20] = 900e-6
+    data[19, 3, 10] = 500e-6
+    info = mne.create_info(['Fz', 'Cz', 'Pz', 'Oz', 'vEOG'], 100.0, ['eeg'] * 4 + ['eog'])
+    events = np.column_stack([np.arange(30) * 300, np.zeros(30, dtype=int), 100 + np.arange(30) % 3])
+    epochs = mne.EpochsArray(data, info, events=events, verbose=False)
+    epochs.info['bads'] = ['Oz']
+    return epochs
+
+
+# The epochs that are dropped, and the drop
+#  log, should be the same as with MNE's own
+#  'drop_bad' (which the pipeline used before).
+def testDropBadEpochsMatchesMne():
+    expected = createEpochs()
+    expected.drop_bad(reject=rejectCriteria, flat=flatCriteria, verbose=False)
+    epochs = createEpochs()
+    amplitudeTable = dropBadEpochs(epochs, rejectCriteria, flatCriteria)
+    assert epochs.selection.tolist() == expected.selection.tolist() == [
+        epoch for epoch in range(30) if epoch not in [3, 7, 11]]
+    assert epochs.drop_log == expected.drop_log
+    np.testing.assert_array_equal(epochs.get_data(), expected.get_data())
+    assert amplitudeTable['amplitudes'].shape == (30, 5)
+    assert np.all(np.isnan(amplitudeTable['amplitudes'][:, 3]))
+
+
+# The drop rates of all thresholds at once
+#  should be the same as applying each thres-
+#  hold separately, one epoch at a time.
+def testDropRatesMatchesLoop():
+    epochs = createEpochs()
+    amplitudeTable = peakToPeakAmplitudes(epochs)
+    thresholds = [50e-6, 150e-6, 350e-6, 1e-3]
+    rates = dropRates(amplitudeTable, thresholds, flatCriteria, [100, 101, 102])
+    eegChannels = [0, 1, 2]
+    for thresholdNumber, threshold in enumerate(thresholds):
+        for codeNumber, eventCode in enumerate([100, 101, 102]):
+            rejected = []
+            for epochNumber in range(30):
+                if epochs.events[epochNumber, 2] != eventCode:
+                    continue
+                amplitudes = np.ptp(epochs.get_data()[epochNumber, eegChannels], axis=1)
+                rejected.append(bool(np.any(amplitudes > threshold) or np.any(amplitudes < flatCriteria['eeg'])))
+            assert rates[thresholdNumber, codeNumber] == np.mean(rejected)
+
+
+def testStoredAmplitudesAreKeyed(tmp_path):
+    amplitudeTable = peakToPeakAmplitudes(createEpochs())
+    storeAmplitudes(str(tmp_path), '01', 'abc', amplitudeTable)
+    assert loadAmplitudes(str(tmp_path), '01', 'def') is None
+    loadedTable = loadAmplitudes(str(tmp_path), '01', 'abc')
+    np.testing.assert_array_equal(loadedTable['amplitudes'], amplitudeTable['amplitudes'])
+    assert loadedTable['channelNames'].tolist() == ['Fz', 'Cz', 'Pz', 'Oz', 'vEOG']
@@ -0,0 +1,93 @@
+# ----------------------------------- #
+#         Output Tables Tests         #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+import pandas as pd
+from outputTables import wideTable, longTable, spectrumTable, writeTable, checkOutputFormats
+
+
+# These are the 'wide' and 'long' tables as
+#  they used to be created (step 4.2 of the
+#  EEG processing pipeline): one row and one
+#  score at a time. The participant numbers
+#  were derived from 'excludedParticipants'.
+def loopWideTable(scores, excludedParticipants):
+    pythonTable_wide = []
+    for participantNumber in range(0, len(scores)):
+        realParticipantNumber = participantNumber + 1
+        for excludedParticipant in excludedParticipants:
+            if realParticipantNumber >= excludedParticipant:
+                realParticipantNumber += 1
+        newRow = [realParticipantNumber]
+        for conditionNumber in range(0, len(scores[participantNumber])):
+            for electrodeNumber in range(0, len(scores[participantNumber][conditionNumber])):
+                newRow.append(scores[participantNumber][conditionNumber][electrodeNumber])
+        pythonTable_wide.append(newRow)
+    columns = ['Participant']
+    for conditionNumber in range(0, len(scores[0])):
+        for electrodeNumber in range(0, len(scores[0][0])):
+            columns.append('Add' + str(conditionNumber) + '_Electrode' + str(electrodeNumber + 1))
+    return pd.DataFrame(pythonTable_wide, columns=columns)
+
+
+def loopLongTable(scores, excludedParticipants, valueName):
+    pythonTable_long = []
+    for participantNumber in range(0, len(scores)):
+        realParticipantNumber = participantNumber + 1
+        for excludedParticipant in excludedParticipants:
+            if realParticipantNumber >= excludedParticipant:
+                realParticipantNumber += 1
+        for conditionNumber in range(0, len(scores[participantNumber])):
+            for electrodeNumber in range(0, len(scores[participantNumber][conditionNumber])):
+                pythonTable_long.append([realParticipantNumber, conditionNumber, electrodeNumber + 1,
+                                         scores[participantNumber][conditionNumber][electrodeNumber]])
+    return pd.DataFrame(pythonTable_long, columns=['Participant', 'Condition', 'Electrode', valueName])
+
+
+# We use random scores for 4 participants
+#  (participant 3 was excluded, so they are
+#  participants 1, 2, 4 and 5), 3 conditions
+#  and 6 electrodes.
+scores = np.random.default_rng(2).random((4, 3, 6))
+excludedParticipants = [3]
+participantNumbers = [1, 2, 4, 5]
+
+
+def testWideTableMatchesLoop():
+    pd.testing.assert_frame_equal(wideTable(scores, participantNumbers),
+                                  loopWideTable(scores.tolist(), excludedParticipants))
+
+
+def testLongTableMatchesLoop():
+    pd.testing.assert_frame_equal(longTable(scores, participantNumbers, 'Theta power score'),
+                                  loopLongTable(scores.tolist(), excludedParticipants, 'Theta power score'),
+                                  check_dtype=False)
+
+
+def testLongTableWithBands():
+    bandScores = np.random.default_rng(3).random((4, 3, 6, 2))
+    table = longTable(bandScores, participantNumbers, 'Power score', bandNames={'Theta': [4, 7], 'Alpha': [8, 12]})
+    assert len(table) == bandScores.size
+    row = table.iloc[2 * (6 * 3 + 6 + 4) + 1]
+    assert (row['Participant'], row['Condition'], row['Electrode'], row['Band']) == (2, 1, 5, 'Alpha')
+    assert row['Power score'] == bandScores[1, 1, 4, 1]
+
+
+def testSpectrumTable():
+    mean = np.random.default_rng(4).random((3, 6, 5))
+    frequencies = np.arange(5) * 0.5
+    table = spectrumTable({'Mean': mean, 'Median': 2 * mean}, frequencies)
+    assert list(table.columns) == ['Condition', 'Electrode', 'Frequency', 'Mean', 'Median']
+    row = table.iloc[(1 * 6 + 2) * 5 + 3]
+    assert (row['Condition'], row['Electrode'], row['Frequency']) == (1, 3, 1.5)
+    assert row['Mean'] == mean[1, 2, 3] and row['Median'] == 2 * mean[1, 2, 3]
+
+
+def testWriteTableAsCsv(tmp_path):
+    table = wideTable(scores, participantNumbers)
+    writeTable(table, str(tmp_path / 'Tables'), 'Wide format', ['csv'])
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'Tables' / 'Wide format.csv'), table)
+    assert checkOutputFormats(['csv', 'xlsx']) is None
+    assert checkOutputFormats(['docx']) is not None
@@ -0,0 +1,86 @@
+# ----------------------------------- #
+#     Participant Processing Tests    #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import numpy as np
+from pipelineSettings import fixedSettings
+from participantProcessing import participantStageKeys
+from stageCache import storeStage, loadStage
+
+
+# This function creates the (dummy) input
+#  files and ICA solution of participant 01,
+#  and the settings of the subject-level com-
+#  putations. Only the keys of the stages are
+#  calculated, so the files need not contain
+#  an actual recording.
+def createParticipant(mainDirectory):
+    for extension in ['vhdr', 'eeg', 'vmrk']:
+        with open(os.path.join(mainDirectory, 'P01.' + extension), 'w') as filehandle:
+            filehandle.write(extension)
+    icaDirectory = os.path.join(mainDirectory, 'Output', 'ICA solutions', 'P01')
+    os.makedirs(icaDirectory)
+    with open(os.path.join(icaDirectory, 'P01-ica.fif'), 'w') as filehandle:
+        filehandle.write('ica')
+    settings = dict(mainDirectory=mainDirectory, badChannelsPerSubject=[['Fp1']],
+                    unwantedComponentsPerSubject=[[0, 3]], completeICA=False,
+                    thetaRange=[4, 8], otherFrequencyBands={'Alpha': [8, 13]},
+                    normalisationRange=None, psdMethod='multitaper', streamingMode=False,
+                    fuseSpatialOperators=False, downsamplingRate=None,
+                    analysedEvents=['Add0_StimulusAppears', 'Add1_StimulusAppears', 'Add2_StimulusAppears'],
+                    **fixedSettings)
+    return os.path.join(mainDirectory, 'P01.vhdr'), settings
+
+
+# Without a 'normalisationRange', the power
+#  scores do not depend on the frequency bands,
+#  so changing only 'thetaRange' should reuse
+#  the cached 'psd' stage. The band scores
+#  ('bands') should be calculated again.
+def testThetaChangeReusesPsdStage(tmp_path):
+    file, settings = createParticipant(str(tmp_path))
+    cacheDirectory = str(tmp_path / 'Stage cache')
+    keys = participantStageKeys(file, '01', settings, cacheDirectory)
+    storeStage(cacheDirectory, 'psd', keys['psd'],
+               {'powerScores': np.ones((3, 2, 5)), 'info': mne.create_info(['Fz', 'Cz'], 100.0, 'eeg')})
+    newKeys = participantStageKeys(file, '01', dict(settings, thetaRange=[3, 7]), cacheDirectory)
+    assert newKeys['epochs'] == keys['epochs']
+    assert newKeys['psd'] == keys['psd']
+    assert newKeys['bands'] != keys['bands']
+    result = loadStage(cacheDirectory, 'psd', newKeys['psd'])
+    np.testing.assert_array_equal(result['powerScores'], np.ones((3, 2, 5)))
+
+
+# With a 'normalisationRange', the sampling
+#  frequencies are restricted to the bands, so
+#  the power scores have to be calculated again.
+def testThetaChangeWithNormalisationRangeInvalidatesPsdStage(tmp_path):
+    file, settings = createParticipant(str(tmp_path))
+    settings['normalisationRange'] = [1, 30]
+    cacheDirectory = str(tmp_path / 'Stage cache')
+    keys = participantStageKeys(file, '01', settings, cacheDirectory)
+    newKeys = participantStageKeys(file, '01', dict(settings, thetaRange=[3, 7]), cacheDirectory)
+    assert newKeys['epochs'] == keys['epochs']
+    assert newKeys['psd'] != keys['psd']
+    assert newKeys['bands'] != keys['bands']
+
+
+# Changing the epoch window should change the
+#  keys of the epochs and all later stages,
+#  but not the key of the pre-processed data.
+#  Settings that do not affect the outcome
+#  (e.g. how large the stage cache may get)
+#  should not change any key.
+def testStageKeysFollowStageSettings(tmp_path):
+    file, settings = createParticipant(str(tmp_path))
+    cacheDirectory = str(tmp_path / 'Stage cache')
+    keys = participantStageKeys(file, '01', settings, cacheDirectory)
+    newKeys = participantStageKeys(file, '01', dict(settings, epochWindow=[-0.2, 4.0]), cacheDirectory)
+    assert newKeys['raw'] == keys['raw']
+    assert all(newKeys[stage] != keys[stage] for stage in ['epochs', 'psd', 'bands'])
+    unrelatedSettings = dict(settings, useStageCache=True, stageCacheSizeLimit=5, streamingChunkDuration=30,
+                             icaMethod='picard', icaDecimation=4)
+    assert participantStageKeys(file, '01', unrelatedSettings, cacheDirectory) == keys
@@ -0,0 +1,120 @@
+# ----------------------------------- #
+#      Performance Scoring Tests      #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+import pytest
+from performanceScoring import scoreTrials, correctDigitsPerCondition, readScoringExceptions, typedDigits
+
+
+# This is how the trials used to be scored
+#  (see the old '/Code/Other/Performance ana-
+#  lysis.py'): one event at a time, walking
+#  forward from the start of each trial to its
+#  required digits and then to the entered
+#  digits. We return the number of correct
+#  digits per condition.
+def loopScores(codes, skippedTrials=()):
+    correctDigits = {100: 0, 101: 0, 102: 0}
+    for i in range(2, len(codes)):
+        if codes[i] not in correctDigits or i in skippedTrials:
+            continue
+        requiredDigits = []
+        enteredDigits = []
+        jump = 0
+        while True:
+            jump = jump + 1
+            if 1 <= codes[i + jump] <= 10:
+                requiredDigits.append(codes[i + jump])
+                continue
+            elif len(requiredDigits) != 4 or codes[i + jump] == 211:
+                continue
+            else:
+                break
+        while True:
+            if 201 <= codes[i + jump] <= 210:
+                enteredDigits.append(codes[i + jump])
+                if jump + 1 + i >= len(codes):
+                    break
+                jump = jump + 1
+                continue
+            elif codes[i + jump] == 211:
+                if jump + 1 + i >= len(codes):
+                    break
+                jump = jump + 1
+                continue
+            else:
+                break
+        correctDigits[codes[i]] += sum(requiredDigits[digit] == enteredDigits[digit] - 200 for digit in range(4))
+    return {'Add-0': correctDigits[100], 'Add-1': correctDigits[101], 'Add-2': correctDigits[102]}
+
+
+# This function creates the event codes of a
+#  random session: trials of random condi-
+#  tions, with other events (e.g. space bars)
+#  in between the required digits and among
+#  the key presses.
+def randomSession(random):
+    codes = [99999, 10001]
+    for trial in range(random.integers(1, 8)):
+        codes.append(int(random.choice([100, 101, 102])))
+        codes += [int(random.choice([211, 50, 51])) for other in range(random.integers(0, 3))]
+        for digit in range(4):
+            codes.append(int(random.integers(1, 11)))
+            if random.random() < 0.3:
+                codes.append(int(random.choice([211, 50])))
+        codes += [211] * int(random.integers(0, 3))
+        codes.append(int(random.choice([60, 201, 205])))
+        codes += [int(random.choice(range(201, 212))) for key in range(random.integers(4, 7))]
+        if random.random() < 0.8:
+            codes.append(70)
+    return codes
+
+
+# The scores of many fixed random sessions
+#  should be the same as with the old loop
+#  (the sessions on which the old loop fails
+#  with an 'IndexError' are left out).
+def testScoresMatchLoop():
+    random = np.random.default_rng(6)
+    numberOfSessions = 0
+    for session in range(1000):
+        codes = randomSession(random)
+        try:
+            expected = loopScores(codes)
+        except IndexError:
+            continue
+        assert correctDigitsPerCondition(scoreTrials(codes)) == expected
+        numberOfSessions += 1
+    assert numberOfSessions > 100
+
+
+def testSkippedTrial():
+    codes = [99999, 10001, 100, 1, 2, 3, 4, 201, 202, 203, 204, 70,
+             100, 5, 6, 7, 8, 205, 206, 207, 210, 70]
+    assert correctDigitsPerCondition(scoreTrials(codes))['Add-0'] == 7
+    assert correctDigitsPerCondition(scoreTrials(codes, skippedTrials=[12]))['Add-0'] == \
+        loopScores(codes, skippedTrials=[12])['Add-0'] == 4
+
+
+def testTrialDetails():
+    codes = [99999, 10001, 101, 10, 2, 211, 3, 4, 211, 210, 211, 209, 203, 70]
+    trials = scoreTrials(codes)
+    assert trials['trialStarts'].tolist() == [2]
+    assert typedDigits(trials['requiredDigits']) == ['0 2 3 4']
+    assert typedDigits(trials['enteredDigits']) == ['0 9 3 -']
+    assert trials['numberOfCorrectDigits'].tolist() == [2]
+
+
+def testScoringExceptions(tmp_path):
+    exceptionFile = tmp_path / 'Scoring exceptions.txt'
+    exceptionFile.write_text("# A comment\n\nP01: fixedTotals Add-0=159 Add-1=137 Add-2=149\n"
+                             "P10: skipTrial 143\nP19: warning some trials were not recorded\n")
+    exceptions = readScoringExceptions(str(exceptionFile))
+    assert exceptions['01']['fixedTotals'] == {'Add-0': 159, 'Add-1': 137, 'Add-2': 149}
+    assert exceptions['10']['skippedTrials'] == [143]
+    assert exceptions['19']['warnings'] == ['some trials were not recorded']
+    exceptionFile.write_text("P02: fixedTotals Add-0=1\n")
+    with pytest.raises(ValueError):
+        readScoringExceptions(str(exceptionFile))
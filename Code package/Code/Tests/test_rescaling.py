@@ -0,0 +1,63 @@
+# ----------------------------------- #
+#           Rescaling Tests           #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import numpy as np
+from rescaling import rescaleConditionPairs
+
+
+# This is how the scores used to be rescaled
+#  (step 4.3.1 of the EEG processing pipe-
+#  line, Jing et al., 2006): one pair of con-
+#  ditions and one participant at a time, with
+#  the sums written out per electrode.
+def loopRescaling(scores, conditionA, conditionB):
+    numberOfElectrodes = len(scores[0][0])
+    rescaledScores = []
+    for participant in scores:
+        powerScoresConditionA = participant[conditionA]
+        powerScoresConditionB = participant[conditionB]
+        numerator_part1 = 0
+        for electrodeNumber in range(0, numberOfElectrodes):
+            numerator_part1 += powerScoresConditionA[electrodeNumber] * powerScoresConditionB[electrodeNumber]
+        numerator = numberOfElectrodes * numerator_part1 - sum(powerScoresConditionA) * sum(powerScoresConditionB)
+        denominatorA_part1 = 0
+        denominatorB_part1 = 0
+        for electrodeNumber in range(0, numberOfElectrodes):
+            denominatorA_part1 += powerScoresConditionA[electrodeNumber] ** 2
+            denominatorB_part1 += powerScoresConditionB[electrodeNumber] ** 2
+        denominatorA = numberOfElectrodes * denominatorA_part1 - sum(powerScoresConditionA) ** 2
+        denominatorB = numberOfElectrodes * denominatorB_part1 - sum(powerScoresConditionB) ** 2
+        pA = numerator / denominatorA
+        pB = numerator / denominatorB
+        cA = -1 * pA * (sum(powerScoresConditionA) / numberOfElectrodes) + \
+            (sum(powerScoresConditionB) / numberOfElectrodes)
+        cB = -1 * pB * (sum(powerScoresConditionB) / numberOfElectrodes) + \
+            (sum(powerScoresConditionA) / numberOfElectrodes)
+        newScores = [[-1] * numberOfElectrodes for condition in participant]
+        newScores[conditionA] = [score * pA + cA for score in powerScoresConditionA]
+        newScores[conditionB] = [score * pB + cB for score in powerScoresConditionB]
+        rescaledScores.append(newScores)
+    return np.array(rescaledScores)
+
+
+# We use random theta power scores for 5
+#  participants, 3 conditions and 32 elec-
+#  trodes.
+scores = np.random.default_rng(1).random((5, 3, 32))
+
+
+def testRescalingMatchesLoop():
+    rescaling = rescaleConditionPairs(scores)
+    assert rescaling['conditionPairs'].tolist() == [[0, 1], [0, 2], [1, 2]]
+    for pairNumber, (conditionA, conditionB) in enumerate(rescaling['conditionPairs']):
+        np.testing.assert_allclose(rescaling['rescaledScores'][pairNumber],
+                                   loopRescaling(scores.tolist(), conditionA, conditionB), rtol=1e-10)
+
+
+def testSelectedPairs():
+    rescaling = rescaleConditionPairs(scores, [[2, 0]])
+    assert rescaling['rescaledScores'].shape == (1, 5, 3, 32)
+    np.testing.assert_allclose(rescaling['rescaledScores'][0], loopRescaling(scores.tolist(), 2, 0), rtol=1e-10)
+    assert np.all(rescaling['rescaledScores'][0, :, 1] == -1)
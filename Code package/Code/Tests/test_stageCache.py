@@ -0,0 +1,80 @@
+# ----------------------------------- #
+#          Stage Cache Tests          #
+# ----------------------------------- #
+
+# We import the Python modules we need.
+import mne
+import os
+import numpy as np
+from stageCache import fingerprintFiles, stageKeys, loadStage, storeStage, evictLeastRecentlyUsed
+
+# These are the stages of the subject-level
+#  computations, with a few of their para-
+#  meters.
+stageParameters = [('raw', dict(filterRange=[0.1, 30], downsamplingRate=None)),
+                   ('epochs', dict(epochWindow=[-0.5, 4.0], rejectCriteria=dict(eeg=150e-6))),
+                   ('psd', dict(method='multitaper', normalisationRange=None))]
+
+
+# This function returns the stage parameters
+#  with one parameter of one stage changed.
+def changedParameters(stage, parameterName, value):
+    return [(stageName, dict(parameters, **{parameterName: value}) if stageName == stage else parameters)
+            for stageName, parameters in stageParameters]
+
+
+# Changing a parameter of a stage should
+#  change the key of that stage and of all
+#  later stages, but not of the earlier ones.
+def testChangeInvalidatesStageAndLaterStages():
+    keys = stageKeys('input', stageParameters)
+    for stageNumber, (stage, parameters) in enumerate(stageParameters):
+        parameterName = list(parameters)[0]
+        newKeys = stageKeys('input', changedParameters(stage, parameterName, 'other value'))
+        for otherStageNumber, (otherStage, otherParameters) in enumerate(stageParameters):
+            assert (newKeys[otherStage] == keys[otherStage]) == (otherStageNumber < stageNumber)
+
+
+# Other input files should change every key,
+#  but the order of the parameters of a stage
+#  should not change any.
+def testInputChangesAllKeysButOrderDoesNot():
+    keys = stageKeys('input', stageParameters)
+    assert all(key != keys[stage] for stage, key in stageKeys('other input', stageParameters).items())
+    reorderedParameters = [(stage, dict(reversed(list(parameters.items()))))
+                           for stage, parameters in stageParameters]
+    assert stageKeys('input', reorderedParameters) == keys
+
+
+# The fingerprint of the input files should
+#  only change if their contents change.
+def testFingerprintFollowsContents(tmp_path):
+    file = str(tmp_path / 'P01.eeg')
+    with open(file, 'wb') as filehandle:
+        filehandle.write(b'\x00\x01' * 1000)
+    fingerprint = fingerprintFiles([file], str(tmp_path / 'Cache'))
+    assert fingerprintFiles([file], str(tmp_path / 'Cache')) == fingerprint
+    with open(file, 'wb') as filehandle:
+        filehandle.write(b'\x00\x02' * 1000)
+    os.utime(file, ns=(0, os.stat(file).st_mtime_ns + 1))
+    assert fingerprintFiles([file], str(tmp_path / 'Cache')) != fingerprint
+
+
+# A stored stage can only be loaded with its
+#  own key, and the stage that was used least
+#  recently is evicted first.
+def testStoreLoadAndEvict(tmp_path):
+    cacheDirectory = str(tmp_path)
+    info = mne.create_info(['Fz', 'Cz'], 100.0, 'eeg')
+    keys = stageKeys('input', stageParameters)
+    otherKeys = stageKeys('other input', stageParameters)
+    storeStage(cacheDirectory, 'psd', keys['psd'], {'powerScores': np.ones((3, 2, 5)), 'info': info})
+    storeStage(cacheDirectory, 'psd', otherKeys['psd'], {'powerScores': np.zeros((3, 2, 5)), 'info': info})
+    assert loadStage(cacheDirectory, 'psd', keys['epochs']) is None
+    for fileName in os.listdir(cacheDirectory):
+        os.utime(os.path.join(cacheDirectory, fileName), (0, 0))
+    np.testing.assert_array_equal(loadStage(cacheDirectory, 'psd', keys['psd'])['powerScores'], 1)
+    totalSize = sum(os.path.getsize(os.path.join(cacheDirectory, fileName)) for fileName in os.listdir(cacheDirectory))
+    evictLeastRecentlyUsed(cacheDirectory, totalSize - 1)
+    assert loadStage(cacheDirectory, 'psd', otherKeys['psd']) is None
+    assert loadStage(cacheDirectory, 'psd', keys['psd']) is not None